@@ -0,0 +1,138 @@
+# Vectorized aggregation of an event's analytics records. The records are turned
+# into columnar NumPy arrays once, and every figure the report needs (trend
+# series, per-device rollups, peak, average and period-over-period change) is
+# computed from those arrays without per-row Python loops.
+import numpy as np
+
+# Most points written to TrendData; longer series are re-bucketed down to this
+DEFAULT_TREND_POINTS = 200
+
+# Per-device columns written to TrendData at most; keeps one event's block far
+# below the 10M-cells-per-spreadsheet limit even at hundreds of devices
+MAX_DEVICE_COLUMNS = 500
+
+
+def to_columns(analytics):
+    # One pass per field straight into typed arrays; the timestamp strings are
+    # parsed by NumPy in a single call (missing or empty ones become NaT)
+    size = len(analytics)
+    times = np.array([entry.get('datetime') for entry in analytics], dtype='datetime64[s]')
+    devices = np.fromiter((entry.get('device_id') or 0 for entry in analytics), dtype=np.int64, count=size)
+    counts = np.fromiter((entry.get('headcount') or 0 for entry in analytics), dtype=np.float64, count=size)
+    valid = ~np.isnat(times)
+    return {'time': times[valid], 'device': devices[valid], 'count': counts[valid]}
+
+
+def device_buckets(columns, points=DEFAULT_TREND_POINTS):
+    # Time bucket x device matrix of readings averaged per device inside each
+    # bucket (0 where a device reported nothing), for the buckets that have
+    # any reading. Returns (bucket labels, device IDs, matrix)
+    times = columns['time'].astype(np.int64)
+    if not times.size:
+        return np.array([], dtype='datetime64[s]'), np.array([], dtype=np.int64), np.zeros((0, 0))
+    start, span = times.min(), times.max() - times.min()
+    # Whole minutes, and wide enough that at most `points` buckets remain
+    width = max(60, -(-(span + 1) // max(points, 1) // 60) * 60)
+    buckets = (times - start) // width
+
+    device_codes, device_index = np.unique(columns['device'], return_inverse=True)
+    keys = buckets * len(device_codes) + device_index
+    size = (int(buckets.max()) + 1) * len(device_codes)
+    sums = np.bincount(keys, weights=columns['count'], minlength=size)
+    hits = np.bincount(keys, minlength=size)
+    means = np.divide(sums, hits, out=np.zeros_like(sums), where=hits > 0)
+
+    per_bucket = means.reshape(-1, len(device_codes))
+    present = hits.reshape(-1, len(device_codes)).any(axis=1)
+    labels = (start + np.flatnonzero(present) * width).astype('datetime64[s]')
+    return labels, device_codes, per_bucket[present]
+
+
+def bucket_series(columns, points=DEFAULT_TREND_POINTS):
+    # Crowd total per time bucket: two devices at the same time add up instead
+    # of showing as two separate points
+    labels, _, matrix = device_buckets(columns, points)
+    return labels, matrix.sum(axis=1)
+
+
+def device_matrix(event, points=DEFAULT_TREND_POINTS, max_devices=MAX_DEVICE_COLUMNS):
+    # Wide per-device series, busiest devices first; devices past max_devices
+    # only count toward the totals
+    labels, devices, matrix = device_buckets(to_columns(event.get('analytics', [])), points)
+    order = np.argsort(-matrix.sum(axis=0), kind='stable')[:max_devices]
+    return {'labels': labels, 'devices': devices[order], 'matrix': matrix[:, order],
+            'totals': matrix.sum(axis=1)}
+
+
+def device_rollup(columns):
+    device_codes, device_index = np.unique(columns['device'], return_inverse=True)
+    sums = np.bincount(device_index, weights=columns['count'], minlength=len(device_codes))
+    hits = np.bincount(device_index, minlength=len(device_codes))
+    peaks = np.full(len(device_codes), -np.inf)
+    np.maximum.at(peaks, device_index, columns['count'])
+    return {
+        int(device): {'readings': int(n), 'average': float(total / n), 'peak': float(peak)}
+        for device, total, n, peak in zip(device_codes, sums, hits, peaks)
+    }
+
+
+def percent_change(current, previous):
+    if not previous:
+        return None
+    return (current - previous) / previous * 100
+
+
+def summarize(event, points=DEFAULT_TREND_POINTS):
+    # Computed once per event by main.create_report and handed to the trend
+    # rows, the KPI cards and the incremental state
+    columns = to_columns(event.get('analytics', []))
+    labels, totals = bucket_series(columns, points)
+    # Period over period: the later half of the series against the earlier half
+    half = len(totals) // 2
+    previous, current = totals[:half].mean() if half else 0, totals[half:].mean() if half else 0
+    previous_peak, current_peak = totals[:half].max() if half else 0, totals[half:].max() if half else 0
+    return {
+        'labels': labels,
+        'totals': totals,
+        'peak': float(totals.max()) if totals.size else 0.0,
+        'average': float(totals.mean()) if totals.size else 0.0,
+        'change_pct': percent_change(float(current), float(previous)),
+        'peak_change_pct': percent_change(float(current_peak), float(previous_peak)),
+        'devices': device_rollup(columns) if columns['count'].size else {},
+    }
+
+
+def time_labels(labels):
+    # HH:MM while the series fits in one day, with the date once it spans several
+    multi_day = labels[-1].astype('datetime64[D]') != labels[0].astype('datetime64[D]')
+    text = np.datetime_as_string(labels, unit='m')
+    return [t[5:].replace('T', ' ') if multi_day else t[11:] for t in text]
+
+
+def trend_rows(summary):
+    labels = summary['labels']
+    if not labels.size:
+        return []
+    return [[label, round(float(total), 2)] for label, total in zip(time_labels(labels), summary['totals'])]
+
+
+def device_rows(table, series):
+    # Time | Total | one column per device | Other (devices not drawn as their
+    # own series), with a header row; rounding and conversion happen on whole arrays
+    labels = table['labels']
+    if not labels.size:
+        return []
+    devices = table['devices'].tolist()
+    header = ['Time', 'Total'] + [f"Device {device}" for device in devices]
+    values = np.column_stack([table['totals'], table['matrix']])
+    if len(devices) > series:
+        header.append('Other devices')
+        values = np.column_stack([values, table['totals'] - table['matrix'][:, :series].sum(axis=1)])
+    values = np.round(values, 2).tolist()
+    return [header] + [[label] + row for label, row in zip(time_labels(labels), values)]
+
+
+def format_change(change_pct, period='last period'):
+    if change_pct is None:
+        return f"n/a vs {period}"
+    return f"{change_pct:+.1f}% vs {period}"
@@ -0,0 +1,206 @@
+# Central execution layer for every Google API call. Requests are spaced with a
+# token bucket per (API, quota bucket) so a parallel run stays under the
+# per-user per-minute quotas, and 429/5xx responses are retried with
+# exponential backoff and full jitter, honouring Retry-After when present.
+# A create or copy that fails with a 5xx (or a dropped connection) may still
+# have happened, so only rate limiting, which rejects a call before it runs,
+# is retried for those.
+import json
+import random
+import threading
+import time
+
+import tracing
+
+# Per-user requests per minute, from the Slides, Sheets and Drive quota pages
+DEFAULT_QUOTAS = {
+    ('slides', 'read'): 600,
+    ('slides', 'write'): 60,
+    ('sheets', 'read'): 60,
+    ('sheets', 'write'): 60,
+    ('drive', 'read'): 12000,
+    ('drive', 'write'): 12000,
+}
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+READ_METHODS = {'get', 'list', 'export'}
+# Sending these again after an unclear failure can make a second file or row
+NON_IDEMPOTENT_METHODS = {'create', 'copy', 'append'}
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst=10):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, min(burst, per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waiting = 0
+
+    def acquire(self, tokens=1):
+        # Blocks until the tokens are free and returns the seconds spent waiting.
+        # More tokens than the burst (a Drive batch) leave the bucket in debt,
+        # so the calls after it wait for the refill.
+        start = time.monotonic()
+        with self.lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self.lock:
+                    now = time.monotonic()
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    needed = min(tokens, self.capacity)
+                    if self.tokens >= needed:
+                        self.tokens -= tokens
+                        return now - start
+                    delay = (needed - self.tokens) / self.rate
+                time.sleep(delay)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+
+def classify(request):
+    # googleapiclient requests carry methodId, e.g. "sheets.spreadsheets.values.update"
+    method_id = getattr(request, 'methodId', None) or 'unknown.unknown'
+    parts = method_id.split('.')
+    return parts[0], 'read' if parts[-1] in READ_METHODS else 'write'
+
+
+def is_idempotent(request):
+    method_id = getattr(request, 'methodId', None) or 'unknown'
+    return method_id.split('.')[-1] not in NON_IDEMPOTENT_METHODS
+
+
+def error_status(error):
+    resp = getattr(error, 'resp', None)
+    status = getattr(resp, 'status', None)
+    return int(status) if status is not None else None
+
+
+def retry_after(error):
+    resp = getattr(error, 'resp', None)
+    try:
+        return float(resp.get('retry-after')) if resp is not None and resp.get('retry-after') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error, idempotent=True):
+    status = error_status(error)
+    if status == 429:
+        return True
+    # Drive reports per-user rate limiting as 403 rather than 429
+    if status == 403 and b'ateLimitExceeded' in (getattr(error, 'content', b'') or b''):
+        return True
+    if not idempotent:
+        return False
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status is None and isinstance(error, (ConnectionError, TimeoutError))
+
+
+def new_stats():
+    return {'calls': 0, 'retries': 0, 'failures': 0, 'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0, 'max_queue_depth': 0}
+
+
+class ApiScheduler:
+    def __init__(self, quotas=None, max_retries=5, base_delay=1.0, max_delay=64.0, burst=10):
+        self.quotas = DEFAULT_QUOTAS if quotas is None else quotas
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.burst = burst
+        self.buckets = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, key):
+        with self.lock:
+            if key not in self.buckets:
+                per_minute = self.quotas.get(key)
+                self.buckets[key] = TokenBucket(per_minute, self.burst) if per_minute else None
+                self.stats[key] = new_stats()
+            return self.buckets[key]
+
+    def reset_metrics(self):
+        # Starts the counters over (per daemon firing); the buckets keep their tokens
+        with self.lock:
+            self.stats = {key: new_stats() for key in self.buckets}
+
+    def record(self, key, **changes):
+        with self.lock:
+            stats = self.stats[key]
+            for name, value in changes.items():
+                if name.startswith('max_'):
+                    stats[name] = max(stats[name], value)
+                else:
+                    stats[name] += value
+
+    def backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after(error) or 0)
+
+    def execute(self, request, cost=1, idempotent=None):
+        # cost: quota units the request uses, e.g. one per call inside a batch;
+        # idempotent defaults to what the request's method says
+        if idempotent is None:
+            idempotent = is_idempotent(request)
+        key = classify(request)
+        bucket = self.bucket(key)
+        method_id = getattr(request, 'methodId', None) or 'unknown'
+        with tracing.span(method_id, kind='api', request_bytes=tracing.request_size(request)) as span:
+            for attempt in range(self.max_retries + 1):
+                span['attributes']['retries'] = attempt
+                if bucket is not None:
+                    self.record(key, max_queue_depth=bucket.waiting + 1)
+                    waited = bucket.acquire(cost)
+                    self.record(key, wait_seconds=waited, max_wait_seconds=waited)
+                    span['attributes']['quota_wait_seconds'] = round(
+                        span['attributes'].get('quota_wait_seconds', 0) + waited, 6)
+                self.record(key, calls=1)
+                try:
+                    response = request.execute()
+                    span['attributes']['response_bytes'] = tracing.payload_size(response)
+                    return response
+                except Exception as e:
+                    span['attributes']['http_status'] = error_status(e)
+                    if attempt == self.max_retries or not is_retryable(e, idempotent):
+                        self.record(key, failures=1)
+                        raise
+                    self.record(key, retries=1)
+                    time.sleep(self.backoff(attempt, e))
+
+    def metrics(self):
+        with self.lock:
+            return {
+                f"{api}.{kind}": dict(stats, queue_depth=self.buckets[(api, kind)].waiting
+                                      if self.buckets[(api, kind)] else 0)
+                for (api, kind), stats in self.stats.items()
+            }
+
+    def print_metrics(self):
+        print(f"\n{'API bucket':<14} {'calls':>6} {'retries':>8} {'failed':>7} {'wait s':>8} {'max wait':>9} {'max queue':>10}")
+        for name, m in sorted(self.metrics().items()):
+            print(f"{name:<14} {m['calls']:>6} {m['retries']:>8} {m['failures']:>7} "
+                  f"{m['wait_seconds']:>8.1f} {m['max_wait_seconds']:>9.2f} {m['max_queue_depth']:>10}")
+
+    def write_metrics(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.metrics(), f, indent=2)
+
+
+# Shared by every worker thread so the quotas are enforced for the whole process
+scheduler = ApiScheduler()
+
+
+def configure(**kwargs):
+    global scheduler
+    scheduler = ApiScheduler(**kwargs)
+    return scheduler
+
+
+def execute(request, cost=1, idempotent=None):
+    return scheduler.execute(request, cost, idempotent)
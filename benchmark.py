@@ -0,0 +1,602 @@
+# Benchmarks for the report pipeline, run against the local fakes in fake_services.py.
+#   python benchmark.py pipeline --events 100 --latency 0.05 --workers 1 2 4 8 16
+#   python benchmark.py pipeline --error-rate 0.1 --quota 600   (429s and rate limiting)
+#   python benchmark.py loader --sizes 1000 10000 100000 1000000
+#   python benchmark.py layout --reports 1000
+#   python benchmark.py startup --repeat 3
+#   python benchmark.py analytics --sizes 1000 100000 1000000 --devices 300
+#   python benchmark.py images --events 200 --logos 5
+#   python benchmark.py local --events 1000 --formats pptx pdf --processes 1 4 8
+#   python benchmark.py drive --events 500 --error-rate 0.05
+#   python benchmark.py schedule --events 100000 --changed 0.01
+#   python benchmark.py load --sizes 10 100 1000 --output load.json   (then --baseline load.json)
+import argparse
+import copy
+import gzip
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+
+from fake_services import build_fake_services
+
+
+def synthetic_events(count, source='event_data.json'):
+    # Clone the sample events, re-dated to today so they pass the end_date filter
+    with open(source, 'r') as f:
+        samples = json.load(f)['data']
+    today = str(datetime.today().date())
+    events = []
+    for i in range(count):
+        event = copy.deepcopy(samples[i % len(samples)])
+        event['event_title'] = f"{event.get('event_title', 'Untitled')} {i}"
+        event['event_uuid'] = f"evn-bench-{i:06d}"
+        event['end_date'] = today
+        events.append(event)
+    return events
+
+
+def bench_pipeline(args):
+    import contextlib
+    import io
+    import api_scheduler
+    import image_assets
+    import template_cache
+    from api_scheduler import DEFAULT_QUOTAS
+    from main import run_pipeline
+
+    # Fake Drive IDs stay out of the on-disk caches
+    image_assets.configure(path=None)
+    template_cache.configure(None)
+    events = synthetic_events(args.events)
+    # Unlimited by default so the numbers show pipeline scaling, not the quotas
+    quotas = {key: args.quota for key in DEFAULT_QUOTAS} if args.quota else {}
+    print(f"{'workers':>8} {'seconds':>9} {'events/s':>9} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        scheduler = api_scheduler.configure(quotas=quotas, base_delay=args.latency)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = run_pipeline(events, lambda: build_fake_services(args.latency, args.error_rate),
+                                   workers=workers)
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for r in results if r['error'] is not None)
+        if failed:
+            print(f"warning: {failed} events failed with {workers} workers")
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {len(events) / elapsed:>9.1f} {baseline / elapsed:>7.1f}x")
+        if args.verbose:
+            scheduler.print_metrics()
+
+
+def write_export(path, count, ndjson=False):
+    # Written one event at a time so 1M-event files never sit in memory
+    events = synthetic_events(2)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        if not ndjson:
+            f.write('{"data": [')
+        for i in range(count):
+            event = dict(events[i % len(events)], event_uuid=f"evn-bench-{i:07d}")
+            if ndjson:
+                f.write(json.dumps(event) + '\n')
+            else:
+                f.write((',' if i else '') + json.dumps(event))
+        if not ndjson:
+            f.write(']}')
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    matched = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return matched, elapsed, peak
+
+
+def bench_loader(args):
+    from event_loader import iter_events
+
+    today = str(datetime.today().date())
+
+    def json_load(path):
+        with open(path, 'r') as f:
+            return sum(1 for e in json.load(f)['data'] if e.get('end_date') == today)
+
+    print(f"{'events':>9} {'format':>12} {'loader':>8} {'seconds':>9} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for name in ('export.json', 'export.ndjson', 'export.json.gz'):
+                path = os.path.join(tmp, name)
+                write_export(path, size, ndjson=name.endswith('.ndjson'))
+                runs = [('stream', lambda: sum(1 for _ in iter_events(path, end_date=today)))]
+                if name == 'export.json' and size <= args.max_json_load:
+                    runs.insert(0, ('json.load', lambda: json_load(path)))
+                for loader, func in runs:
+                    _, elapsed, peak = measure(func)
+                    print(f"{size:>9} {name[7:]:>12} {loader:>8} {elapsed:>9.2f} {peak / 1e6:>9.1f}")
+                os.remove(path)
+
+
+def bench_layout(args):
+    from report_layout import build_report_layout, object_ids
+    from slide_layout import compile_slide
+
+    events = synthetic_events(args.reports)
+    sizes = []
+    start = time.perf_counter()
+    for event in events:
+        ids = object_ids(event)
+        layout = build_report_layout(event, 'sheet', [1, 2], ids)
+        requests = compile_slide(ids['slide'], layout)
+        sizes.append((len(requests), len(json.dumps({'requests': requests}))))
+    elapsed = time.perf_counter() - start
+    count = sum(n for n, _ in sizes) / len(sizes)
+    size = sum(b for _, b in sizes) / len(sizes)
+    print(f"{'requests':>9} {'bytes':>8} {'us/report':>10}")
+    print(f"{count:>9.1f} {size:>8.0f} {elapsed / len(events) * 1e6:>10.0f}")
+
+
+def synthetic_analytics(count, devices=20):
+    # One reading per device per minute, starting at midnight
+    start = datetime(2025, 3, 20)
+    return [{
+        'id': i,
+        'device_id': i % devices + 1,
+        'datetime': datetime.fromtimestamp(start.timestamp() + (i // devices) * 60).isoformat(),
+        'headcount': (i * 7919) % 250,
+        'inference_type': 'crowd_counting'
+    } for i in range(count)]
+
+
+def legacy_trend(event):
+    # The per-row loop create_sheet_and_charts used before analytics.py
+    trend_data = []
+    for entry in event.get('analytics', []):
+        time_str = entry.get('datetime', '').split('T')[1][:5]
+        trend_data.append([time_str, entry.get('headcount', 0)])
+    return trend_data
+
+
+def bench_analytics(args):
+    from analytics import device_matrix, device_rows, summarize, trend_rows
+
+    print(f"{'readings':>9} {'mode':>8} {'seconds':>9} {'rows':>8} {'cells':>9}")
+    for size in args.sizes:
+        event = {'analytics': synthetic_analytics(size, args.devices)}
+        for mode, func in (('per-row', lambda: legacy_trend(event)),
+                           ('numpy', lambda: trend_rows(summarize(event, args.points))),
+                           ('devices', lambda: device_rows(device_matrix(event, args.points), 8))):
+            start = time.perf_counter()
+            rows = func()
+            elapsed = time.perf_counter() - start
+            print(f"{size:>9} {mode:>8} {elapsed:>9.3f} {len(rows):>8} {sum(len(r) for r in rows):>9}")
+
+
+STARTUP_SCRIPT = '''
+import time
+start = time.perf_counter()
+from google.auth.credentials import AnonymousCredentials
+from google_services import build_services
+build_services(AnonymousCredentials(), discovery={mode!r})
+print(time.perf_counter() - start)
+'''
+
+
+def bench_startup(args):
+    # Each run is a fresh interpreter, like a cron container starting up
+    from google_services import DISCOVERY_CACHE_DIR
+
+    def run(mode):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(mode=mode)],
+                                check=True, capture_output=True, text=True).stdout
+        return float(output.split()[-1])
+
+    shutil.rmtree(DISCOVERY_CACHE_DIR, ignore_errors=True)
+    rows = [('cold (network)', 'network'), ('cache, first run', 'cache'),
+            ('cache, warm', 'cache'), ('static (bundled)', 'static')]
+    print(f"{'mode':<18} {'best s':>8} {'mean s':>8}")
+    for label, mode in rows:
+        repeat = 1 if label == 'cache, first run' else args.repeat
+        times = [run(mode) for _ in range(repeat)]
+        print(f"{label:<18} {min(times):>8.2f} {sum(times) / len(times):>8.2f}")
+
+
+def synthetic_png(width, height, shade):
+    # Solid-colour PNG, built by hand so the benchmark doesn't need Pillow
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    row = b'\x00' + bytes([shade, 255 - shade, 128]) * width
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+
+def bench_images(args):
+    import http.server
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from image_assets import ImageAssets
+
+    # Local stand-in for the image host: logos, per-device snapshots (every fifth
+    # one oversized), a broken file and a missing one
+    served = {f'logo-{i}': synthetic_png(400, 160, i * 40 % 256) for i in range(args.logos)}
+    served.update({f'snap-{i}': synthetic_png(*((4000, 3000) if i % 5 == 0 else (640, 360)), i % 256)
+                   for i in range(args.devices)})
+    served['broken'] = b'<html>not an image</html>'
+    hits = {'requests': 0, 'bytes': 0}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = served.get(self.path.rsplit('/', 1)[-1])
+            hits['requests'] += 1
+            if body is None:
+                self.send_error(404)
+                return
+            hits['bytes'] += len(body)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    template = f"http://127.0.0.1:{server.server_port}/images/{{id}}"
+
+    events = synthetic_events(args.events)
+    for i, event in enumerate(events):
+        event['latest_image_url_id'] = 'broken' if i % 50 == 49 else f'logo-{i % args.logos}'
+        devices = [{'id': d, 'latest_image_url_id': f'snap-{(i + d) % args.devices}'} for d in range(2)]
+        devices.append({'id': 2, 'latest_image_url_id': 'missing'})
+        event['devices'] = devices
+
+    _, drive, _ = build_fake_services(latency=args.latency)
+    assets = ImageAssets(template, path=None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        resolved = list(pool.map(lambda e: assets.resolve_event(drive, e), events))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    references = sum(1 + len(e['devices']) for e in events)
+    placed = sum(len(r) for r in resolved)
+    print(f"{references} image references across {len(events)} events; {placed} placed on slides")
+    print(f"image host: {hits['requests']} requests, {hits['bytes'] / 1e6:.1f} MB")
+    print(f"drive: {drive.calls} calls; " + ', '.join(f"{k} {v}" for k, v in assets.stats.items()))
+    print(f"{elapsed:.2f}s with {args.workers} workers")
+
+
+def bench_local(args):
+    from local_report import render_reports
+
+    events = synthetic_events(args.events)
+    print(f"{'format':>6} {'procs':>6} {'seconds':>8} {'events/min':>11} {'failed':>7}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for fmt in args.formats:
+            for processes in args.processes:
+                start = time.perf_counter()
+                results = render_reports(events, output_dir, fmt, processes=processes)
+                elapsed = time.perf_counter() - start
+                failed = sum(1 for r in results if r['error'] is not None)
+                print(f"{fmt:>6} {processes:>6} {elapsed:>8.2f} {len(events) / elapsed * 60:>11.0f} {failed:>7}")
+
+
+def bench_drive(args):
+    from concurrent.futures import ThreadPoolExecutor
+    import api_scheduler
+    import drive_ops
+
+    api_scheduler.configure(quotas={}, base_delay=0.01)
+    jobs = {i: ('template', {'name': f'HawkEye Report - {i}'}) for i in range(args.events)}
+    print(f"{'mode':>10} {'round trips':>12} {'seconds':>8} {'failed':>7}")
+
+    _, drive, _ = build_fake_services(latency=args.latency, error_rate=args.error_rate)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        failed = sum(1 for r in pool.map(
+            lambda job: _try(lambda: api_scheduler.execute(drive.files().copy(fileId=job[0], body=job[1]))),
+            jobs.values()) if isinstance(r, Exception))
+    print(f"{'per-call':>10} {drive.calls + drive.errors:>12} {time.perf_counter() - start:>8.2f} {failed:>7}")
+
+    _, drive, _ = build_fake_services(latency=args.latency, error_rate=args.error_rate)
+    start = time.perf_counter()
+    results = drive_ops.copy_files(drive, jobs)
+    print(f"{'batched':>10} {drive.batches:>12} {time.perf_counter() - start:>8.2f} "
+          f"{len(drive_ops.failures(results)):>7}")
+
+
+def synthetic_schedules(count, seed=0):
+    # Scheduling fields only: one-off events and every kind of repeat rule across timezones
+    import random
+    rng = random.Random(seed)
+    zones = ('UTC', 'Europe/London', 'America/New_York', 'Asia/Kolkata', 'Australia/Sydney')
+    rules = (('Oneoff', None, None), ('Recurring', 'Daily', None), ('Recurring', 'Weekly', None),
+             ('Recurring', 'Monthly', None), ('Recurring', 'Annually', None),
+             ('Recurring', 'None', '{m} {h} * * mon-fri'), ('Recurring', 'None', '{m} {h} 1,15 * *'))
+    today = datetime.today().date()
+    events = []
+    for i in range(count):
+        repeat_type, interval, cron = rules[i % len(rules)]
+        hour, minute = rng.randrange(24), rng.randrange(60)
+        day = str(today.fromordinal(today.toordinal() + rng.randrange(-30, 30)))
+        events.append({
+            'event_uuid': f"evn-sched-{i:06d}", 'repeat_type': repeat_type, 'event_interval': interval,
+            'repeat_every': rng.choice((1, 1, 2)), 'event_days': rng.choice(('Mon', 'Tue,Thu', 'Sat')),
+            'cron_expression': cron.format(m=minute, h=hour) if cron else None,
+            'timezone': rng.choice(zones), 'start_date': day, 'end_date': day,
+            'start_time': f"{hour:02d}:{minute:02d}:00", 'duration': rng.choice((0.5, 2, 3))
+        })
+    return events
+
+
+def bench_schedule(args):
+    import random
+    from datetime import timedelta, timezone
+    from report_scheduler import ReportPlanner
+
+    events = synthetic_schedules(args.events)
+    now = datetime.now(timezone.utc)
+    planner = ReportPlanner()
+    start = time.perf_counter()
+    planner.load(events, now)
+    print(f"{'step':>12} {'events':>8} {'seconds':>8}")
+    print(f"{'plan':>12} {len(planner.planned):>8} {time.perf_counter() - start:>8.2f}")
+
+    # An edited export: a share of events move by an hour, the rest are untouched
+    for event in random.Random(1).sample(events, int(len(events) * args.changed)):
+        event['start_time'] = f"{(int(event['start_time'][:2]) + 1) % 24:02d}{event['start_time'][2:]}"
+    start = time.perf_counter()
+    changed = planner.load(events, now)
+    print(f"{'re-plan':>12} {changed:>8} {time.perf_counter() - start:>8.2f}")
+
+    # A day of triggers, popped every minute and re-planned as the daemon does
+    fired = 0
+    start = time.perf_counter()
+    for minute in range(24 * 60):
+        moment = now + timedelta(minutes=minute)
+        due = planner.pop_due(moment)
+        fired += len(due)
+        for uuid in due:
+            planner.plan(uuid, moment)
+    print(f"{'24h fire':>12} {fired:>8} {time.perf_counter() - start:>8.2f}")
+
+
+def write_load_export(path, count, devices=8, readings=500, seed=0):
+    # Events ending today with `devices` cameras and `readings` analytics rows
+    # each, spread over the event. Event i is identical whatever the count and
+    # on every commit, so results stay comparable. Written one event at a time.
+    import random
+    from datetime import timedelta
+    day = datetime.today().date()
+    with open(path, 'w') as f:
+        f.write('{"data": [')
+        for i in range(count):
+            rng = random.Random(seed * 1000003 + i)
+            hours = rng.choice((1, 2, 3, 4))
+            start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(6 * 60, 19 * 60))
+            # Seconds between one device's readings
+            step = hours * 3600 // max(1, readings // max(devices, 1))
+            event = {
+                'event_title': f"Load test event {i}", 'event_uuid': f"evn-load-{i:07d}", 'id': i,
+                'repeat_type': 'Oneoff', 'event_interval': 'None', 'repeat_every': 1, 'cron_expression': None,
+                'timezone': 'UTC', 'start_date': str(day), 'end_date': str(day), 'duration': hours,
+                'start_time': start.strftime('%H:%M:%S'),
+                'end_time': (start + timedelta(hours=hours)).strftime('%H:%M:%S'),
+                'inference_type': ['crowd_counting'], 'latest_image_url_id': None,
+                'devices': [{
+                    'id': d + 1, 'uid': f"dev-load-{i}-{d}", 'device_name': f"Camera {d + 1}",
+                    'device_model': 'bench', 'placement': 'indoor', 'section_name': f"Section {chr(65 + d % 6)}",
+                    'section_capacity': 500, 'device_type': 'iot', 'status': 'online', 'disabled': False,
+                    'latest_image_url_id': None
+                } for d in range(devices)],
+                'analytics': [{
+                    'id': n + 1, 'device_id': n % devices + 1, 'event_id': i,
+                    'datetime': (start + timedelta(seconds=n // devices * step)).isoformat(),
+                    'headcount': rng.randrange(20, 400), 'artifact_type': 'image',
+                    'inference_type': 'crowd_counting', 'image_url_id': None
+                } for n in range(readings)],
+                'analytics_summary': {'average_count': 0, 'max_count': 0}
+            }
+            f.write((',' if i else '') + json.dumps(event))
+        f.write(']}')
+
+
+LOAD_SCRIPT = '''
+import contextlib, io, json, resource, time
+import api_scheduler, image_assets
+from fake_google_server import build_local_services
+from main import run_pipeline, select_events
+api_scheduler.configure(quotas={{}}, base_delay={base_delay})
+image_assets.configure(path=None)
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    events = select_events({path!r}, {date!r})
+    results = run_pipeline(events, lambda: build_local_services({url!r}), workers={workers})
+print(json.dumps({{'events': len(events), 'seconds': time.perf_counter() - start,
+                  'failed': sum(1 for r in results if r['error'] is not None),
+                  'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+'''
+
+# Lower is better for every metric except events_per_second
+LOAD_METRICS = ('events_per_second', 'calls_per_event', 'round_trips_per_event', 'bytes_sent_per_event',
+                'bytes_received_per_event', 'peak_rss_mb')
+
+
+def bench_load(args):
+    # End to end: export file -> event loader -> pipeline -> real googleapiclient
+    # -> local HTTP stand-in. Each size runs in a fresh interpreter so peak
+    # memory is that run's own.
+    from fake_google_server import FakeGoogleServer
+
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo, os.environ.get('PYTHONPATH')])))
+    server = FakeGoogleServer(latency=args.latency, error_rate=args.error_rate, quota=args.quota, seed=0).start()
+    commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo,
+                            capture_output=True, text=True).stdout.strip() or None
+    report = {'commit': commit, 'params': {key: getattr(args, key) for key in
+              ('devices', 'readings', 'workers', 'latency', 'error_rate', 'quota')}, 'sizes': {}}
+
+    print(f"{'events':>7} {'seconds':>8} {'events/s':>9} {'calls/ev':>9} {'trips/ev':>9} "
+          f"{'KB sent/ev':>11} {'KB recv/ev':>11} {'peak MB':>8} {'failed':>7}")
+    try:
+        for size in args.sizes:
+            # A fresh directory per size: template and image caches start cold every time
+            with tempfile.TemporaryDirectory() as workdir:
+                path = os.path.join(workdir, 'event_data.json')
+                write_load_export(path, size, args.devices, args.readings)
+                server.reset_stats()
+                script = LOAD_SCRIPT.format(path=path, date=str(datetime.today().date()), url=server.url,
+                                            workers=args.workers, base_delay=max(args.latency, 0.01))
+                output = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env,
+                                        check=True, capture_output=True, text=True).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            stats = server.stats()
+            events = max(run['events'], 1)
+            row = {
+                'events': run['events'], 'seconds': round(run['seconds'], 3), 'failed': run['failed'],
+                'events_per_second': round(run['events'] / run['seconds'], 2),
+                'calls_per_event': round(stats['calls'] / events, 2),
+                'round_trips_per_event': round(stats['round_trips'] / events, 2),
+                'bytes_sent_per_event': round(stats['request_bytes'] / events),
+                'bytes_received_per_event': round(stats['response_bytes'] / events),
+                'peak_rss_mb': round(run['peak_rss_kb'] / 1024, 1),
+                'methods': stats['methods']
+            }
+            report['sizes'][str(size)] = row
+            print(f"{size:>7} {row['seconds']:>8.2f} {row['events_per_second']:>9.1f} {row['calls_per_event']:>9.2f} "
+                  f"{row['round_trips_per_event']:>9.2f} {row['bytes_sent_per_event'] / 1024:>11.1f} "
+                  f"{row['bytes_received_per_event'] / 1024:>11.1f} {row['peak_rss_mb']:>8.1f} {row['failed']:>7}")
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+    if args.baseline and compare_load(args.baseline, report, args.tolerance):
+        sys.exit(1)
+
+
+def compare_load(baseline_path, report, tolerance):
+    # Prints each metric that got worse by more than `tolerance`; returns them
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('params') != report['params']:
+        print(f"warning: {baseline_path} was run with {baseline.get('params')}, not {report['params']}")
+    regressions = []
+    for size, row in report['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if not before:
+            continue
+        for metric in LOAD_METRICS:
+            old, new = before.get(metric), row[metric]
+            if not old:
+                continue
+            change = (old - new) / old if metric == 'events_per_second' else (new - old) / old
+            if change > tolerance:
+                regressions.append((size, metric, old, new))
+    for size, metric, old, new in regressions:
+        print(f"❌ {size} events: {metric} {old} -> {new} (baseline {baseline.get('commit')})")
+    if not regressions:
+        print(f"✅ No regressions beyond {tolerance:.0%} against {baseline.get('commit')}")
+    return regressions
+
+
+def _try(func):
+    try:
+        return func()
+    except Exception as e:
+        return e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report pipeline benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pipeline = commands.add_parser('pipeline', help='throughput from 1 to N workers')
+    pipeline.add_argument('--events', type=int, default=100)
+    pipeline.add_argument('--latency', type=float, default=0.05, help='seconds per fake API call')
+    pipeline.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    pipeline.add_argument('--error-rate', type=float, default=0.0, help='share of fake calls failing with 429')
+    pipeline.add_argument('--quota', type=int, help='requests per minute for every API bucket (default: unlimited)')
+    pipeline.add_argument('--verbose', action='store_true', help='print scheduler metrics per run')
+    pipeline.set_defaults(func=bench_pipeline)
+
+    loader = commands.add_parser('loader', help='event loader time and peak memory')
+    loader.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    loader.add_argument('--max-json-load', type=int, default=100000,
+                        help='largest file to also time with json.load')
+    loader.set_defaults(func=bench_loader)
+
+    layout = commands.add_parser('layout', help='Slides request list size and compile time per report')
+    layout.add_argument('--reports', type=int, default=1000)
+    layout.set_defaults(func=bench_layout)
+
+    startup = commands.add_parser('startup', help='service construction time: cold, warm and cached')
+    startup.add_argument('--repeat', type=int, default=3)
+    startup.set_defaults(func=bench_startup)
+
+    analytics = commands.add_parser('analytics', help='trend aggregation against the old per-row loop')
+    analytics.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000])
+    analytics.add_argument('--points', type=int, default=200)
+    analytics.add_argument('--devices', type=int, default=20, help='distinct device_ids in the readings')
+    analytics.set_defaults(func=bench_analytics)
+
+    images = commands.add_parser('images', help='image validation, dedupe and Drive uploads')
+    images.add_argument('--events', type=int, default=200)
+    images.add_argument('--logos', type=int, default=5, help='distinct venue logos')
+    images.add_argument('--devices', type=int, default=20, help='distinct device snapshots')
+    images.add_argument('--workers', type=int, default=8)
+    images.add_argument('--latency', type=float, default=0.05, help='seconds per fake Drive call')
+    images.set_defaults(func=bench_images)
+
+    local = commands.add_parser('local', help='local pptx/pdf rendering throughput over a process pool')
+    local.add_argument('--events', type=int, default=1000)
+    local.add_argument('--formats', nargs='+', choices=('pptx', 'pdf'), default=['pptx', 'pdf'])
+    local.add_argument('--processes', type=int, nargs='+', default=[1, 4, 8])
+    local.set_defaults(func=bench_local)
+
+    drive = commands.add_parser('drive', help='template copies one call each against Drive batches')
+    drive.add_argument('--events', type=int, default=500)
+    drive.add_argument('--latency', type=float, default=0.05, help='seconds per fake round trip')
+    drive.add_argument('--workers', type=int, default=8, help='threads for the one-call-each mode')
+    drive.add_argument('--error-rate', type=float, default=0.0, help='share of calls failing with 429')
+    drive.set_defaults(func=bench_drive)
+
+    schedule = commands.add_parser('schedule', help='daemon planning, re-planning and firing for N events')
+    schedule.add_argument('--events', type=int, default=100000)
+    schedule.add_argument('--changed', type=float, default=0.01, help='share of events edited before re-planning')
+    schedule.set_defaults(func=bench_schedule)
+
+    load = commands.add_parser('load', help='end to end through googleapiclient against a local fake Google server')
+    load.add_argument('--sizes', type=int, nargs='+', default=[10, 100], help='events per run, up to 100000')
+    load.add_argument('--devices', type=int, default=8, help='devices per event')
+    load.add_argument('--readings', type=int, default=500, help='analytics rows per event')
+    load.add_argument('--workers', type=int, default=8)
+    load.add_argument('--latency', type=float, default=0.05, help='seconds per HTTP round trip')
+    load.add_argument('--error-rate', type=float, default=0.0, help='share of calls failing with 429')
+    load.add_argument('--quota', type=int, help='server-side requests per minute per API (default: unlimited)')
+    load.add_argument('--output', help='write the results as JSON, to compare other commits against')
+    load.add_argument('--baseline', help='results JSON from an earlier commit; exits 1 on a regression')
+    load.add_argument('--tolerance', type=float, default=0.10, help='allowed change before it counts as a regression')
+    load.set_defaults(func=bench_load)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# Drive operations for a whole run sent as multipart HTTP batches
+# (new_batch_http_request, up to 100 calls each): template copies before the
+# workers start, then moving every report into a dated folder and sharing it
+# once they are done. Per-request callbacks route each result back to its
+# event, and calls rejected inside a batch for rate limiting are retried in
+# the next batch, after api_scheduler's backoff (honouring Retry-After).
+# Copies and permission creates that failed with a 5xx are not sent again.
+import time
+
+import api_scheduler
+from api_scheduler import error_status, execute, is_idempotent, is_retryable, retry_after
+
+# Drive accepts at most 100 calls in one batch request
+DRIVE_BATCH_LIMIT = 100
+MAX_ROUNDS = 5
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+
+class DriveBatch:
+    def __init__(self, drive_service, limit=DRIVE_BATCH_LIMIT, max_rounds=MAX_ROUNDS):
+        self.drive = drive_service
+        self.limit = limit
+        self.max_rounds = max_rounds
+        # (build the request, callback(response, error)); requests are rebuilt
+        # when they have to be sent again
+        self.ops = []
+        self.batches = 0
+
+    def add(self, make_request, callback):
+        self.ops.append((make_request, callback))
+
+    def execute(self):
+        pending = self.ops
+        self.ops = []
+        for round_number in range(self.max_rounds):
+            retry = []
+            errors = []
+            for first in range(0, len(pending), self.limit):
+                chunk = pending[first:first + self.limit]
+                self.send(chunk, retry, errors, last_round=round_number == self.max_rounds - 1)
+            if not retry:
+                return
+            # The longest Retry-After among the rejected calls holds for the next round
+            slowest = max(errors, key=lambda e: retry_after(e) or 0)
+            time.sleep(api_scheduler.scheduler.backoff(round_number, slowest))
+            pending = retry
+
+    def send(self, chunk, retry, errors, last_round):
+        def handler(op, idempotent):
+            def done(request_id, response, exception):
+                if exception is not None and is_retryable(exception, idempotent) and not last_round:
+                    retry.append(op)
+                    errors.append(exception)
+                else:
+                    op[1](response, exception)
+            return done
+
+        batch = self.drive.new_batch_http_request()
+        # Lets api_scheduler bucket and trace the batch as a Drive write; Drive
+        # counts every call inside it against the quota
+        batch.methodId = 'drive.batch'
+        idempotent = True
+        for index, op in enumerate(chunk):
+            request = op[0]()
+            idempotent = idempotent and is_idempotent(request)
+            batch.add(request, callback=handler(op, is_idempotent(request)), request_id=str(index))
+        self.batches += 1
+        try:
+            # A batch that failed as a whole may have run some of its calls
+            execute(batch, cost=len(chunk), idempotent=idempotent)
+        except Exception as e:
+            # The whole batch failed after the scheduler's own retries
+            for op in chunk:
+                op[1](None, e)
+
+
+def collect(results, key):
+    # Callback storing a result (or the error) under key
+    def callback(response, error):
+        results[key] = error if error is not None else response
+    return callback
+
+
+def copy_files(drive_service, jobs, fields='id,name'):
+    # jobs: {key: (source file ID, body)} -> {key: copied file or exception}
+    results = {}
+    batch = DriveBatch(drive_service)
+    for key, (file_id, body) in jobs.items():
+        batch.add(lambda file_id=file_id, body=body: drive_service.files().copy(
+            fileId=file_id, body=body, fields=fields), collect(results, key))
+    batch.execute()
+    return results
+
+
+def move_files(drive_service, file_ids, folder_id, from_folder='root'):
+    results = {}
+    batch = DriveBatch(drive_service)
+    for file_id in file_ids:
+        batch.add(lambda file_id=file_id: drive_service.files().update(
+            fileId=file_id, addParents=folder_id, removeParents=from_folder, fields='id,parents'),
+            collect(results, file_id))
+    batch.execute()
+    return results
+
+
+def share_files(drive_service, file_ids, grantees, role='reader'):
+    # grantees are email addresses, or "domain:example.com" for a whole domain
+    results = {}
+    batch = DriveBatch(drive_service)
+    for file_id in file_ids:
+        for grantee in grantees:
+            if grantee.startswith('domain:'):
+                body = {'type': 'domain', 'role': role, 'domain': grantee[len('domain:'):]}
+            else:
+                body = {'type': 'user', 'role': role, 'emailAddress': grantee}
+            batch.add(lambda file_id=file_id, body=body: drive_service.permissions().create(
+                fileId=file_id, body=body, sendNotificationEmail=False, fields='id'),
+                collect(results, (file_id, grantee)))
+    batch.execute()
+    return results
+
+
+def delete_files(drive_service, file_ids):
+    results = {}
+    batch = DriveBatch(drive_service)
+    for file_id in file_ids:
+        batch.add(lambda file_id=file_id: drive_service.files().delete(fileId=file_id),
+                  collect(results, file_id))
+    batch.execute()
+    return results
+
+
+def ensure_folder(drive_service, name, parent_id):
+    # Reuses the folder when a rerun on the same day finds it
+    escaped = name.replace('\\', '\\\\').replace("'", "\\'")
+    found = execute(drive_service.files().list(
+        q=f"name = '{escaped}' and '{parent_id}' in parents and mimeType = '{FOLDER_MIME_TYPE}' "
+          f"and trashed = false",
+        fields='files(id)', pageSize=1
+    ))
+    if found.get('files'):
+        return found['files'][0]['id']
+    folder = execute(drive_service.files().create(
+        body={'name': name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [parent_id]},
+        fields='id'
+    ))
+    print(f"✅ Folder created: https://drive.google.com/drive/folders/{folder['id']}")
+    return folder['id']
+
+
+def failures(results):
+    return {key: value for key, value in results.items() if isinstance(value, Exception)}
+
+
+def describe(error):
+    status = error_status(error)
+    return f"HTTP {status}" if status else repr(error)
@@ -0,0 +1,139 @@
+# Streaming reader for event exports. Events are yielded one at a time from the
+# top-level "data" array (or one per line for NDJSON), optionally gzip-compressed,
+# so memory stays flat no matter how many events the export holds.
+import gzip
+import json
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = '0123456789+-.eE'
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+_decoder = json.JSONDecoder()
+
+
+def open_text(path):
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic == b'\x1f\x8b':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def is_ndjson(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return name.endswith(NDJSON_SUFFIXES)
+
+
+# Incremental tokenizer over a text file that decodes one JSON value at a time
+class JsonStream:
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=CHUNK_SIZE):
+        if self.eof:
+            return False
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def separator(self, close):
+        # After a member: True when a comma says another one follows, False at
+        # the closing bracket
+        found = self.peek()
+        if found not in (',', close):
+            raise ValueError(f"Expected ',' or {close!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+        return found == ','
+
+    def decode(self):
+        found = self.peek()
+        if found and found in ',:]}':
+            # Caught here rather than by reading on to the end of the file
+            raise ValueError(f"Expected a value at offset {self.pos}, found {found!r}")
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Value is split across chunks; read at least as much again so
+                # very large events are not re-parsed once per chunk
+                if not self.fill(max(CHUNK_SIZE, len(self.buf) - self.pos)):
+                    raise
+                continue
+            # A bare number may continue in the next chunk ("12" + "3", "-0." + "5")
+            if (isinstance(value, (int, float)) and not self.buf[end:].strip(NUMBER_CHARS)
+                    and not self.eof and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array(stream):
+    stream.expect('[')
+    if stream.peek() == ']':
+        stream.pos += 1
+        return
+    while True:
+        yield stream.decode()
+        if not stream.separator(']'):
+            return
+
+
+def iter_json_array(f, key='data'):
+    stream = JsonStream(f)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        name = stream.decode()
+        if not isinstance(name, str):
+            raise ValueError(f"Expected a key before offset {stream.pos}, found {name!r}")
+        stream.expect(':')
+        if name != key:
+            stream.decode()
+        else:
+            yield from iter_array(stream)
+        if not stream.separator('}'):
+            return
+
+
+def iter_ndjson(f, end_date=None):
+    # Rows for other dates are skipped on the raw line, before any parsing
+    needle = f'"{end_date}"' if end_date else None
+    for line in f:
+        if not line.strip() or (needle and needle not in line):
+            continue
+        yield json.loads(line)
+
+
+def iter_events(path='event_data.json', end_date=None):
+    with open_text(path) as f:
+        if is_ndjson(path):
+            events = iter_ndjson(f, end_date)
+        else:
+            events = iter_json_array(f)
+        for event in events:
+            if end_date is None or event.get('end_date') == end_date:
+                yield event
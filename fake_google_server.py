@@ -0,0 +1,252 @@
+# Local HTTP stand-in for the Drive, Sheets and Slides REST endpoints this tool
+# calls, so load tests go through the real googleapiclient stack: URL building,
+# JSON and multipart serialization, Drive batch requests, HttpError and
+# Retry-After handling. Requests are routed to the handlers in fake_services.py,
+# which keep the copied files, spreadsheets and decks. The server adds latency
+# per round trip, random 429s and a per-API requests-per-minute quota, and
+# counts calls and bytes per API method.
+#   python fake_google_server.py --port 8089 --latency 0.05 --error-rate 0.01 --quota 300
+import argparse
+import collections
+import email
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+
+from fake_services import FakeDriveService, FakeSheetsService, FakeSlidesService
+from google_services import HTTP_TIMEOUT, SERVICES, CachedResources
+
+# (HTTP method, path, API, fake_services method); the first match wins
+ROUTES = [(method, re.compile(pattern), api, name) for method, pattern, api, name in (
+    ('POST', r'/drive/v3/files/(?P<fileId>[^/]+)/copy', 'drive', 'files.copy'),
+    ('POST', r'/drive/v3/files/(?P<fileId>[^/]+)/permissions', 'drive', 'permissions.create'),
+    ('DELETE', r'/drive/v3/files/(?P<fileId>[^/]+)/permissions/(?P<permissionId>[^/]+)', 'drive',
+     'permissions.delete'),
+    ('GET', r'/drive/v3/files/(?P<fileId>[^/]+)', 'drive', 'files.get'),
+    ('PATCH', r'/drive/v3/files/(?P<fileId>[^/]+)', 'drive', 'files.update'),
+    ('DELETE', r'/drive/v3/files/(?P<fileId>[^/]+)', 'drive', 'files.delete'),
+    ('GET', r'/drive/v3/files', 'drive', 'files.list'),
+    ('POST', r'(?:/upload)?/drive/v3/files', 'drive', 'files.create'),
+    ('POST', r'/v4/spreadsheets', 'sheets', 'spreadsheets.create'),
+    ('GET', r'/v4/spreadsheets/(?P<spreadsheetId>[^/:]+)', 'sheets', 'spreadsheets.get'),
+    ('PUT', r'/v4/spreadsheets/(?P<spreadsheetId>[^/:]+)/values/(?P<range>.+)', 'sheets',
+     'spreadsheets.values.update'),
+    ('POST', r'/v4/spreadsheets/(?P<spreadsheetId>[^/:]+)/values:batchUpdate', 'sheets',
+     'spreadsheets.values.batchUpdate'),
+    ('POST', r'/v4/spreadsheets/(?P<spreadsheetId>[^/:]+):batchUpdate', 'sheets', 'spreadsheets.batchUpdate'),
+    ('GET', r'/v1/presentations/(?P<presentationId>[^/:]+)', 'slides', 'presentations.get'),
+    ('POST', r'/v1/presentations/(?P<presentationId>[^/:]+):batchUpdate', 'slides', 'presentations.batchUpdate'),
+)]
+BATCH_PATH = '/batch/drive/v3'
+
+# Query parameters the fakes take as numbers
+INT_PARAMS = ('pageSize',)
+
+# Where googleapiclient sends requests; rewritten to the local server
+GOOGLE_ROOT = re.compile(r'^https://[a-z]+\.googleapis\.com/')
+
+STATUS_TEXT = {200: 'OK', 404: 'Not Found', 429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+
+def error_body(status, message, reason):
+    return json.dumps({'error': {'code': status, 'message': message, 'errors': [{'reason': reason}]}}).encode()
+
+
+class FakeGoogleServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, quota=None, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        # Requests per minute per API, like the per-project limits
+        self.quota = quota
+        self.random = random.Random(seed)
+        self.services = {'slides': FakeSlidesService(), 'drive': FakeDriveService(), 'sheets': FakeSheetsService()}
+        self.lock = threading.Lock()
+        self.windows = collections.defaultdict(collections.deque)
+        self.reset_stats()
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/"
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_stats(self):
+        with self.lock:
+            self.round_trips = 0
+            self.request_bytes = 0
+            self.response_bytes = 0
+            self.methods = collections.defaultdict(lambda: {'calls': 0, 'errors': 0})
+
+    def stats(self):
+        with self.lock:
+            return {
+                'round_trips': self.round_trips,
+                'calls': sum(m['calls'] for m in self.methods.values()),
+                'errors': sum(m['errors'] for m in self.methods.values()),
+                'request_bytes': self.request_bytes,
+                'response_bytes': self.response_bytes,
+                'methods': {f"{api}.{name}": dict(m) for (api, name), m in sorted(self.methods.items())}
+            }
+
+    def refuse(self, api):
+        # A 429 (status, headers, body) for injected errors and exhausted quotas
+        with self.lock:
+            if self.error_rate and self.random.random() < self.error_rate:
+                return 429, {'Retry-After': '0'}, error_body(429, 'Rate Limit Exceeded', 'rateLimitExceeded')
+            if self.quota:
+                now = time.monotonic()
+                window = self.windows[api]
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= self.quota:
+                    retry_after = max(1, int(60 - (now - window[0])) + 1)
+                    return 429, {'Retry-After': str(retry_after)}, error_body(
+                        429, f"Quota exceeded for {api} requests per minute", 'userRateLimitExceeded')
+                window.append(now)
+        return None
+
+    def call(self, http_method, target, headers, body):
+        # One API call -> (status, response headers, response body)
+        url = urllib.parse.urlsplit(target)
+        for method, pattern, api, name in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if method == http_method and match:
+                break
+        else:
+            return 404, {}, error_body(404, f"No route for {http_method} {url.path}", 'notFound')
+
+        refusal = self.refuse(api)
+        with self.lock:
+            self.methods[(api, name)]['calls'] += 1
+            if refusal:
+                self.methods[(api, name)]['errors'] += 1
+        if refusal:
+            return refusal
+
+        kwargs = {key: urllib.parse.unquote(value) for key, value in match.groupdict().items()}
+        for key, value in urllib.parse.parse_qsl(url.query):
+            if key != 'alt':
+                kwargs[key] = int(value) if key in INT_PARAMS else value
+        content_type = headers.get('Content-Type', '')
+        if content_type.startswith('multipart/related'):
+            # Media upload: JSON metadata first, then the file itself
+            parts = email.message_from_bytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+            kwargs['body'] = json.loads(parts.get_payload()[0].get_payload())
+            kwargs['media_body'] = None
+        elif body:
+            kwargs['body'] = json.loads(body)
+        try:
+            response = self.services[api].handle(name, kwargs)
+        except Exception as e:
+            return 500, {}, error_body(500, repr(e), 'backendError')
+        return 200, {'Content-Type': 'application/json; charset=UTF-8'}, json.dumps(response).encode()
+
+    def batch(self, headers, body):
+        # multipart/mixed in, multipart/mixed out; every part is its own call
+        content_type = headers.get('Content-Type', '')
+        message = email.message_from_bytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+        boundary = f"batch_{self.random.getrandbits(64):016x}"
+        out = []
+        for part in message.get_payload():
+            raw = part.get_payload().replace('\r\n', '\n')
+            head, _, inner_body = raw.partition('\n\n')
+            lines = head.split('\n')
+            http_method, target, _ = lines[0].split(' ', 2)
+            inner_headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+            inner_headers = {key.title(): value for key, value in inner_headers.items()}
+            status, response_headers, response_body = self.call(
+                http_method, target, inner_headers, inner_body.encode())
+            content_id = part['Content-ID'] or '<+0>'
+            response_headers = ''.join(f"{key}: {value}\r\n" for key, value in response_headers.items())
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:]}\r\n\r\n"
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n{response_headers}"
+                f"Content-Length: {len(response_body)}\r\n\r\n{response_body.decode()}\r\n")
+        out.append(f"--{boundary}--\r\n")
+        return 200, {'Content-Type': f'multipart/mixed; boundary={boundary}'}, ''.join(out).encode()
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the httplib2 connections googleapiclient reuses
+            protocol_version = 'HTTP/1.1'
+
+            def handle_any(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if server.latency:
+                    time.sleep(server.latency)
+                if urllib.parse.urlsplit(self.path).path == BATCH_PATH:
+                    status, headers, payload = server.batch(self.headers, body)
+                else:
+                    status, headers, payload = server.call(self.command, self.path, self.headers, body)
+                with server.lock:
+                    server.round_trips += 1
+                    server.request_bytes += len(body)
+                    server.response_bytes += len(payload)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_any
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class RedirectHttp(httplib2.Http):
+    # Sends every request for a googleapis.com host to the local server
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def request(self, uri, *args, **kwargs):
+        return super().request(GOOGLE_ROOT.sub(self.base_url, uri, count=1), *args, **kwargs)
+
+
+def build_local_services(base_url):
+    # Real googleapiclient services in main.build_services' (slides, drive, sheets)
+    # order, sharing one connection to the local server
+    from googleapiclient.discovery import build
+    http = RedirectHttp(base_url, timeout=HTTP_TIMEOUT)
+    return tuple(CachedResources(build(name, version, http=http, static_discovery=True))
+                 for name, version in SERVICES)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve fake Drive, Sheets and Slides endpoints locally')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per HTTP round trip')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of calls failing with 429')
+    parser.add_argument('--quota', type=int, help='requests per minute per API (default: unlimited)')
+    args = parser.parse_args(argv)
+
+    server = FakeGoogleServer(port=args.port, latency=args.latency, error_rate=args.error_rate, quota=args.quota)
+    print(f"✅ Serving fake Google APIs at {server.url} (Ctrl-C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+# Local stand-ins for the Drive, Sheets and Slides services used by main.py.
+# They follow the googleapiclient call shape (service.resource().method(**kw).execute())
+# and sleep for `latency` seconds per call so pipeline throughput can be measured offline.
+# With error_rate > 0 a share of calls fail with 429 and a Retry-After header.
+# A Recorder passed to the services keeps every call's parameters, which is how
+# --dry-run emits full request payloads without touching Google.
+import base64
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+
+# Shared by every fake so IDs stay unique across worker threads
+_ids = itertools.count(1)
+
+
+class FakeResponse(dict):
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+# Same shape as googleapiclient.errors.HttpError: .resp.status, .resp headers, .content
+class FakeHttpError(Exception):
+    def __init__(self, status, headers=None, content=b''):
+        super().__init__(f"HTTP {status}")
+        self.resp = FakeResponse(status, headers)
+        self.content = content
+
+
+class FakeCall:
+    def __init__(self, service, path, kwargs):
+        self.service = service
+        self.path = path
+        self.kwargs = kwargs
+        self.methodId = f"{service.name}.{path}"
+
+    def execute(self):
+        if self.service.latency:
+            time.sleep(self.service.latency)
+        return self.run()
+
+    def run(self):
+        if self.service.error_rate and random.random() < self.service.error_rate:
+            with self.service.lock:
+                self.service.errors += 1
+            raise FakeHttpError(429, {'retry-after': str(self.service.retry_after)})
+        return self.service.handle(self.path, self.kwargs)
+
+
+# Same shape as googleapiclient.http.BatchHttpRequest: one round trip (one
+# latency) for all added calls, each of which can fail on its own
+class FakeBatch:
+    def __init__(self, service, callback=None):
+        self.service = service
+        self.callback = callback
+        self.calls = []
+
+    def add(self, request, callback=None, request_id=None):
+        if len(self.calls) >= 1000:
+            raise ValueError("BatchHttpRequest can only hold 1000 requests")
+        request_id = str(len(self.calls)) if request_id is None else request_id
+        self.calls.append((request_id, request, callback or self.callback))
+
+    def execute(self):
+        if self.service.latency:
+            time.sleep(self.service.latency)
+        with self.service.lock:
+            self.service.batches += 1
+        for request_id, request, callback in self.calls:
+            response, exception = None, None
+            try:
+                response = request.run()
+            except FakeHttpError as e:
+                exception = e
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class FakeResource:
+    def __init__(self, service, path):
+        self.service = service
+        self.path = path
+
+    def __getattr__(self, name):
+        path = f"{self.path}.{name}" if self.path else name
+
+        def method(**kwargs):
+            # Sub-resources are called without arguments, API methods always take some
+            if not kwargs:
+                return FakeResource(self.service, path)
+            return FakeCall(self.service, path, kwargs)
+        return method
+
+
+class FakeService(FakeResource):
+    name = 'fake'
+
+    def __init__(self, latency=0.0, error_rate=0.0, retry_after=0, recorder=None):
+        super().__init__(self, '')
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.recorder = recorder
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.batches = 0
+
+    def handle(self, path, kwargs):
+        with self.lock:
+            self.calls += 1
+            handler = getattr(self, 'do_' + path.replace('.', '_'), None)
+            if handler is None:
+                raise NotImplementedError(f"Fake {type(self).__name__} has no handler for {path}")
+            response = handler(**kwargs)
+        if self.recorder is not None:
+            self.recorder.record(self.name, path, kwargs, response)
+        return response
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def new_id(self):
+        # 44-character URL-safe IDs shaped like real Drive file IDs
+        digest = hashlib.sha256(f"{self.name}:{next(_ids)}".encode()).digest()
+        return '1' + base64.urlsafe_b64encode(digest).decode()[:43]
+
+
+class FakeDriveService(FakeService):
+    name = 'drive'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.copies = {}
+
+    def do_files_copy(self, fileId, body, **kwargs):
+        file_id = self.new_id()
+        self.copies[file_id] = {'id': file_id, 'name': body.get('name'), 'copiedFrom': fileId,
+                                'parents': body.get('parents', ['root'])}
+        return {'id': file_id, 'name': body.get('name')}
+
+    def do_files_get(self, fileId, **kwargs):
+        return {'id': fileId, 'version': '1', 'modifiedTime': '2025-03-01T00:00:00.000Z'}
+
+    def do_files_create(self, body, media_body=None, **kwargs):
+        file_id = self.new_id()
+        self.copies[file_id] = {'id': file_id, 'name': body.get('name'), 'mimeType': body.get('mimeType'),
+                                'parents': body.get('parents', ['root'])}
+        return {'id': file_id, 'name': body.get('name'),
+                'webContentLink': f"https://drive.google.com/uc?id={file_id}&export=download"}
+
+    def do_files_list(self, q='', **kwargs):
+        # Only the folder lookup in drive_ops is supported: name and parent
+        files = [f for f in self.copies.values()
+                 if f"name = '{f.get('name')}'" in q and any(f"'{p}' in parents" in q for p in f['parents'])]
+        return {'files': [{'id': f['id']} for f in files[:kwargs.get('pageSize', 100)]]}
+
+    def do_files_update(self, fileId, addParents=None, removeParents=None, **kwargs):
+        # Files made through the Sheets API are unknown here and live in My Drive
+        file = self.copies.setdefault(fileId, {'id': fileId, 'parents': ['root']})
+        parents = [p for p in file['parents'] if p not in (removeParents or '').split(',')]
+        file['parents'] = parents + [p for p in (addParents or '').split(',') if p]
+        return {'id': fileId, 'parents': file['parents']}
+
+    def do_files_delete(self, fileId, **kwargs):
+        self.copies.pop(fileId, None)
+        return {}
+
+    def do_permissions_create(self, fileId, body, **kwargs):
+        return {'id': self.new_id(), 'type': body.get('type'), 'role': body.get('role')}
+
+    def do_permissions_delete(self, fileId, permissionId, **kwargs):
+        return {}
+
+
+class FakeSheetsService(FakeService):
+    name = 'sheets'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spreadsheets_by_id = {}
+
+    def do_spreadsheets_create(self, body, **kwargs):
+        spreadsheet_id = self.new_id()
+        sheets = []
+        # Like the real API, a spreadsheet created without tabs gets "Sheet1"
+        for index, sheet in enumerate(body.get('sheets') or [{'properties': {'title': 'Sheet1'}}]):
+            properties = dict(sheet.get('properties', {}))
+            properties.setdefault('sheetId', index)
+            properties.setdefault('index', index)
+            sheets.append({'properties': properties, 'charts': []})
+        self.spreadsheets_by_id[spreadsheet_id] = {'sheets': sheets, 'next_chart_id': 1}
+        return {'spreadsheetId': spreadsheet_id, 'properties': body.get('properties', {}), 'sheets': sheets}
+
+    def do_spreadsheets_get(self, spreadsheetId, **kwargs):
+        spreadsheet = self.spreadsheets_by_id[spreadsheetId]
+        return {'spreadsheetId': spreadsheetId, 'sheets': spreadsheet['sheets']}
+
+    def do_spreadsheets_values_update(self, spreadsheetId, range, body, **kwargs):
+        return {'spreadsheetId': spreadsheetId, 'updatedRange': range, 'updatedRows': len(body.get('values', []))}
+
+    def do_spreadsheets_values_batchUpdate(self, spreadsheetId, body, **kwargs):
+        data = body.get('data', [])
+        return {
+            'spreadsheetId': spreadsheetId,
+            'totalUpdatedRows': sum(len(d.get('values', [])) for d in data),
+            'responses': [{'updatedRange': d['range']} for d in data]
+        }
+
+    def do_spreadsheets_batchUpdate(self, spreadsheetId, body, **kwargs):
+        # Spreadsheets made by an earlier process (incremental runs) start out empty
+        spreadsheet = self.spreadsheets_by_id.setdefault(spreadsheetId, {'sheets': [], 'next_chart_id': 1})
+        sheets_by_id = {s['properties']['sheetId']: s for s in spreadsheet['sheets']}
+        replies = []
+        for request in body.get('requests', []):
+            if 'addChart' in request:
+                chart = dict(request['addChart']['chart'])
+                chart.setdefault('chartId', spreadsheet['next_chart_id'])
+                spreadsheet['next_chart_id'] = max(spreadsheet['next_chart_id'], chart['chartId']) + 1
+                anchor = chart['position']['overlayPosition']['anchorCell']['sheetId']
+                sheets_by_id[anchor]['charts'].append(chart)
+                replies.append({'addChart': {'chart': chart}})
+            elif 'addSheet' in request:
+                properties = dict(request['addSheet'].get('properties', {}))
+                properties.setdefault('sheetId', max(sheets_by_id, default=-1) + 1)
+                sheet = {'properties': properties, 'charts': []}
+                spreadsheet['sheets'].append(sheet)
+                sheets_by_id[properties['sheetId']] = sheet
+                replies.append({'addSheet': {'properties': properties}})
+            elif 'deleteSheet' in request:
+                deleted = request['deleteSheet']['sheetId']
+                spreadsheet['sheets'] = [s for s in spreadsheet['sheets'] if s['properties']['sheetId'] != deleted]
+                sheets_by_id.pop(deleted, None)
+                replies.append({})
+            else:
+                replies.append({})
+        return {'spreadsheetId': spreadsheetId, 'replies': replies}
+
+
+class FakeSlidesService(FakeService):
+    name = 'slides'
+
+    def __init__(self, *args, template_slides=('p', 'p2'), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.template_slides = list(template_slides)
+        self.presentations_by_id = {}
+
+    def slides_for(self, presentation_id):
+        # Copies made by FakeDriveService start out with the template's slides
+        return self.presentations_by_id.setdefault(presentation_id, list(self.template_slides))
+
+    def do_presentations_get(self, presentationId, **kwargs):
+        slides = self.slides_for(presentationId)
+        return {
+            'presentationId': presentationId,
+            # Portrait US Letter, like the report template
+            'pageSize': {'width': {'magnitude': 7772400, 'unit': 'EMU'},
+                         'height': {'magnitude': 10058400, 'unit': 'EMU'}},
+            'slides': [{'objectId': s} for s in slides]
+        }
+
+    def do_presentations_batchUpdate(self, presentationId, body, **kwargs):
+        slides = self.slides_for(presentationId)
+        replies = []
+        for request in body.get('requests', []):
+            if 'createSlide' in request:
+                create = request['createSlide']
+                object_id = create.get('objectId') or self.new_id()
+                slides.insert(create.get('insertionIndex', len(slides)), object_id)
+                replies.append({'createSlide': {'objectId': object_id}})
+            elif 'deleteObject' in request and request['deleteObject']['objectId'] in slides:
+                slides.remove(request['deleteObject']['objectId'])
+                replies.append({})
+            else:
+                replies.append({})
+        return {'presentationId': presentationId, 'replies': replies}
+
+
+def build_fake_services(latency=0.0, error_rate=0.0, recorder=None):
+    # Same (slides, drive, sheets) order as main.build_services
+    options = {'latency': latency, 'error_rate': error_rate, 'recorder': recorder}
+    return FakeSlidesService(**options), FakeDriveService(**options), FakeSheetsService(**options)
+
+
+# IDs a call touched, either as a parameter or in its response
+ID_KEYS = ('spreadsheetId', 'presentationId', 'fileId', 'id')
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def record(self, api, method, params, response):
+        ids = {params.get(k) for k in ID_KEYS} | {response.get(k) for k in ID_KEYS}
+        ids.discard(None)
+        if 'media_body' in params:
+            # Upload bodies are recorded by type and size, not content
+            media = params['media_body']
+            params = dict(params, media_body={'mimetype': media.mimetype(), 'size': media.size()})
+        with self.lock:
+            self.calls.append({'api': api, 'method': method, 'params': params, 'ids': ids})
+
+    def write_jsonl(self, path, results):
+        # One line per event with the calls on its own spreadsheet and deck; calls on
+        # resources shared by several events (template, shared workbook, deck) go
+        # on a final "shared" line
+        owners = {}
+        for r in results:
+            report = r['report'] or {}
+            for resource_id in (report.get('sheet_id'), report.get('presentation_id')):
+                if resource_id:
+                    owners.setdefault(resource_id, set()).add(id(r))
+
+        lines = {id(r): [] for r in results}
+        shared = []
+        for call in self.calls:
+            events = set().union(*(owners.get(i, set()) for i in call['ids']))
+            entry = {'api': call['api'], 'method': call['method'], 'params': call['params']}
+            (lines[events.pop()] if len(events) == 1 else shared).append(entry)
+
+        with open(path, 'w') as f:
+            for r in results:
+                f.write(json.dumps({
+                    'event_uuid': r['event'].get('event_uuid'),
+                    'event_title': r['event'].get('event_title'),
+                    'seconds': r.get('seconds'),
+                    'error': repr(r['error']) if r['error'] else None,
+                    'calls': lines[id(r)]
+                }) + '\n')
+            f.write(json.dumps({'event_uuid': None, 'shared': True, 'calls': shared}) + '\n')
@@ -0,0 +1,133 @@
+# Credentials and service construction for the Slides, Drive and Sheets APIs.
+# Startup cost in short-lived containers is dominated by discovery documents and
+# TLS handshakes, so services are built from the discovery documents bundled
+# with googleapiclient (or an on-disk cache) and the three services built for
+# a thread share one authorized, keep-alive HTTP transport.
+from datetime import datetime, timedelta
+import hashlib
+import os
+import os.path
+import threading
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import Resource, build
+from googleapiclient.discovery_cache.base import Cache
+
+from storage import atomic_write
+
+SCOPES = [
+    'https://www.googleapis.com/auth/presentations',
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/spreadsheets'
+]
+
+TOKEN_PATH = 'token.json'
+DISCOVERY_CACHE_DIR = '.discovery_cache'
+HTTP_TIMEOUT = 120
+
+# Refresh tokens this long before they expire so a run never starts on a token
+# that dies halfway through
+REFRESH_MARGIN = timedelta(minutes=10)
+
+# (name, version) in the same order main.py unpacks them
+SERVICES = (('slides', 'v1'), ('drive', 'v3'), ('sheets', 'v4'))
+
+DISCOVERY_MODES = ('static', 'cache', 'network')
+
+_refresh_lock = threading.Lock()
+
+
+def expires_soon(creds):
+    # google-auth keeps expiry as a naive UTC datetime
+    return creds.expiry is not None and creds.expiry - datetime.utcnow() < REFRESH_MARGIN
+
+
+def get_credentials():
+    creds = None
+    if os.path.exists(TOKEN_PATH):
+        creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
+    if not creds or not creds.valid or expires_soon(creds):
+        if creds and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
+            creds = flow.run_local_server(port=0)
+        with open(TOKEN_PATH, 'w') as token:
+            token.write(creds.to_json())
+    return creds
+
+
+def ensure_fresh(creds):
+    # Shared by every worker; only one thread refreshes an expiring token
+    with _refresh_lock:
+        if getattr(creds, 'refresh_token', None) and (not creds.valid or expires_soon(creds)):
+            creds.refresh(Request())
+    return creds
+
+
+class DiscoveryFileCache(Cache):
+    def __init__(self, directory=DISCOVERY_CACHE_DIR):
+        self.directory = directory
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self.path(url), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, url, content):
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(self.path(url), content)
+
+
+class CachedResources:
+    # googleapiclient builds a new Resource, with docstrings rendered from
+    # every method's schemas, on each service.files() or
+    # service.spreadsheets() call; across a run that is most of the process'
+    # memory. This wrapper builds each (sub-)resource once per service set.
+    def __init__(self, resource):
+        self._resource = resource
+        self._children = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._resource, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            # Sub-resources take no arguments; API methods go straight through
+            if args or kwargs:
+                return attr(*args, **kwargs)
+            if name not in self._children:
+                result = attr()
+                if not isinstance(result, Resource):
+                    return result
+                self._children[name] = CachedResources(result)
+            return self._children[name]
+        return call
+
+
+def authorized_http(creds):
+    # httplib2 keeps one keep-alive connection per host, so the three services
+    # reuse their TLS sessions; an Http object must stay on a single thread
+    return google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
+
+def build_services(creds, discovery='static'):
+    ensure_fresh(creds)
+    http = authorized_http(creds)
+    if discovery == 'static':
+        options = {'static_discovery': True}
+    elif discovery == 'cache':
+        options = {'static_discovery': False, 'cache_discovery': True, 'cache': DiscoveryFileCache()}
+    else:
+        options = {'static_discovery': False, 'cache_discovery': False}
+    return tuple(CachedResources(build(name, version, http=http, **options)) for name, version in SERVICES)
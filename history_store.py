@@ -0,0 +1,142 @@
+# Local SQLite store of past analytics readings, keyed by event, device and
+# timestamp, so "same window last period" comparisons are an indexed range
+# scan instead of a rescan of every historical export. Events without history
+# of their own (one-offs) are compared with earlier readings from the same
+# devices. Past windows are aggregated by analytics.summarize, exactly like the
+# current one.
+#   python history_store.py ingest old_exports/*.json.gz --db history.db
+import argparse
+from datetime import datetime, timedelta
+
+from analytics import DEFAULT_TREND_POINTS, summarize
+from event_loader import iter_events
+from storage import thread_connections
+
+HISTORY_PATH = 'history.db'
+
+# "vs last month" compares against the same window this many days earlier
+DEFAULT_PERIOD_DAYS = 30
+
+# Device UIDs per query, under SQLite's bound-parameter limit
+DEVICE_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    event_uuid TEXT NOT NULL,
+    device_id INTEGER NOT NULL,
+    device_uid TEXT,
+    ts TEXT NOT NULL,
+    reading_id INTEGER NOT NULL,
+    headcount REAL NOT NULL,
+    inference_type TEXT,
+    PRIMARY KEY (event_uuid, ts, device_id, reading_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS readings_device_ts ON readings (device_uid, ts);
+"""
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.connection = thread_connections(path)
+        self.connection().executescript(SCHEMA)
+
+    def ingest(self, events, batch_size=50000):
+        # Streams: rows are written in batches so whole exports never sit in memory
+        total = 0
+        rows = []
+        for event in events:
+            uids = {device.get('id'): device.get('uid') for device in event.get('devices', [])}
+            for entry in event.get('analytics', []):
+                if not entry.get('datetime'):
+                    continue
+                rows.append((event.get('event_uuid'), entry.get('device_id') or 0,
+                             uids.get(entry.get('device_id')), entry['datetime'],
+                             entry.get('id') or 0, entry.get('headcount') or 0,
+                             entry.get('inference_type')))
+            if len(rows) >= batch_size:
+                total += self.write(rows)
+                rows = []
+        return total + self.write(rows)
+
+    def write(self, rows):
+        db = self.connection()
+        with db:
+            db.executemany('INSERT OR IGNORE INTO readings VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def event_readings(self, event_uuid, start, end):
+        # The event's readings in [start, end] as analytics records
+        cursor = self.connection().execute(
+            'SELECT device_id, ts, headcount, inference_type FROM readings '
+            'WHERE event_uuid = ? AND ts >= ? AND ts <= ?', (event_uuid, start, end))
+        return [{'device_id': device, 'datetime': ts, 'headcount': headcount, 'inference_type': kind}
+                for device, ts, headcount, kind in cursor]
+
+    def device_readings(self, device_ids, start, end):
+        # Readings in [start, end] from the given devices ({uid: device id}),
+        # whatever event they were part of; device IDs are the current event's
+        db = self.connection()
+        uids = list(device_ids)
+        rows = []
+        for first in range(0, len(uids), DEVICE_CHUNK):
+            chunk = uids[first:first + DEVICE_CHUNK]
+            cursor = db.execute(
+                f"SELECT device_uid, ts, headcount, inference_type FROM readings "
+                f"WHERE device_uid IN ({','.join('?' * len(chunk))}) AND ts >= ? AND ts <= ?",
+                (*chunk, start, end))
+            rows.extend({'device_id': device_ids[uid], 'datetime': ts, 'headcount': headcount,
+                         'inference_type': kind} for uid, ts, headcount, kind in cursor)
+        return rows
+
+    def previous_period(self, event, period_days=DEFAULT_PERIOD_DAYS, points=DEFAULT_TREND_POINTS):
+        # Same time window as the event's current analytics, period_days earlier
+        stamps = [entry['datetime'] for entry in event.get('analytics', []) if entry.get('datetime')]
+        if not stamps:
+            return None
+        shift = timedelta(days=period_days)
+        start = (datetime.fromisoformat(min(stamps)) - shift).isoformat()
+        end = (datetime.fromisoformat(max(stamps)) - shift).isoformat()
+        readings = self.event_readings(event.get('event_uuid'), start, end)
+        if not readings:
+            # One-off events never repeat under their own UUID: use the same devices
+            device_ids = {device['uid']: device.get('id') or 0
+                          for device in event.get('devices', []) if device.get('uid')}
+            readings = self.device_readings(device_ids, start, end) if device_ids else []
+        return window_stats(readings, points)
+
+
+def window_stats(readings, points=DEFAULT_TREND_POINTS):
+    # Bucketed per device and summed across devices, like the current period's KPIs
+    if not readings:
+        return None
+    stats = summarize({'analytics': readings}, points)
+    return {'points': len(stats['totals']), 'average': stats['average'], 'peak': stats['peak']}
+
+
+# Set by configure(); report code compares against history only when a store is open
+store = None
+
+
+def configure(path=HISTORY_PATH):
+    global store
+    store = HistoryStore(path)
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load analytics history from event exports')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help='add every reading in the given exports')
+    ingest.add_argument('exports', nargs='+')
+    ingest.add_argument('--db', default=HISTORY_PATH)
+    args = parser.parse_args(argv)
+
+    history = HistoryStore(args.db)
+    for path in args.exports:
+        count = history.ingest(iter_events(path))
+        print(f"✅ {path}: {count} readings")
+
+
+if __name__ == '__main__':
+    main()
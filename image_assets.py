@@ -0,0 +1,311 @@
+# Images placed on report slides (venue logo, device snapshots). Slides fetches
+# createImage URLs itself and fails the whole batchUpdate when one is unreachable
+# or too large, so images are fetched and checked here first, downsized when
+# Pillow is installed, deduplicated by content hash and uploaded to Drive once.
+# Every slide that shows the same image reuses the cached Drive file. Uploads
+# stay private: Slides copies an image when it is inserted, so files are shared
+# with anyone holding the link only while the batchUpdate that places them runs.
+import contextlib
+import hashlib
+import io
+import json
+import os.path
+import struct
+import threading
+import urllib.request
+
+from api_scheduler import error_status, execute
+from storage import write_json
+from tracing import span
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_PATH = 'image_cache.json'
+FETCH_TIMEOUT = 15
+
+# Slides rejects images over 50 MB or 25 megapixels
+MAX_IMAGE_BYTES = 50 * 1024 * 1024
+MAX_IMAGE_PIXELS = 25_000_000
+
+# Longest side after downsizing; a full-width image on the page is 532pt
+MAX_IMAGE_SIDE = 1600
+
+MAGIC_TYPES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def fetch_image(url, timeout=FETCH_TIMEOUT):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = response.read(MAX_IMAGE_BYTES + 1)
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ValueError(f"larger than {MAX_IMAGE_BYTES} bytes")
+    return data
+
+
+def image_type(data):
+    for magic, mime_type in MAGIC_TYPES:
+        if data.startswith(magic):
+            return mime_type
+    raise ValueError("not a PNG, JPEG or GIF image")
+
+
+def header_size(data, mime_type):
+    # (width, height) from the file header, without decoding the image
+    try:
+        if mime_type == 'image/png':
+            return struct.unpack('>II', data[16:24])
+        if mime_type == 'image/gif':
+            return struct.unpack('<HH', data[6:10])
+        # JPEG: walk the segments to the start-of-frame marker
+        offset = 2
+        while offset + 9 <= len(data):
+            marker, length = data[offset + 1], struct.unpack('>H', data[offset + 2:offset + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + length
+    except (struct.error, IndexError):
+        pass
+    raise ValueError("truncated image header")
+
+
+def prepare_image(data):
+    # Returns (bytes, mime type) ready to upload, or raises ValueError
+    mime_type = image_type(data)
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ValueError(f"larger than {MAX_IMAGE_BYTES} bytes")
+    width, height = header_size(data, mime_type)
+    # Only Pillow can downsize, and GIFs are never downsized
+    if (Image is None or mime_type == 'image/gif') and width * height > MAX_IMAGE_PIXELS:
+        raise ValueError(f"{width}x{height} is over {MAX_IMAGE_PIXELS} pixels")
+    if Image is None:
+        return data, mime_type
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+        img = Image.open(io.BytesIO(data))
+    except Exception as e:
+        raise ValueError(f"unreadable image: {e}")
+    if img.width * img.height > MAX_IMAGE_PIXELS * 4:
+        raise ValueError(f"{img.width}x{img.height} is too large to downsize")
+    if max(img.size) <= MAX_IMAGE_SIDE or mime_type == 'image/gif':
+        return data, mime_type
+    img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+    out = io.BytesIO()
+    if mime_type == 'image/jpeg':
+        img.convert('RGB').save(out, 'JPEG', quality=85, optimize=True)
+    else:
+        img.save(out, 'PNG', optimize=True)
+    return out.getvalue(), mime_type
+
+
+def drive_image_url(file):
+    return file.get('webContentLink') or f"https://drive.google.com/uc?export=download&id={file['id']}"
+
+
+def snapshot_ids(event):
+    # Latest snapshot per device: the device's own, else its newest analytics image
+    latest = {}
+    for entry in event.get('analytics', []):
+        if entry.get('image_url_id') and entry.get('datetime', '') >= latest.get(entry.get('device_id'), ('',))[0]:
+            latest[entry.get('device_id')] = (entry.get('datetime', ''), entry['image_url_id'])
+    ids = []
+    for device in event.get('devices', []):
+        image_id = device.get('latest_image_url_id') or latest.get(device.get('id'), (None, None))[1]
+        if image_id and image_id not in ids:
+            ids.append(image_id)
+    return ids
+
+
+class ImageAssets:
+    def __init__(self, url_template=None, path=IMAGE_CACHE_PATH, fetch=fetch_image):
+        # url_template turns bare image IDs into URLs, e.g. 'https://host/images/{id}';
+        # path=None keeps the cache in memory only (dry runs)
+        self.url_template = url_template
+        self.path = path
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.stats = {'fetched': 0, 'uploaded': 0, 'reused': 0, 'rejected': 0}
+        self.entries = {'urls': {}, 'files': {}}
+        self.rejected = set()
+        # Drive URL -> file ID, and file ID -> [anyone permission ID, slides using it]
+        self.hosted = {}
+        self.grants = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries.update(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                pass
+
+    def source_url(self, image_id):
+        if not image_id:
+            return None
+        if image_id.startswith(('http://', 'https://')):
+            return image_id
+        if self.url_template:
+            return self.url_template.format(id=image_id)
+        return None
+
+    def key_lock(self, key):
+        # Workers asking for the same image wait for the first one's upload
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            write_json(self.path, self.entries)
+
+    def resolve(self, drive_service, image_id):
+        # Drive-hosted URL for the image, or None when it can't be used
+        url = self.source_url(image_id)
+        if not url:
+            return None
+        with self.key_lock(url):
+            if url in self.rejected:
+                return None
+            digest = self.entries['urls'].get(url)
+            if digest in self.entries['files']:
+                self.count('reused')
+                return self.hosted_url(self.entries['files'][digest])
+            try:
+                data, mime_type = prepare_image(self.fetch(url))
+            except (OSError, ValueError) as e:
+                # Reported and skipped once per run, not once per slide
+                print(f"❌ Skipping image {image_id}: {e}")
+                self.rejected.add(url)
+                self.count('rejected')
+                return None
+            self.count('fetched')
+            digest = hashlib.sha256(data).hexdigest()
+
+            # Different URLs can serve the same bytes
+            with self.key_lock(digest):
+                file = self.entries['files'].get(digest)
+                if file is None:
+                    try:
+                        file = self.upload(drive_service, data, mime_type, digest)
+                    except Exception as e:
+                        if error_status(e) is None:
+                            raise
+                        # A failed upload drops the image, not the report; the next run retries it
+                        print(f"❌ Skipping image {image_id}: upload failed with HTTP {error_status(e)}")
+                        self.count('rejected')
+                        return None
+                else:
+                    self.count('reused')
+                with self.lock:
+                    self.entries['files'][digest] = file
+                    self.entries['urls'][url] = digest
+        self.save()
+        return self.hosted_url(file)
+
+    def hosted_url(self, file):
+        url = drive_image_url(file)
+        with self.lock:
+            self.hosted[url] = file['id']
+        return url
+
+    def upload(self, drive_service, data, mime_type, digest):
+        # Imported here so the local backends (no Google APIs) can use this module
+        from googleapiclient.http import MediaIoBaseUpload
+        created = execute(drive_service.files().create(
+            body={'name': f"hawkeye-image-{digest[:16]}", 'mimeType': mime_type},
+            media_body=MediaIoBaseUpload(io.BytesIO(data), mimetype=mime_type),
+            fields='id,webContentLink'
+        ))
+        self.count('uploaded')
+        return {'id': created['id'], 'webContentLink': created.get('webContentLink')}
+
+    def grant(self, drive_service, file_id):
+        # Slides fetches the image anonymously when it is inserted. Workers
+        # placing the same image share one permission. False when Drive
+        # refused it, in which case the image is left off the slide.
+        with self.key_lock(('grant', file_id)):
+            with self.lock:
+                grant = self.grants.get(file_id)
+                if grant:
+                    grant[1] += 1
+                    return True
+            try:
+                permission = execute(drive_service.permissions().create(
+                    fileId=file_id,
+                    body={'type': 'anyone', 'role': 'reader'},
+                    fields='id'
+                ))
+            except Exception as e:
+                if error_status(e) is None:
+                    raise
+                print(f"❌ Skipping image {file_id}: sharing failed with HTTP {error_status(e)}")
+                return False
+            with self.lock:
+                self.grants[file_id] = [permission['id'], 1]
+            return True
+
+    def revoke(self, drive_service, file_id):
+        # Drops the public link once the last slide using it has been written
+        with self.key_lock(('grant', file_id)):
+            with self.lock:
+                grant = self.grants[file_id]
+                grant[1] -= 1
+                if grant[1]:
+                    return
+                del self.grants[file_id]
+            try:
+                execute(drive_service.permissions().delete(fileId=file_id, permissionId=grant[0]))
+            except Exception as e:
+                print(f"❌ Image {file_id} is still shared with anyone with the link: {e!r}")
+
+    @contextlib.contextmanager
+    def shared(self, drive_service, events):
+        # {image id: Drive URL} for the events' images, publicly readable only
+        # inside the block; run the batchUpdate that inserts them there
+        granted = []
+        try:
+            with span('images', events=len(events)):
+                images = {}
+                for event in events:
+                    images.update(self.resolve_event(drive_service, event))
+                with self.lock:
+                    file_ids = {url: self.hosted[url] for url in images.values()}
+                for file_id in dict.fromkeys(file_ids.values()):
+                    if self.grant(drive_service, file_id):
+                        granted.append(file_id)
+                images = {image_id: url for image_id, url in images.items() if file_ids[url] in granted}
+            yield images
+        finally:
+            for file_id in granted:
+                self.revoke(drive_service, file_id)
+
+    def resolve_event(self, drive_service, event):
+        # {image id: Drive URL} for the event's logo and device snapshots
+        ids = [event.get('latest_image_url_id')] + snapshot_ids(event)
+        urls = {}
+        for image_id in ids:
+            if image_id and image_id not in urls:
+                urls[image_id] = self.resolve(drive_service, image_id)
+        return {image_id: url for image_id, url in urls.items() if url}
+
+
+# Set by configure(); main.py passes the CLI choices through here
+assets = None
+
+
+def configure(url_template=None, path=IMAGE_CACHE_PATH):
+    global assets
+    assets = ImageAssets(url_template, path)
+    return assets
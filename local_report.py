@@ -0,0 +1,225 @@
+# Local rendering backend: writes the same portrait report slide that
+# create_presentation sends to Google Slides (title, details table, KPI cards,
+# trend and seat charts) straight to a PPTX or PDF file, with the charts drawn
+# locally instead of linked from Sheets. No Google calls and no API quota, so
+# events are spread over a process pool.
+#   PPTX needs python-pptx (native, editable charts); PDF needs matplotlib.
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import history_store
+import seating
+from analytics import summarize
+from report_layout import build_report_layout, object_ids
+from sheet_helper import build_trend_data, load_seat_data
+from slide_layout import PAGE_HEIGHT, PAGE_WIDTH, kpi_text_layout, page_layout
+
+try:
+    from pptx import Presentation
+    from pptx.chart.data import CategoryChartData
+    from pptx.dml.color import RGBColor
+    from pptx.enum.chart import XL_CHART_TYPE
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.util import Pt
+except ImportError:
+    Presentation = None
+
+try:
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+except ImportError:
+    Figure = None
+
+LOCAL_FORMATS = ('pptx', 'pdf')
+DEFAULT_OUTPUT_DIR = 'reports'
+
+# Chart nodes in the layout point at these keys instead of Sheets chart IDs
+LOCAL_CHARTS = ('trend', 'seat')
+CHART_TITLES = {'trend': 'Crowd Trend Analysis', 'seat': 'Seat Sections'}
+CHART_COLORS = {'trend': {"red": 0.3, "green": 0.5, "blue": 0.9}, 'seat': {"red": 0.1, "green": 0.3, "blue": 0.6}}
+
+# Events handed to each worker process at a time
+CHUNK_SIZE = 16
+
+
+def report_page(event):
+    # Placed components plus the data behind each chart
+    ids = object_ids(event)
+    summary = summarize(event) if event.get('analytics') else None
+    tree = build_report_layout(event, None, LOCAL_CHARTS, ids, summary=summary)
+    charts = {'trend': build_trend_data(event, summary=summary), 'seat': load_seat_data(event)}
+    return ids, page_layout(tree), charts
+
+
+def rgb(color):
+    return tuple(color.get(c, 0) for c in ('red', 'green', 'blue'))
+
+
+def pptx_text(frame, value, font_size=None, bold=None, color=None):
+    frame.word_wrap = True
+    run = frame.paragraphs[0].add_run()
+    run.text = str(value)
+    if font_size is not None:
+        run.font.size = Pt(font_size)
+    if bold is not None:
+        run.font.bold = bold
+    if color is not None:
+        run.font.color.rgb = pptx_color(color)
+
+
+def pptx_color(color):
+    return RGBColor(*(round(c * 255) for c in rgb(color)))
+
+
+def render_pptx(path, placed, charts):
+    if Presentation is None:
+        raise RuntimeError("PPTX output needs python-pptx (pip install python-pptx)")
+    prs = Presentation()
+    prs.slide_width, prs.slide_height = Pt(PAGE_WIDTH), Pt(PAGE_HEIGHT)
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    shapes = slide.shapes
+    for node, (x, y, width, height) in placed:
+        box = (Pt(x), Pt(y), Pt(width), Pt(height))
+        if node['type'] == 'text':
+            pptx_text(shapes.add_textbox(*box).text_frame, node['text'],
+                      node['font_size'], node['bold'], node['color'])
+        elif node['type'] == 'table':
+            rows = node['rows']
+            table = shapes.add_table(len(rows), max(len(r) for r in rows), *box).table
+            for i, cells in enumerate(rows):
+                for j, value in enumerate(cells):
+                    cell = table.cell(i, j)
+                    header = i == 0
+                    if header and node['header_fill']:
+                        cell.fill.solid()
+                        cell.fill.fore_color.rgb = pptx_color(node['header_fill'])
+                    pptx_text(cell.text_frame, value, 12, True if header else None,
+                              node['header_color'] if header else None)
+        elif node['type'] == 'kpi':
+            card = shapes.add_shape(MSO_SHAPE.RECTANGLE, *box)
+            card.fill.solid()
+            card.fill.fore_color.rgb = pptx_color(node['background'])
+            card.line.fill.background()
+            for child, (cx, cy, cw, ch) in kpi_text_layout(node, (x, y, width, height)):
+                pptx_text(shapes.add_textbox(Pt(cx), Pt(cy), Pt(cw), Pt(ch)).text_frame, child['text'],
+                          child['font_size'], child['bold'], child['color'])
+        elif node['type'] == 'chart':
+            rows = charts[node['chart_id']]
+            data = CategoryChartData()
+            data.categories = [str(label) for label, _ in rows]
+            data.add_series('Count', [value for _, value in rows])
+            kind = XL_CHART_TYPE.LINE if node['chart_id'] == 'trend' else XL_CHART_TYPE.COLUMN_CLUSTERED
+            chart = shapes.add_chart(kind, *box, data).chart
+            chart.has_legend = False
+            chart.has_title = True
+            chart.chart_title.text_frame.text = CHART_TITLES[node['chart_id']]
+            series = chart.plots[0].series[0]
+            series.format.line.color.rgb = pptx_color(CHART_COLORS[node['chart_id']])
+            if node['chart_id'] == 'trend':
+                series.smooth = True
+            else:
+                series.format.fill.solid()
+                series.format.fill.fore_color.rgb = pptx_color(CHART_COLORS[node['chart_id']])
+        # Images are only placed in the Slides backend, from Drive-hosted copies
+    prs.save(path)
+
+
+def figure_box(box):
+    # Page points, top-left origin -> figure fractions, bottom-left origin
+    x, y, width, height = box
+    return [x / PAGE_WIDTH, 1 - (y + height) / PAGE_HEIGHT, width / PAGE_WIDTH, height / PAGE_HEIGHT]
+
+
+def pdf_text(fig, node, box):
+    left, bottom, _, height = figure_box(box)
+    fig.text(left, bottom + height, node['text'], va='top', ha='left',
+             fontsize=node['font_size'] or 12, fontweight='bold' if node['bold'] else 'normal',
+             color=rgb(node['color']) if node['color'] else 'black')
+
+
+def render_pdf(path, placed, charts):
+    if Figure is None:
+        raise RuntimeError("PDF output needs matplotlib (pip install matplotlib)")
+    # Figure without pyplot: no global state, safe in worker processes
+    fig = Figure(figsize=(PAGE_WIDTH / 72, PAGE_HEIGHT / 72))
+    for node, box in placed:
+        if node['type'] == 'text':
+            pdf_text(fig, node, box)
+        elif node['type'] == 'table':
+            ax = fig.add_axes(figure_box(box))
+            ax.axis('off')
+            table = ax.table(cellText=[[str(v) for v in r] for r in node['rows']], loc='upper left',
+                             bbox=[0, 0, 1, 1], cellLoc='left')
+            table.auto_set_font_size(False)
+            table.set_fontsize(10)
+            for j in range(len(node['rows'][0])):
+                cell = table[0, j]
+                if node['header_fill']:
+                    cell.set_facecolor(rgb(node['header_fill']))
+                cell.get_text().set_fontweight('bold')
+                if node['header_color']:
+                    cell.get_text().set_color(rgb(node['header_color']))
+        elif node['type'] == 'kpi':
+            left, bottom, width, height = figure_box(box)
+            fig.patches.append(Rectangle((left, bottom), width, height, transform=fig.transFigure,
+                                         facecolor=rgb(node['background']), edgecolor='none', zorder=0))
+            for child, child_box in kpi_text_layout(node, box):
+                pdf_text(fig, child, child_box)
+        elif node['type'] == 'chart':
+            rows = charts[node['chart_id']]
+            x, y, width, height = box
+            # Leave room for tick labels inside the chart's box
+            ax = fig.add_axes(figure_box((x + 30, y + 20, width - 40, height - 50)))
+            labels = [str(label) for label, _ in rows]
+            values = [value for _, value in rows]
+            color = rgb(CHART_COLORS[node['chart_id']])
+            if node['chart_id'] == 'trend':
+                ax.plot(range(len(values)), values, color=color, linewidth=2)
+            else:
+                ax.bar(range(len(values)), values, color=color)
+            step = max(1, len(labels) // 8)
+            ax.set_xticks(range(0, len(labels), step))
+            ax.set_xticklabels(labels[::step], fontsize=8)
+            ax.tick_params(axis='y', labelsize=8)
+            ax.set_title(CHART_TITLES[node['chart_id']], fontsize=11)
+            for side in ('top', 'right'):
+                ax.spines[side].set_visible(False)
+    fig.savefig(path, format='pdf')
+
+
+RENDERERS = {'pptx': render_pptx, 'pdf': render_pdf}
+
+
+def render_report(event, output_dir=DEFAULT_OUTPUT_DIR, fmt='pptx'):
+    # Runs in a worker process; returns (report, error, seconds) so one bad
+    # event never takes the pool down
+    start = time.perf_counter()
+    try:
+        ids, placed, charts = report_page(event)
+        path = os.path.join(output_dir, f"{ids['slide'][len('slide_'):]}.{fmt}")
+        RENDERERS[fmt](path, placed, charts)
+        return {'path': path}, None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+def init_worker(seating_settings, history_path):
+    # Worker processes get the parent's CLI choices; SQLite connections are
+    # never shared across a fork
+    seating.configure(seating_settings['path'], seating_settings['window'])
+    history_store.store = None
+    if history_path:
+        history_store.configure(history_path)
+
+
+def render_reports(events, output_dir=DEFAULT_OUTPUT_DIR, fmt='pptx', processes=None):
+    # Results use the same shape as run_pipeline's, in input order
+    os.makedirs(output_dir, exist_ok=True)
+    history_path = history_store.store.path if history_store.store else None
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=(dict(seating.settings), history_path)) as pool:
+        outcomes = pool.map(render_report, events, [output_dir] * len(events), [fmt] * len(events),
+                            chunksize=CHUNK_SIZE)
+        return [{'event': event, 'report': report, 'error': error, 'seconds': seconds}
+                for event, (report, error, seconds) in zip(events, outcomes)]
@@ -1,407 +1,608 @@
 # Updated main.py to use single-slide portrait layout with table and 2 charts
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import argparse
 import json
-import os.path
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from sheet_helper import create_sheet_and_charts
-
-SCOPES = [
-    'https://www.googleapis.com/auth/presentations',
-    'https://www.googleapis.com/auth/drive',
-    'https://www.googleapis.com/auth/spreadsheets'
-]
-
-def get_credentials():
-    creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-    return creds
-
-def load_event_data():
-    with open('event_data.json', 'r') as f:
-        return json.load(f)['data']
-
-def create_presentation(slides_service, drive_service, event, sheet_id, chart_ids):
-    # Initialize IDs and variables
-    title = event.get("event_title", "Untitled")
-    logo_url = event.get("latest_image_url_id")
-    
-    # Create presentation by copying template
-    copied = drive_service.files().copy(
-        fileId='1BgMBoNIGRXCMzBJ26TLb8HUDbqcwGTHFfr5Bu1RyKeY',
-        body={'name': f'HawkEye Report - {title}'}
-    ).execute()
+import threading
+import api_scheduler
+import drive_ops
+import tracing
+import history_store
+import image_assets
+import report_cache
+import seating
+import sheet_helper
+import template_cache
+from analytics import summarize
+from api_scheduler import execute
+from tracing import TRACE_FORMATS, span
+from event_loader import iter_events
+from fake_services import Recorder, build_fake_services
+from local_report import DEFAULT_OUTPUT_DIR, LOCAL_FORMATS, render_reports
+from google_services import DISCOVERY_MODES, build_services, get_credentials
+from report_layout import build_report_layout, kpi_values, object_ids
+from run_journal import DECK_KEY, JOURNAL_PATH, WORKBOOK_KEY, RunJournal
+from report_scheduler import DEFAULT_POLL_SECONDS, run_daemon
+from report_state import STATE_PATH, ReportState, analytics_watermark
+from slide_layout import KPI_CHANGE_STYLE, KPI_VALUE_STYLE, compile_slide, replace_text_requests
+from template_cache import cached_version, get_template_metadata
+from sheet_helper import (create_sheet_and_charts, create_shared_workbook, build_trend_data,
+                          update_trend_data, DEFAULT_EVENTS_PER_TAB)
+
+TEMPLATE_ID = '1BgMBoNIGRXCMzBJ26TLb8HUDbqcwGTHFfr5Bu1RyKeY'
+
+# Per-batchUpdate limits for multi-slide decks, well under the API's request size cap
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+MAX_BATCH_REQUESTS = 2000
+
+def load_event_data(path='event_data.json', end_date=None):
+    # Streams events one at a time; accepts JSON, NDJSON and gzip exports
+    return iter_events(path, end_date=end_date)
+
+def report_name(event):
+    return f'HawkEye Report - {event.get("event_title", "Untitled")}'
+
+def copy_body(name, folder_id=None):
+    body = {'name': name}
+    if folder_id:
+        body['parents'] = [folder_id]
+    return body
+
+def copy_template(drive_service, name, folder_id=None):
+    copied = execute(drive_service.files().copy(
+        fileId=TEMPLATE_ID,
+        body=copy_body(name, folder_id)
+    ))
     presentation_id = copied['id']
     print(f"✅ Created: https://docs.google.com/presentation/d/{presentation_id}/edit")
+    return presentation_id
 
-    slide_id = f"slide_{title[:10].replace(' ', '_')}"
-    title_id = f"title_{title[:10].replace(' ', '_')}"
-    table_id = f"table_{title[:10].replace(' ', '_')}"
-    kpi1_id = f"kpi1_{title[:10].replace(' ', '_')}"
-    kpi2_id = f"kpi2_{title[:10].replace(' ', '_')}"
-
-    # Get analytics data from event
-    analytics = event.get('analytics', [])
-    avg_count = event.get('analytics_summary', {}).get('average_count', 0)
-    max_count = event.get('analytics_summary', {}).get('max_count', 0)
-
-    # Get event details for the table - simplified
-    event_details = [
-        ["Information", "Details"],
-        ["Name", event.get("event_title", "")],
-        ["Date", event.get("start_date", "")],
-        ["Location", "12 Melbourne Oxford"],
-        ["Total Attendance", "5,000"]
-    ]
-
-    # Style table header and content
-    requests = [
-        # Create slide
-        {"createSlide": {"objectId": slide_id, "insertionIndex": 0}},
-
-        # Add logo (only if URL is available)
-        *([{
-            "createImage": {
-                "url": logo_url,
-                "elementProperties": {
-                    "pageObjectId": slide_id,
-                    "size": {"width": {"magnitude": 100, "unit": "PT"}, "height": {"magnitude": 40, "unit": "PT"}},
-                    "transform": {"scaleX": 1, "scaleY": 1, "translateX": 40, "translateY": 20, "unit": "PT"}
-                }
-            }
-        }] if logo_url else []),
-
-        # Title
-        {"createShape": {
-            "objectId": title_id,
-            "shapeType": "TEXT_BOX",
-            "elementProperties": {
-                "pageObjectId": slide_id,
-                "transform": {"scaleX": 1, "scaleY": 1, "translateX": 40, "translateY": 40, "unit": "PT"},
-                "size": {"height": {"magnitude": 40, "unit": "PT"}, "width": {"magnitude": 400, "unit": "PT"}}
-            }
-        }},
-        {"insertText": {"objectId": title_id, "text": "EVENT REPORT"}},
-        {"updateTextStyle": {
-            "objectId": title_id,
-            "style": {
-                "fontSize": {"magnitude": 24, "unit": "PT"},
-                "foregroundColor": {"opaqueColor": {"rgbColor": {"red": 0.2, "green": 0.2, "blue": 0.2}}},
-                "bold": True
-            },
-            "fields": "fontSize,foregroundColor,bold"
-        }},
-
-        # Create table
-        {"createTable": {
-            "objectId": table_id,
-            "rows": len(event_details),
-            "columns": 2,
-            "elementProperties": {
-                "pageObjectId": slide_id,
-                "transform": {"scaleX": 1, "scaleY": 1, "translateX": 40, "translateY": 100, "unit": "PT"},
-                "size": {"height": {"magnitude": 120, "unit": "PT"}, "width": {"magnitude": 500, "unit": "PT"}}
-            }
-        }}
-    ]
-
-    # Add table content
-    for i, row in enumerate(event_details):
-        for j, cell in enumerate(row):
-            requests.append({
-                "insertText": {
-                    "objectId": table_id,
-                    "cellLocation": {"rowIndex": i, "columnIndex": j},
-                    "text": str(cell)
-                }
-            })
-
-    # Style table header and content
-    requests.extend([
-        {"updateTableCellProperties": {
-            "objectId": table_id,
-            "tableRange": {
-                "location": {"rowIndex": 0, "columnIndex": 0},
-                "rowSpan": 1,
-                "columnSpan": 2
-            },
-            "tableCellProperties": {
-                "tableCellBackgroundFill": {
-                    "solidFill": {
-                        "color": {"rgbColor": {"red": 0.23, "green": 0.51, "blue": 0.79}}
-                    }
-                }
-            },
-            "fields": "tableCellBackgroundFill"
-        }}
-    ])
-
-    # Style table header
-    requests.extend([
-        {"updateTableCellProperties": {
-            "objectId": table_id,
-            "tableRange": {
-                "location": {"rowIndex": 0, "columnIndex": 0},
-                "rowSpan": 1,
-                "columnSpan": 2
-            },
-            "tableCellProperties": {
-                "tableCellBackgroundFill": {
-                    "solidFill": {
-                        "color": {"rgbColor": {"red": 0.23, "green": 0.51, "blue": 0.79}}
-                    }
-                }
-            },
-            "fields": "tableCellBackgroundFill"
-        }},
-        # Style "Information" text
-        {"updateTextStyle": {
-            "objectId": table_id,
-            "cellLocation": {"rowIndex": 0, "columnIndex": 0},
-            "style": {
-                "foregroundColor": {"opaqueColor": {"rgbColor": {"red": 1, "green": 1, "blue": 1}}},
-                "bold": True
-            },
-            "fields": "foregroundColor,bold"
-        }},
-        # Style "Details" text
-        {"updateTextStyle": {
-            "objectId": table_id,
-            "cellLocation": {"rowIndex": 0, "columnIndex": 1},
-            "style": {
-                "foregroundColor": {"opaqueColor": {"rgbColor": {"red": 1, "green": 1, "blue": 1}}},
-                "bold": True
-            },
-            "fields": "foregroundColor,bold"
-        }}
-    ])
-
-    # Define KPI cards with simpler styling
-    kpi_cards = [
-        {
-            "id": kpi1_id,
-            "title": "Total Count",
-            "value": str(max_count),
-            "change": "4.1% vs last month",
-            "x": 40,
-            "y": 200,
-            "width": 200,
-            "height": 80,
-            "background": {"red": 0.4, "green": 0.8, "blue": 0.4}  # Light green
-        },
-        {
-            "id": kpi2_id,
-            "title": "Aggregated Count",
-            "value": "40",  # Hardcoded for now, replace with actual data
-            "change": "+40% vs last period",
-            "x": 280,
-            "y": 300,  # Adjusted position
-            "width": 200,
-            "height": 80,
-            "background": {"red": 1, "green": 1, "blue": 1}  # White background
-        }
-    ]
-
-    # Add KPI cards
-    for kpi in kpi_cards:
-        requests.extend([
-            # KPI card background
-            {"createShape": {
-                "objectId": kpi["id"],
-                "shapeType": "RECTANGLE",
-                "elementProperties": {
-                    "pageObjectId": slide_id,
-                    "transform": {"scaleX": 1, "scaleY": 1, "translateX": kpi["x"], "translateY": kpi["y"], "unit": "PT"},
-                    "size": {"height": {"magnitude": kpi["height"], "unit": "PT"}, 
-                           "width": {"magnitude": kpi["width"], "unit": "PT"}}
-                }
-            }},
-            {"updateShapeProperties": {
-                "objectId": kpi["id"],
-                "shapeProperties": {
-                    "shapeBackgroundFill": {
-                        "solidFill": {"color": {"rgbColor": kpi["background"]}}
-                    }
-                },
-                "fields": "shapeBackgroundFill"
-            }},
-            # KPI title
-            {"createShape": {
-                "objectId": f"{kpi['id']}_title",
-                "shapeType": "TEXT_BOX",
-                "elementProperties": {
-                    "pageObjectId": slide_id,
-                    "transform": {"scaleX": 1, "scaleY": 1, 
-                                "translateX": kpi["x"] + 10, 
-                                "translateY": kpi["y"] + 10, "unit": "PT"},
-                    "size": {"height": {"magnitude": 20, "unit": "PT"}, 
-                           "width": {"magnitude": kpi["width"] - 20, "unit": "PT"}}
-                }
-            }},
-            {"insertText": {
-                "objectId": f"{kpi['id']}_title",
-                "text": kpi["title"]
-            }},
-            {"updateTextStyle": {
-                "objectId": f"{kpi['id']}_title",
-                "style": {
-                    "foregroundColor": {"opaqueColor": {"rgbColor": {"red": 0.2, "green": 0.2, "blue": 0.2}}},
-                    "fontSize": {"magnitude": 14, "unit": "PT"}
-                },
-                "fields": "foregroundColor,fontSize"
-            }},
-            # KPI value
-            {"createShape": {
-                "objectId": f"{kpi['id']}_value",
-                "shapeType": "TEXT_BOX",
-                "elementProperties": {
-                    "pageObjectId": slide_id,
-                    "transform": {"scaleX": 1, "scaleY": 1, 
-                                "translateX": kpi["x"] + 10, 
-                                "translateY": kpi["y"] + 35, "unit": "PT"},
-                    "size": {"height": {"magnitude": 30, "unit": "PT"}, 
-                           "width": {"magnitude": kpi["width"] - 20, "unit": "PT"}}
-                }
-            }},
-            {"insertText": {
-                "objectId": f"{kpi['id']}_value",
-                "text": kpi["value"]
-            }},
-            {"updateTextStyle": {
-                "objectId": f"{kpi['id']}_value",
-                "style": {
-                    "fontSize": {"magnitude": 24, "unit": "PT"},
-                    "bold": True,
-                    "foregroundColor": {"opaqueColor": {"rgbColor": {"red": 0.2, "green": 0.2, "blue": 0.2}}}
-                },
-                "fields": "fontSize,bold,foregroundColor"
-            }},
-            # KPI change indicator
-            {"createShape": {
-                "objectId": f"{kpi['id']}_change",
-                "shapeType": "TEXT_BOX",
-                "elementProperties": {
-                    "pageObjectId": slide_id,
-                    "transform": {"scaleX": 1, "scaleY": 1, 
-                                "translateX": kpi["x"] + 10, 
-                                "translateY": kpi["y"] + 70, "unit": "PT"},
-                    "size": {"height": {"magnitude": 20, "unit": "PT"}, 
-                           "width": {"magnitude": kpi["width"] - 20, "unit": "PT"}}
-                }
-            }},
-            {"insertText": {
-                "objectId": f"{kpi['id']}_change",
-                "text": kpi["change"]
-            }},
-            {"updateTextStyle": {
-                "objectId": f"{kpi['id']}_change",
-                "style": {
-                    "foregroundColor": {"opaqueColor": {"rgbColor": {"red": 0.2, "green": 0.2, "blue": 0.2}}},
-                    "fontSize": {"magnitude": 12, "unit": "PT"}
-                },
-                "fields": "foregroundColor,fontSize"
-            }}
-        ])
-
-    # Update KPI cards definition with real data
-    kpi_cards = [
-        {
-            "id": kpi1_id,
-            "title": "Total Count",
-            "value": str(max_count),
-            "change": "4.1% vs last month",
-            "x": 40,
-            "y": 200,
-            "width": 200,
-            "height": 80,
-            "background": {"red": 0.4, "green": 0.8, "blue": 0.4}  # Light green
-        },
-        {
-            "id": kpi2_id,
-            "title": "Aggregated Count",
-            "value": str(avg_count),
-            "change": "1.1% vs last month",
-            "x": 280,
-            "y": 200,  # Adjusted position
-            "width": 200,
-            "height": 80,
-            "background": {"red": 0.8, "green": 0.4, "blue": 0.4}  # Light red
-        }
-    ]
-
-    # Add charts with adjusted positions
-    chart_placement = [
-        {"objectId": "chart1", "chartId": chart_ids[0], "translateY": 450},
-        {"objectId": "chart2", "chartId": chart_ids[1], "translateY": 650}
-    ]
-
-    for chart in chart_placement:
-        requests.append({
-            "createSheetsChart": {
-                "objectId": chart["objectId"],
-                "spreadsheetId": sheet_id,
-                "chartId": chart["chartId"],
-                "linkingMode": "LINKED",
-                "elementProperties": {
-                    "pageObjectId": slide_id,
-                    "transform": {
-                        "scaleX": 1, "scaleY": 1,
-                        "translateX": 40, "translateY": chart["translateY"],
-                        "unit": "PT"
-                    },
-                    "size": {
-                        "height": {"magnitude": 180, "unit": "PT"},  # Reduced height
-                        "width": {"magnitude": 500, "unit": "PT"}
-                    }
-                }
-            }
-        })
-
-    # Execute all requests
-    slides_service.presentations().batchUpdate(
-        presentationId=presentation_id,
-        body={"requests": requests}
-    ).execute()
-
-    # Delete the second page if it exists
-    presentation = slides_service.presentations().get(
-        presentationId=presentation_id
-    ).execute()
-    
-    if len(presentation.get('slides', [])) > 1:
-        requests = [{
-            'deleteObject': {
-                'objectId': presentation['slides'][1]['objectId']
-            }
-        }]
-        slides_service.presentations().batchUpdate(
+def copy_templates(drive_service, events, folder_id=None, journal=None):
+    # Template copies for many events in Drive batches of 100; returns a
+    # presentation ID, or the error, per event
+    jobs = {index: (TEMPLATE_ID, copy_body(report_name(event), folder_id)) for index, event in enumerate(events)}
+    copied = drive_ops.copy_files(drive_service, jobs, fields='id')
+    presentation_ids = []
+    for index, event in enumerate(events):
+        result = copied.get(index) or RuntimeError("No reply for template copy in Drive batch")
+        if not isinstance(result, Exception):
+            result = result['id']
+            print(f"✅ Created: https://docs.google.com/presentation/d/{result}/edit")
+            progress = journal.progress(event) if journal else None
+            if progress:
+                progress.record('deck_copied', presentation_id=result)
+        presentation_ids.append(result)
+    return presentation_ids
+
+def template_cleanup_requests(slides_service, drive_service):
+    # Remove the template's placeholder slide, which new slides push further down.
+    # Copies keep the template's objectIds, so the cached metadata names it.
+    template = get_template_metadata(slides_service, drive_service, TEMPLATE_ID)
+    if template['slides']:
+        return [{'deleteObject': {'objectId': template['slides'][0]['objectId']}}]
+    return []
+
+def create_presentation(slides_service, drive_service, event, sheet_id, chart_ids, progress=None,
+                        presentation_id=None, folder_id=None, summary=None):
+    # Create presentation by copying template, unless the run's Drive batch
+    # already did; a copy journaled by a crashed run is reused
+    copied = progress.get('deck_copied') if progress and presentation_id is None else None
+    if copied:
+        presentation_id = copied['presentation_id']
+        if progress.get('slides_written') or slide_exists(slides_service, presentation_id, object_ids(event)['slide']):
+            return presentation_id
+    elif presentation_id is None:
+        presentation_id = copy_template(drive_service, report_name(event), folder_id)
+        if progress:
+            progress.record('deck_copied', presentation_id=presentation_id)
+
+    ids = object_ids(event)
+    with span('presentation.template'):
+        cleanup = template_cleanup_requests(slides_service, drive_service)
+    # Images are public only until Slides has copied them into the deck
+    with image_assets.assets.shared(drive_service, [event]) as images:
+        with span('presentation.layout'):
+            layout = build_report_layout(event, sheet_id, chart_ids, ids, images, summary)
+            requests = compile_slide(ids['slide'], layout) + cleanup
+
+        # Execute all requests
+        execute(slides_service.presentations().batchUpdate(
             presentationId=presentation_id,
-            body={'requests': requests}
-        ).execute()
-
-def main():
-    creds = get_credentials()
-    slides_service = build('slides', 'v1', credentials=creds)
-    drive_service = build('drive', 'v3', credentials=creds)
-    sheets_service = build('sheets', 'v4', credentials=creds)
-
-    events = load_event_data()
-    today = str(datetime.today().date())
-    for event in events:
-        if event.get('end_date') == today:
-            sheet_id, chart_ids = create_sheet_and_charts(sheets_service, event)
-            create_presentation(slides_service, drive_service, event, sheet_id, chart_ids)
+            body={"requests": requests}
+        ))
+    if progress:
+        progress.record('slides_written')
+
+    return presentation_id
+
+def slide_exists(slides_service, presentation_id, slide_id):
+    # batchUpdate is atomic: the report slide is there only if the whole batch landed
+    presentation = execute(slides_service.presentations().get(
+        presentationId=presentation_id,
+        fields='slides(objectId)'
+    ))
+    return any(slide['objectId'] == slide_id for slide in presentation.get('slides', []))
+
+def chunk_slides(slide_requests, max_bytes=MAX_BATCH_BYTES, max_requests=MAX_BATCH_REQUESTS):
+    # Packs whole slides into as few batches as the size limits allow, so a
+    # failed batch never leaves a half-built slide behind
+    batches = [[]]
+    batch_bytes = 0
+    for requests in slide_requests:
+        size = len(json.dumps(requests))
+        if batches[-1] and (batch_bytes + size > max_bytes
+                            or len(batches[-1]) + len(requests) > max_requests):
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].extend(requests)
+        batch_bytes += size
+    return batches
+
+def create_deck(slides_service, drive_service, reports, name, folder_id=None):
+    # One presentation with a slide per event; reports are (event, sheet_id,
+    # chart_ids, analytics summary or None)
+    presentation_id = copy_template(drive_service, name, folder_id)
+
+    cleanup = template_cleanup_requests(slides_service, drive_service)
+    with image_assets.assets.shared(drive_service, [event for event, _, _, _ in reports]) as images:
+        slide_requests = []
+        for index, (event, sheet_id, chart_ids, summary) in enumerate(reports):
+            ids = object_ids(event)
+            layout = build_report_layout(event, sheet_id, chart_ids, ids, images, summary)
+            slide_requests.append(compile_slide(ids['slide'], layout, insertion_index=index))
+        slide_requests.append(cleanup)
+
+        for requests in chunk_slides(slide_requests):
+            execute(slides_service.presentations().batchUpdate(
+                presentationId=presentation_id,
+                body={"requests": requests}
+            ))
+
+    return presentation_id
+
+def create_report(services, event, sheet=None, slides=True, state=None, journal=None,
+                  presentation_id=None, folder_id=None, summary=None):
+    # The trend rows, KPI cards and state entry all come from one analytics summary
+    if summary is None and event.get('analytics'):
+        summary = summarize(event)
+
+    # Events already in the incremental state only get their changes sent
+    if state is not None and state.get(event):
+        return update_report(services, event, state, summary)
+
+    # Events finished earlier in this run (same run key) are skipped; partial ones resume
+    progress = journal.progress(event) if journal else None
+    finished = progress.get('done') if progress else None
+    if finished:
+        print(f"✅ Already reported in this run: {event.get('event_uuid')}")
+        return finished
+
+    # Sheet and charts must exist before the slides can link to them; with a
+    # shared workbook they were already created for the whole run
+    slides_service, drive_service, sheets_service = services
+    if sheet is None:
+        with span('sheet'):
+            sheet_id, chart_ids = create_sheet_and_charts(sheets_service, event, progress=progress, summary=summary)
+    else:
+        sheet_id, chart_ids = sheet
+    if slides:
+        with span('presentation'):
+            presentation_id = create_presentation(slides_service, drive_service, event, sheet_id, chart_ids,
+                                                  progress, presentation_id, folder_id, summary)
+    else:
+        presentation_id = None
+
+    if state is not None:
+        ids = object_ids(event)
+        state.update(event, sheet_id=sheet_id, chart_ids=chart_ids, presentation_id=presentation_id,
+                     trend_rows=len(build_trend_data(event, summary=summary)),
+                     last_timestamp=analytics_watermark(event),
+                     kpis=[[value, change] for _, _, value, change, _ in kpi_values(event, ids, summary)])
+    report = {'sheet_id': sheet_id, 'chart_ids': chart_ids, 'presentation_id': presentation_id}
+    if progress:
+        progress.record('done', **report)
+    if report_cache.cache is not None and sheet is None and slides:
+        report_cache.cache.put(report_cache.report_key(event, cached_version(TEMPLATE_ID)), event, report)
+    return report
+
+def update_report(services, event, state, summary=None):
+    # At most one Sheets and one Slides batchUpdate: the re-bucketed trend rows
+    # plus the stretched trend chart, then rewritten KPI text and a refresh of the linked chart
+    slides_service, _, sheets_service = services
+    entry = state.get(event)
+    since = entry.get('last_timestamp')
+    trend_rows = update_trend_data(sheets_service, entry['sheet_id'], entry['chart_ids'][0],
+                                   entry['trend_rows'], event, since=since, summary=summary)
+
+    ids = object_ids(event)
+    kpis = kpi_values(event, ids, summary)
+    kpi_text = [[value, change] for _, _, value, change, _ in kpis]
+    old_text = entry.get('kpis') or []
+    requests = []
+    for i, (kpi_id, _, value, change, _) in enumerate(kpis):
+        old_value, old_change = old_text[i] if i < len(old_text) else (None, None)
+        if value != old_value:
+            requests.extend(replace_text_requests(f"{kpi_id}_value", value, **KPI_VALUE_STYLE))
+        if change != old_change:
+            requests.extend(replace_text_requests(f"{kpi_id}_change", change, **KPI_CHANGE_STYLE))
+    if trend_rows is not None:
+        requests.append({"refreshSheetsChart": {"objectId": ids['chart1']}})
+    if requests:
+        execute(slides_service.presentations().batchUpdate(
+            presentationId=entry['presentation_id'],
+            body={"requests": requests}
+        ))
+        print(f"✅ Updated: https://docs.google.com/presentation/d/{entry['presentation_id']}/edit")
+
+    state.update(event, kpis=kpi_text,
+                 trend_rows=entry['trend_rows'] if trend_rows is None else trend_rows,
+                 last_timestamp=analytics_watermark(event) or since)
+    return {'sheet_id': entry['sheet_id'], 'chart_ids': entry['chart_ids'],
+            'presentation_id': entry['presentation_id']}
+
+def needs_copy(event, state=None, journal=None):
+    if state is not None and state.get(event):
+        return False
+    progress = journal.progress(event) if journal else None
+    return not (progress and (progress.get('done') or progress.get('deck_copied')))
+
+def run_pipeline(events, make_services, workers=4, shared_workbook=False,
+                 events_per_tab=DEFAULT_EVENTS_PER_TAB, deck=False, state=None, journal=None,
+                 folder_id=None, share_with=(), services=None, run_date=None):
+    # googleapiclient services share one httplib2 connection that is not
+    # thread-safe, so every worker thread builds its own set on first use.
+    local = threading.local()
+    # The main thread's set (copies, filing, the deck) is built once, when first needed
+    built = [services] if services is not None else []
+
+    def main_services():
+        if not built:
+            built.append(make_services())
+        return built[0]
+
+    # One analytics summary per event, shared by the workbook, the report and the deck
+    summaries = {}
+
+    def summary_of(event):
+        if id(event) not in summaries:
+            summaries[id(event)] = summarize(event) if event.get('analytics') else None
+        return summaries[id(event)]
+
+    def work(event, sheet, copy):
+        if id(event) in reused:
+            return reused[id(event)], 0.0
+        if isinstance(copy, Exception):
+            raise copy
+        with span('event', event_uuid=event.get('event_uuid'), event_title=event.get('event_title')) as root:
+            if not hasattr(local, 'services'):
+                with span('services'):
+                    local.services = make_services()
+            report = create_report(local.services, event, sheet, slides=not deck, state=state, journal=journal,
+                                   presentation_id=copy, folder_id=folder_id, summary=summary_of(event))
+        return report, root['seconds']
+
+    # Per-event reports whose inputs hash the same as when they were built are
+    # reused with no API calls at all
+    reused = {}
+    if report_cache.cache is not None and not deck and not shared_workbook:
+        with span('report_cache', events=len(events)):
+            # One small Drive call per run, so a template edit changes every key
+            slides_service, drive_service, _ = main_services()
+            version = get_template_metadata(slides_service, drive_service, TEMPLATE_ID)['version']
+            for event in events:
+                if state is None or not state.get(event):
+                    report = report_cache.cache.get(report_cache.report_key(event, version))
+                    if report:
+                        reused[id(event)] = report
+        if reused:
+            print(f"✅ {len(reused)} unchanged reports reused from the cache")
+
+    # Reports from earlier runs were already filed and shared
+    updated = {id(event) for event in events if state is not None and state.get(event)} | set(reused)
+
+    sheets = [None] * len(events)
+    workbook = journal.get(WORKBOOK_KEY, 'done') if journal else None
+    if shared_workbook and events and workbook:
+        # Placements are journaled per event so the run's event list may shift
+        sheets = [workbook['placements'].get(event.get('event_uuid')) for event in events]
+    if shared_workbook and events and None in sheets:
+        with span('shared_workbook', events=len(events)):
+            sheets_service = main_services()[2]
+            sheets = create_shared_workbook(sheets_service, events, events_per_tab,
+                                            [summary_of(event) for event in events], run_date)
+        if journal:
+            journal.record(WORKBOOK_KEY, 'done', placements={
+                event.get('event_uuid'): placement for event, placement in zip(events, sheets)})
+
+    copies = [None] * len(events)
+    todo = [index for index, event in enumerate(events)
+            if not deck and id(event) not in reused and needs_copy(event, state, journal)]
+    if todo:
+        with span('drive.copy_templates', events=len(todo)):
+            copied = copy_templates(main_services()[1], [events[i] for i in todo], folder_id, journal)
+        for index, presentation_id in zip(todo, copied):
+            copies[index] = presentation_id
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # Collected in input order so summaries and deck slides follow the export
+        futures = [(pool.submit(work, event, sheet, copy), event)
+                   for event, sheet, copy in zip(events, sheets, copies)]
+        for future, event in futures:
+            try:
+                report, seconds = future.result()
+                results.append({'event': event, 'report': report, 'error': None, 'seconds': seconds})
+            except Exception as e:
+                results.append({'event': event, 'report': None, 'error': e, 'seconds': None})
+
+    # Without a journal no rerun can pick up a failed event's template copy; with
+    # one, only a rerun under the same run key can, so files that earlier runs
+    # left unfinished go once the journal has moved on to this run
+    if journal is None:
+        orphans = [copy for copy, r in zip(copies, results) if isinstance(copy, str) and r['error'] is not None]
+    else:
+        orphans = journal.abandoned
+    if orphans:
+        with span('drive.delete_copies', files=len(orphans)):
+            delete_copies(main_services()[1], orphans)
+
+    if deck:
+        add_deck(results, main_services(), run_date, journal, folder_id, summary_of)
+    if folder_id or share_with:
+        with span('drive.file_reports'):
+            file_reports(main_services()[1], [r for r in results if id(r['event']) not in updated],
+                         folder_id, share_with, journal)
+
+    print_summary(results)
+    return results
+
+def delete_copies(drive_service, file_ids):
+    failed = drive_ops.failures(drive_ops.delete_files(drive_service, file_ids))
+    for file_id, error in failed.items():
+        print(f"❌ Could not delete unused file {file_id}: {drive_ops.describe(error)}")
+    print(f"✅ Deleted {len(file_ids) - len(failed)} files of failed events")
+
+def deck_name(run_date=None):
+    return f'HawkEye Daily Digest - {run_date}' if run_date else 'HawkEye Daily Digest'
+
+def add_deck(results, services, run_date=None, journal=None, folder_id=None, summary_of=None):
+    # All events whose sheets succeeded share one deck, one slide each, named
+    # after the date being reported on
+    slides_service, drive_service, _ = services
+    done = [r for r in results if r['error'] is None]
+    if not done:
+        return
+    reports = [(r['event'], r['report']['sheet_id'], r['report']['chart_ids'],
+                summary_of(r['event']) if summary_of else None) for r in done]
+    finished = journal.get(DECK_KEY, 'done') if journal else None
+    if finished and set(finished['events']) == {r['event'].get('event_uuid') for r in done}:
+        presentation_id = finished['presentation_id']
+    else:
+        try:
+            with span('deck', events=len(reports)):
+                presentation_id = create_deck(slides_service, drive_service, reports,
+                                              deck_name(run_date), folder_id)
+        except Exception as e:
+            for r in done:
+                r['error'] = e
+            return
+        if journal:
+            journal.record(DECK_KEY, 'done', presentation_id=presentation_id,
+                           events=[r['event'].get('event_uuid') for r in done])
+    for r in done:
+        r['report']['presentation_id'] = presentation_id
+
+def file_reports(drive_service, results, folder_id=None, share_with=(), journal=None):
+    # Moves the run's new spreadsheets into the dated folder (template copies
+    # are made there already) and shares every new file, in Drive batches
+    filed = []
+    for r in results:
+        progress = journal.progress(r['event']) if journal else None
+        if r['error'] is None and not (progress and progress.get('filed')):
+            filed.append((r, progress))
+    sheet_ids = list(dict.fromkeys(r['report']['sheet_id'] for r, _ in filed if r['report']['sheet_id']))
+    file_ids = list(dict.fromkeys(sheet_ids + [r['report']['presentation_id'] for r, _ in filed
+                                               if r['report']['presentation_id']]))
+    outcomes = {}
+    if folder_id:
+        outcomes.update(drive_ops.move_files(drive_service, sheet_ids, folder_id))
+    if share_with:
+        for (file_id, _), outcome in drive_ops.share_files(drive_service, file_ids, share_with).items():
+            if file_id not in outcomes or not isinstance(outcomes[file_id], Exception):
+                outcomes[file_id] = outcome
+    for file_id, error in drive_ops.failures(outcomes).items():
+        print(f"❌ Could not file {file_id}: {drive_ops.describe(error)}")
+    for r, progress in filed:
+        ids = (r['report']['sheet_id'], r['report']['presentation_id'])
+        if progress and not any(isinstance(outcomes.get(i), Exception) for i in ids):
+            progress.record('filed')
+    print(f"✅ Filed {len(file_ids)} files" + (f" and shared them with {len(share_with)} grantees" if share_with else ""))
+
+def select_events(path, date, incremental=False):
+    if not incremental:
+        return list(load_event_data(path, end_date=date))
+    # Incremental runs also refresh events still in progress and recurring ones
+    return [event for event in load_event_data(path)
+            if event.get('end_date') == date
+            or event.get('start_date', '') <= date <= event.get('end_date', '')
+            or event.get('repeat_type') == 'Recurring']
+
+def print_summary(results):
+    failed = [r for r in results if r['error'] is not None]
+    print(f"\nProcessed {len(results)} events: {len(results) - len(failed)} succeeded, {len(failed)} failed")
+    for r in results:
+        title = r['event'].get('event_title', 'Untitled')
+        uuid = r['event'].get('event_uuid', '?')
+        if r['error'] is None:
+            print(f"✅ {uuid} {title}")
+        else:
+            print(f"❌ {uuid} {title}: {r['error']!r}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate HawkEye event reports in Google Slides')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='number of events processed concurrently (default: 4)')
+    parser.add_argument('--backend', choices=('slides',) + LOCAL_FORMATS, default='slides',
+                        help='slides (shared Google Slides deck) or a local pptx/pdf file per event')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help='where the pptx/pdf backends write their files')
+    parser.add_argument('--shared-workbook', action='store_true',
+                        help="put every event's chart data in one spreadsheet for the run")
+    parser.add_argument('--events-per-tab', type=int, default=DEFAULT_EVENTS_PER_TAB,
+                        help='events packed into each tab of the shared workbook')
+    parser.add_argument('--device-series', type=int, default=0,
+                        help='split the trend data per device and stack this many of the busiest '
+                             'devices in the trend chart, the rest as "Other" (default: 0, one total line)')
+    parser.add_argument('--deck', action='store_true',
+                        help='render all events into one presentation, one slide per event')
+    parser.add_argument('--metrics-file',
+                        help='write per-API call, retry and wait metrics to this JSON file')
+    parser.add_argument('--trace-file',
+                        help='write a span per stage and API call to this file')
+    parser.add_argument('--trace-format', choices=TRACE_FORMATS, default='jsonl',
+                        help='jsonl (one span per line) or otlp (OpenTelemetry OTLP/JSON)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='use local stand-ins instead of Google and record every request')
+    parser.add_argument('--dry-run-output', default='dry_run.jsonl',
+                        help='JSONL file receiving the recorded request payloads per event')
+    parser.add_argument('--discovery', choices=DISCOVERY_MODES, default='static',
+                        help='where API discovery documents come from: bundled with googleapiclient '
+                             '(static), an on-disk cache, or the network (default: static)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='update reports already in the state file instead of rebuilding them')
+    parser.add_argument('--state-file', default=STATE_PATH,
+                        help='incremental state: report IDs and analytics watermark per event')
+    parser.add_argument('--history-db',
+                        help='SQLite analytics history; adds the selected events to it and compares '
+                             'KPIs with the same window last month')
+    parser.add_argument('--seating-file', default=seating.SEATING_PATH,
+                        help='seating densities by section (default: seating.json)')
+    parser.add_argument('--seating-window', default=seating.DEFAULT_WINDOW,
+                        help="weekly_data key such as last_week, or a number of weeks to average")
+    parser.add_argument('--image-url-template',
+                        help="URL for image IDs that are not URLs themselves, e.g. 'https://host/images/{id}'")
+    parser.add_argument('--journal-file', default=JOURNAL_PATH,
+                        help='steps finished per event and run date; a rerun resumes from it')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='ignore the run journal and rebuild every report')
+    parser.add_argument('--report-cache', default=report_cache.REPORT_CACHE_PATH,
+                        help='reports keyed by a hash of their inputs; unchanged events are not rebuilt')
+    parser.add_argument('--report-cache-size', type=int, default=report_cache.DEFAULT_MAX_ENTRIES,
+                        help='cached reports kept before the least recently used are dropped')
+    parser.add_argument('--no-report-cache', action='store_true',
+                        help='rebuild every report even when its inputs are unchanged')
+    parser.add_argument('--drive-folder',
+                        help="Drive folder ID; the run's reports go into a dated subfolder of it")
+    parser.add_argument('--share-with', nargs='+', default=[],
+                        help='email addresses (or domain:example.com) given read access to new reports')
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and report each event shortly after its own end_time, "
+                             "following its timezone, repeat rules and cron_expression")
+    parser.add_argument('--poll-seconds', type=int, default=DEFAULT_POLL_SECONDS,
+                        help='how often the daemon checks the events file for changes')
+    parser.add_argument('--date', default=str(datetime.today().date()),
+                        help='report on events ending on this date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--events-file', default='event_data.json',
+                        help='event export to read (.json, .ndjson/.jsonl, optionally .gz)')
+    args = parser.parse_args(argv)
+    if args.incremental and (args.deck or args.shared_workbook):
+        parser.error('--incremental works with per-event reports only')
+    if args.incremental and args.device_series:
+        parser.error('--incremental rewrites the single total trend series; drop --device-series')
+    if args.backend != 'slides' and args.device_series:
+        parser.error('--device-series applies to the Sheets trend chart of the slides backend')
+    if args.backend != 'slides' and (args.deck or args.shared_workbook or args.incremental or args.dry_run):
+        parser.error(f'--backend {args.backend} writes one local file per event and makes no Google calls')
+    if args.daemon and (args.dry_run or args.backend != 'slides'):
+        parser.error('--daemon builds real Google reports; use report_scheduler.py plan to preview')
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.backend != 'slides':
+        main_local(args)
+        return
+    if args.dry_run:
+        # No OAuth and no quotas: one shared set of recording stand-ins
+        recorder = Recorder()
+        services = build_fake_services(recorder=recorder)
+        make_services = lambda: services
+        api_scheduler.configure(quotas={})
+    else:
+        creds = get_credentials()
+        make_services = lambda: build_services(creds, discovery=args.discovery)
+
+    # Dry-run report IDs are fake, so a dry run's state never reaches the state file
+    state = ReportState(None if args.dry_run else args.state_file) if args.incremental else None
+    seating.configure(args.seating_file, args.seating_window)
+    sheet_helper.configure(args.device_series)
+    # Dry runs upload to fake Drive, so their file IDs must not reach the cache file
+    image_assets.configure(args.image_url_template, path=None if args.dry_run else image_assets.IMAGE_CACHE_PATH)
+    # ...and neither must the fake template's slide IDs
+    template_cache.configure(None if args.dry_run else template_cache.CACHE_PATH)
+    if args.daemon:
+        # Events can come due several times a day, so each firing journals
+        # under its own trigger time
+        run_daemon(args.events_file, lambda events, trigger: run_reports(
+            args, events, make_services, state, str(trigger.date()), trigger.isoformat(timespec='minutes')),
+                   poll_seconds=args.poll_seconds)
+        return
+    todays_events = select_events(args.events_file, args.date, args.incremental)
+    results = run_reports(args, todays_events, make_services, state, args.date)
+    if args.dry_run:
+        recorder.write_jsonl(args.dry_run_output, results)
+        print(f"✅ Dry-run requests written to {args.dry_run_output}")
+
+def run_reports(args, events, make_services, state, run_date, run_key=None):
+    # run_key names the run in the journal (default: run_date). Timings, API
+    # metrics and the template version are per run, so a daemon firing only
+    # reports its own and picks up template edits.
+    tracing.configure(keep_spans=bool(args.trace_file))
+    api_scheduler.scheduler.reset_metrics()
+    template_cache.reset()
+    if args.history_db:
+        history_store.configure(args.history_db).ingest(events)
+    # Dry runs create nothing real, so there is nothing to resume or reuse
+    journal = None
+    if not (args.dry_run or args.no_journal):
+        journal = RunJournal(args.journal_file, run_date=run_key or run_date)
+    if not (args.dry_run or args.no_report_cache):
+        report_cache.configure(args.report_cache, args.report_cache_size)
+    folder_id = None
+    services = None
+    if args.drive_folder and events:
+        services = make_services()
+        folder_id = drive_ops.ensure_folder(services[1], f"HawkEye Reports {run_date}", args.drive_folder)
+    try:
+        results = run_pipeline(events, make_services, workers=args.workers,
+                               shared_workbook=args.shared_workbook, events_per_tab=args.events_per_tab,
+                               deck=args.deck, state=state, journal=journal,
+                               folder_id=folder_id, share_with=args.share_with, services=services,
+                               run_date=run_date)
+    finally:
+        if journal:
+            journal.close()
+        if state is not None:
+            state.save()
+
+    api_scheduler.scheduler.print_metrics()
+    tracing.tracer.print_summary()
+    if args.metrics_file:
+        api_scheduler.scheduler.write_metrics(args.metrics_file)
+    if args.trace_file:
+        tracing.tracer.export(args.trace_file, args.trace_format)
+    return results
+
+def main_local(args):
+    # Local files: no credentials, no API calls; workers are processes here
+    seating.configure(args.seating_file, args.seating_window)
+    todays_events = select_events(args.events_file, args.date)
+    if args.history_db:
+        history_store.configure(args.history_db).ingest(todays_events)
+    results = render_reports(todays_events, args.output_dir, args.backend, processes=args.workers)
+    print_summary(results)
+    done = sum(1 for r in results if r['error'] is None)
+    print(f"✅ {done} {args.backend} reports written to {args.output_dir}")
 
 if __name__ == '__main__':
     main()
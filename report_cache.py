@@ -0,0 +1,135 @@
+# Content-addressed cache of finished per-event reports. The key is a SHA-256
+# over everything that ends up in a report: the event fields the layout and
+# charts read, the event's seating rows, the trend settings, the history
+# comparison and the template's version. A rerun whose inputs hash the same gets
+# the stored spreadsheet and presentation IDs back without any API call. Each
+# event keeps only its latest report, and the least recently used entries are
+# evicted once the cache holds max_entries. The template version is checked with
+# Drive once per run, so editing the template rebuilds every report.
+#   python report_cache.py invalidate --event evn-bbd437d5   (or --all)
+#   python report_cache.py stats
+import argparse
+import hashlib
+import json
+import time
+
+import history_store
+import sheet_helper
+from seating import seat_rows
+from storage import thread_connections
+
+REPORT_CACHE_PATH = 'report_cache.db'
+DEFAULT_MAX_ENTRIES = 10000
+
+# Event fields read by report_layout, sheet_helper, seating and image_assets
+REPORT_FIELDS = ('event_uuid', 'event_title', 'start_date', 'end_date', 'devices', 'analytics',
+                 'analytics_summary', 'latest_image_url_id')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    key TEXT PRIMARY KEY,
+    event_uuid TEXT,
+    report TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_used ON reports (used);
+CREATE INDEX IF NOT EXISTS reports_event ON reports (event_uuid);
+"""
+
+
+def report_key(event, template_version=None):
+    previous = None
+    if history_store.store and event.get('analytics'):
+        previous = history_store.store.previous_period(event)
+    inputs = {
+        'event': {field: event.get(field) for field in REPORT_FIELDS},
+        'seats': seat_rows(event),
+        'trend': dict(sheet_helper.settings),
+        'history': previous,
+        'template': template_version
+    }
+    blob = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    def __init__(self, path=REPORT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.connection = thread_connections(path)
+        self.connection().executescript(SCHEMA)
+
+    def get(self, key):
+        db = self.connection()
+        row = db.execute('SELECT report FROM reports WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with db:
+            db.execute('UPDATE reports SET used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, event, report):
+        db = self.connection()
+        uuid = event.get('event_uuid')
+        with db:
+            # The event's older reports were built from inputs that changed since
+            if uuid:
+                db.execute('DELETE FROM reports WHERE event_uuid = ? AND key != ?', (uuid, key))
+            db.execute('INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?)',
+                       (key, uuid, json.dumps(report), time.time()))
+            excess = db.execute('SELECT COUNT(*) FROM reports').fetchone()[0] - self.max_entries
+            if excess > 0:
+                db.execute('DELETE FROM reports WHERE key IN '
+                           '(SELECT key FROM reports ORDER BY used LIMIT ?)', (excess,))
+
+    def invalidate(self, event_uuids=None):
+        # Drops the given events' entries, or everything; returns how many went
+        db = self.connection()
+        with db:
+            if event_uuids is None:
+                return db.execute('DELETE FROM reports').rowcount
+            return sum(db.execute('DELETE FROM reports WHERE event_uuid = ?', (uuid,)).rowcount
+                       for uuid in event_uuids)
+
+    def stats(self):
+        count, oldest, newest = self.connection().execute(
+            'SELECT COUNT(*), MIN(used), MAX(used) FROM reports').fetchone()
+        return {'entries': count, 'max_entries': self.max_entries, 'oldest_use': oldest, 'newest_use': newest}
+
+
+# Set by configure(); the pipeline only consults the cache when one is open
+cache = None
+
+
+def configure(path=REPORT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+    global cache
+    cache = ReportCache(path, max_entries)
+    return cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect or clear the report cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    invalidate = commands.add_parser('invalidate', help='forget cached reports so the next run rebuilds them')
+    targets = invalidate.add_mutually_exclusive_group(required=True)
+    targets.add_argument('--event', nargs='+', dest='events', help='event UUIDs to rebuild')
+    targets.add_argument('--all', action='store_true')
+    stats = commands.add_parser('stats', help='entry count and last use')
+    for command in (invalidate, stats):
+        command.add_argument('--db', default=REPORT_CACHE_PATH)
+    args = parser.parse_args(argv)
+
+    report_cache = ReportCache(args.db)
+    if args.command == 'invalidate':
+        count = report_cache.invalidate(None if args.all else args.events)
+        print(f"✅ {count} cached reports invalidated")
+    else:
+        stats = report_cache.stats()
+        print(f"{stats['entries']} cached reports")
+        if stats['entries']:
+            for label, stamp in (('least recently used', stats['oldest_use']), ('most recently used', stats['newest_use'])):
+                print(f"{label}: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stamp))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Description of the single-slide portrait event report, shared by every renderer
+import hashlib
+import re
+
+import history_store
+from analytics import format_change, percent_change, summarize
+from image_assets import snapshot_ids
+from slide_layout import DARK_GREY, WHITE, chart, image, kpi_card, row, stack, table, text
+
+HEADER_BLUE = {"red": 0.23, "green": 0.51, "blue": 0.79}
+LIGHT_GREEN = {"red": 0.4, "green": 0.8, "blue": 0.4}
+LIGHT_RED = {"red": 0.8, "green": 0.4, "blue": 0.4}
+
+
+# Slides objectIds are 5-50 characters; the longest derived ID is "kpi2_<key>_change"
+MAX_KEY_LENGTH = 38
+
+
+def object_ids(event):
+    # Keyed on the event UUID so many events can share one deck without clashes
+    key = re.sub(r'[^A-Za-z0-9_-]', '_', event.get('event_uuid') or '')
+    if not key:
+        title = event.get('event_title', 'Untitled')
+        key = hashlib.sha1(title.encode('utf-8')).hexdigest()[:16]
+    key = key[:MAX_KEY_LENGTH]
+    names = ('slide', 'title', 'table', 'kpi1', 'kpi2', 'chart1', 'chart2')
+    return {name: f"{name}_{key}" for name in names}
+
+
+def format_count(value):
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.1f}"
+
+
+def kpi_values(event, ids, summary=None):
+    # (object id, title, value, change, background) per KPI card. Peak and
+    # average, and each one's own change, come from the device-summed trend; the export's own summary is
+    # only used when the event has no analytics records. summary is the
+    # event's analytics.summarize result when the caller already has it.
+    if event.get('analytics'):
+        stats = summary if summary is not None else summarize(event)
+        peak, average = stats['peak'], stats['average']
+        peak_change = format_change(stats['peak_change_pct'])
+        change = format_change(stats['change_pct'])
+        # With a history store, compare against the same window last month
+        previous = history_store.store.previous_period(event) if history_store.store else None
+        if previous:
+            peak_change = format_change(percent_change(peak, previous['peak']), 'last month')
+            change = format_change(percent_change(average, previous['average']), 'last month')
+    else:
+        summary = event.get('analytics_summary', {})
+        peak, average = summary.get('max_count', 0), summary.get('average_count', 0)
+        peak_change = change = format_change(None)
+    return [
+        (ids['kpi1'], "Total Count", format_count(peak), peak_change, LIGHT_GREEN),
+        (ids['kpi2'], "Aggregated Count", format_count(average), change, LIGHT_RED)
+    ]
+
+
+def build_report_layout(event, sheet_id, chart_ids, ids, images=None, summary=None):
+    # images maps image IDs to checked, Drive-hosted URLs (image_assets.py);
+    # IDs without one are left off the slide rather than failing the batch
+    images = images or {}
+    snapshots = [image(images[i], 96, 54) for i in snapshot_ids(event) if i in images]
+
+    # Get event details for the table - simplified
+    event_details = [
+        ["Information", "Details"],
+        ["Name", event.get("event_title", "")],
+        ["Date", event.get("start_date", "")],
+        ["Location", "12 Melbourne Oxford"],
+        ["Total Attendance", "5,000"]
+    ]
+
+    return stack([
+        row([
+            text(ids['title'], "EVENT REPORT", 40, font_size=24, bold=True, color=DARK_GREY),
+            image(images.get(event.get("latest_image_url_id")), 100, 40)
+        ], gap=12),
+        table(ids['table'], event_details, 120, header_fill=HEADER_BLUE, header_color=WHITE),
+        row([kpi_card(*kpi) for kpi in kpi_values(event, ids, summary)]),
+        row(snapshots[:5], gap=12) if snapshots else None,
+        chart(ids['chart1'], sheet_id, chart_ids[0]),
+        chart(ids['chart2'], sheet_id, chart_ids[1])
+    ], gap=16)
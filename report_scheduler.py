@@ -0,0 +1,356 @@
+# Long-running scheduler: works out when each event's report is due from its
+# own schedule (timezone, start/end time, repeat_type, event_interval,
+# repeat_every, event_days, cron_expression) and fires it shortly after the
+# occurrence ends, instead of reporting every event ending "today" at one
+# cron tick. Upcoming triggers sit in a heap keyed by UTC time; when the events
+# file changes only events whose schedule fields changed are re-planned, and
+# stale heap entries are dropped lazily.
+#   python report_scheduler.py plan --events-file event_data.json --limit 20
+import argparse
+import functools
+import heapq
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from time import sleep
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from event_loader import iter_events
+
+# Reports fire this long after an occurrence ends, once its analytics are in
+DEFAULT_DELAY = timedelta(minutes=5)
+
+# On startup, occurrences that ended this recently still get their report
+DEFAULT_CATCH_UP = timedelta(hours=6)
+
+DEFAULT_POLL_SECONDS = 60
+
+SCHEDULE_FIELDS = ('repeat_type', 'event_interval', 'repeat_every', 'event_days', 'cron_expression',
+                   'timezone', 'start_date', 'end_date', 'start_time', 'end_time', 'duration')
+
+MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'))}
+DAY_NAMES = {name: i for i, name in enumerate(('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'))}
+
+# Recurring events repeat forever; a search this long finds any valid next date
+MAX_SEARCH_DAYS = 366 * 5
+
+# Occurrences next_trigger steps over when a DST change puts them before `after`
+MAX_SKIPPED_OCCURRENCES = 4
+
+
+def parse_cron_field(field, low, high, names=None):
+    def value(text):
+        return names[text] if names and text in names else int(text)
+
+    values = set()
+    for part in field.lower().split(','):
+        part, _, step = part.partition('/')
+        if part in ('*', ''):
+            start, end = low, high
+        elif '-' in part:
+            start, end = (value(p) for p in part.split('-'))
+        else:
+            # "3/1" runs from 3 to the end of the range
+            start = value(part)
+            end = high if step else start
+        step = int(step or 1)
+        values.update(range(start, end + 1, step))
+    if not values or min(values) < low or max(values) > high:
+        raise ValueError(f"cron field {field!r} is outside {low}-{high}")
+    return values
+
+
+class CronSchedule:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expression!r}")
+        self.minutes = sorted(parse_cron_field(fields[0], 0, 59))
+        self.hours = sorted(parse_cron_field(fields[1], 0, 23))
+        self.days = parse_cron_field(fields[2], 1, 31)
+        self.months = parse_cron_field(fields[3], 1, 12, MONTH_NAMES)
+        # 7 is also Sunday
+        self.weekdays = {d % 7 for d in parse_cron_field(fields[4], 0, 7, DAY_NAMES)}
+        # Like Vixie cron, a field starting with "*" (also "*/2") counts as unrestricted
+        self.any_day = fields[2].startswith('*')
+        self.any_weekday = fields[4].startswith('*')
+
+    def day_matches(self, day):
+        in_month = day.day in self.days
+        in_week = day.isoweekday() % 7 in self.weekdays
+        # Like cron: when both are restricted, either one matching is enough
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment):
+        # First matching minute strictly after a naive local datetime
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = moment.date()
+        for _ in range(MAX_SEARCH_DAYS):
+            if day.month in self.months and self.day_matches(day):
+                earliest = (moment.hour, moment.minute) if day == moment.date() else (0, 0)
+                for hour in self.hours:
+                    if hour < earliest[0]:
+                        continue
+                    for minute in self.minutes:
+                        if (hour, minute) >= earliest:
+                            return datetime.combine(day, time(hour, minute))
+            day += timedelta(days=1)
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def cron_schedule(expression):
+    # Exports repeat the same few expressions across thousands of events
+    return CronSchedule(expression)
+
+
+@functools.lru_cache(maxsize=None)
+def event_zone(name):
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def parse_time(text):
+    try:
+        return time.fromisoformat(text) if text else None
+    except ValueError:
+        return None
+
+
+def parse_date(text):
+    try:
+        return date.fromisoformat(text) if text else None
+    except ValueError:
+        return None
+
+
+def occurrence_length(schedule):
+    start, end = parse_time(schedule.get('start_time')), parse_time(schedule.get('end_time'))
+    if start and end:
+        minutes = (end.hour * 60 + end.minute - start.hour * 60 - start.minute) % (24 * 60)
+        return timedelta(minutes=minutes)
+    return timedelta(hours=float(schedule.get('duration') or 0))
+
+
+def add_months(day, months):
+    # None when the day doesn't exist in the target month (Feb 30, Feb 29 off leap years)
+    month_index = day.month - 1 + months
+    try:
+        return day.replace(year=day.year + month_index // 12, month=month_index % 12 + 1)
+    except ValueError:
+        return None
+
+
+def weekday_set(text):
+    days = set()
+    for name in (text or '').replace(' ', '').lower().split(','):
+        if name[:3] in DAY_NAMES:
+            days.add(DAY_NAMES[name[:3]])
+    return days
+
+
+def next_interval_start(schedule, first, after):
+    # Next occurrence start after `after` for repeat rules without a cron
+    # expression; first and after are naive local datetimes
+    every = max(1, int(schedule.get('repeat_every') or 1))
+    interval = (schedule.get('event_interval') or '').lower()
+    if after < first:
+        return first
+    if interval == 'daily':
+        periods = (after - first) // timedelta(days=every) + 1
+        return first + periods * timedelta(days=every)
+    if interval == 'weekly':
+        days = weekday_set(schedule.get('event_days')) or {first.isoweekday() % 7}
+        week_start = first.date() - timedelta(days=first.weekday())
+        day = after.date()
+        for _ in range(7 * every + 7):
+            candidate = datetime.combine(day, first.time())
+            if (candidate > after and day.isoweekday() % 7 in days
+                    and ((day - week_start).days // 7) % every == 0):
+                return candidate
+            day += timedelta(days=1)
+        return None
+    if interval in ('monthly', 'annually', 'yearly'):
+        step = every * (12 if interval != 'monthly' else 1)
+        months = ((after.year - first.year) * 12 + after.month - first.month) // step * step
+        for _ in range(MAX_SEARCH_DAYS // 28):
+            day = add_months(first.date(), months)
+            if day is not None and datetime.combine(day, first.time()) > after:
+                return datetime.combine(day, first.time())
+            months += step
+        return None
+    return None
+
+
+def next_trigger(schedule, after, delay=DEFAULT_DELAY):
+    # UTC datetime of the first report trigger after `after` (aware), or None
+    # when the event has no occurrences left
+    zone = event_zone(schedule.get('timezone'))
+    length = occurrence_length(schedule)
+    start_time = parse_time(schedule.get('start_time')) or time(0, 0)
+    start_date = parse_date(schedule.get('start_date'))
+    local_after = (after - length - delay).astimezone(zone).replace(tzinfo=None)
+
+    if schedule.get('repeat_type') != 'Recurring':
+        end_date = parse_date(schedule.get('end_date')) or start_date
+        if end_date is None:
+            return None
+        end_time = parse_time(schedule.get('end_time'))
+        if end_time is not None:
+            end = datetime.combine(end_date, end_time)
+        else:
+            end = datetime.combine(start_date or end_date, start_time) + length
+        trigger = end.replace(tzinfo=zone).astimezone(timezone.utc) + delay
+        return trigger if trigger > after else None
+
+    first = datetime.combine(start_date or local_after.date(), start_time)
+    cron = None
+    if schedule.get('cron_expression'):
+        try:
+            cron = cron_schedule(schedule['cron_expression'])
+        except ValueError:
+            return None
+    for _ in range(MAX_SKIPPED_OCCURRENCES):
+        if cron is not None:
+            # The series starts on start_date
+            start = cron.next_after(max(local_after, first - timedelta(minutes=1)))
+        else:
+            start = next_interval_start(schedule, first, local_after)
+        if start is None:
+            return None
+        trigger = (start + length).replace(tzinfo=zone).astimezone(timezone.utc) + delay
+        if trigger > after:
+            return trigger
+        # local_after is wall-clock arithmetic, so across a DST change the
+        # occurrence found can still end before `after`: take the next one
+        local_after = start
+    return None
+
+
+class ReportPlanner:
+    def __init__(self, delay=DEFAULT_DELAY):
+        self.delay = delay
+        self.schedules = {}
+        # event_uuid -> planned trigger timestamp; heap entries not matching it are stale
+        self.planned = {}
+        # event_uuid -> last trigger fired, so a re-plan never repeats one
+        self.fired = {}
+        self.heap = []
+
+    def load(self, events, after):
+        # Re-plans new and changed events only; returns how many were (re)planned.
+        # after may lie in the past so an edit moving an end time back still fires
+        changed = 0
+        seen = set()
+        for event in events:
+            uuid = event.get('event_uuid')
+            if not uuid:
+                continue
+            seen.add(uuid)
+            schedule = {field: event.get(field) for field in SCHEDULE_FIELDS}
+            if self.schedules.get(uuid) == schedule:
+                continue
+            self.schedules[uuid] = schedule
+            self.plan(uuid, after)
+            changed += 1
+        for uuid in set(self.schedules) - seen:
+            del self.schedules[uuid]
+            self.planned.pop(uuid, None)
+            self.fired.pop(uuid, None)
+        return changed
+
+    def plan(self, uuid, after):
+        if uuid in self.fired:
+            after = max(after, self.fired[uuid])
+        trigger = next_trigger(self.schedules[uuid], after, self.delay)
+        if trigger is None:
+            self.planned.pop(uuid, None)
+            return
+        stamp = trigger.timestamp()
+        self.planned[uuid] = stamp
+        heapq.heappush(self.heap, (stamp, uuid))
+
+    def next_time(self):
+        while self.heap and self.planned.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        # {event_uuid: trigger time} for every trigger at or before now
+        due = {}
+        while self.next_time() is not None and self.heap[0][0] <= now.timestamp():
+            stamp, uuid = heapq.heappop(self.heap)
+            del self.planned[uuid]
+            due[uuid] = self.fired[uuid] = datetime.fromtimestamp(stamp, timezone.utc)
+        return due
+
+    def upcoming(self, limit=20):
+        entries = sorted((stamp, uuid) for uuid, stamp in self.planned.items())[:limit]
+        return [(uuid, datetime.fromtimestamp(stamp, timezone.utc)) for stamp, uuid in entries]
+
+
+def run_daemon(path, run_reports, poll_seconds=DEFAULT_POLL_SECONDS, delay=DEFAULT_DELAY,
+               catch_up=DEFAULT_CATCH_UP):
+    # run_reports(events, trigger) builds the reports for the events that are
+    # due, trigger being the latest of their trigger times; never returns
+    planner = ReportPlanner(delay)
+    mtime = None
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            current = os.stat(path).st_mtime_ns
+        except OSError:
+            current = mtime
+        if current != mtime:
+            # Also picks up occurrences that ended while the daemon was down
+            changed = planner.load(iter_events(path), now - catch_up)
+            mtime = current
+            next_time = planner.next_time()
+            print(f"✅ {len(planner.planned)} events planned ({changed} changed); next report "
+                  f"{datetime.fromtimestamp(next_time, timezone.utc).isoformat() if next_time else 'none'}")
+
+        due = planner.pop_due(now)
+        if due:
+            # One streaming pass picks the full records of the events that are due
+            events = [event for event in iter_events(path) if event.get('event_uuid') in due]
+            print(f"\n⏰ {now.isoformat(timespec='seconds')}: {len(events)} reports due")
+            try:
+                run_reports(events, max(due.values()))
+            except Exception as e:
+                print(f"❌ Report run failed: {e!r}")
+            for uuid in due:
+                if uuid in planner.schedules:
+                    planner.plan(uuid, now)
+
+        next_time = planner.next_time()
+        if next_time is not None:
+            wait = min(poll_seconds, next_time - datetime.now(timezone.utc).timestamp())
+        else:
+            wait = poll_seconds
+        sleep(max(wait, 0.5))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show when event reports are due')
+    commands = parser.add_subparsers(dest='command', required=True)
+    plan = commands.add_parser('plan', help='list the next report triggers')
+    plan.add_argument('--events-file', default='event_data.json')
+    plan.add_argument('--limit', type=int, default=20)
+    plan.add_argument('--after', help='ISO timestamp to plan from (default: now)')
+    args = parser.parse_args(argv)
+
+    after = datetime.fromisoformat(args.after) if args.after else datetime.now(timezone.utc)
+    if after.tzinfo is None:
+        after = after.replace(tzinfo=timezone.utc)
+    planner = ReportPlanner()
+    planner.load(iter_events(args.events_file), after)
+    for uuid, trigger in planner.upcoming(args.limit):
+        print(f"{trigger.isoformat(timespec='minutes')}  {uuid}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Local state for incremental reports: which spreadsheet, charts and deck belong
+# to each event, and how far into its analytics they have been written, so a
+# refresh only sends the new rows and rewrites the KPI text. Changes are written
+# out every SAVE_EVERY updates and by save() at the end of a run, not per event.
+import json
+import os.path
+import threading
+
+from storage import write_json
+
+STATE_PATH = 'report_state.json'
+
+# Updates held in memory before the file is rewritten
+SAVE_EVERY = 100
+
+
+def analytics_watermark(event):
+    # ISO timestamps sort as strings
+    return max((entry.get('datetime', '') for entry in event.get('analytics', [])), default=None)
+
+
+class ReportState:
+    def __init__(self, path=STATE_PATH, save_every=SAVE_EVERY):
+        # path=None keeps the state in memory only (dry runs)
+        self.path = path
+        self.save_every = save_every
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.unsaved = 0
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+
+    def get(self, event):
+        with self.lock:
+            return self.entries.get(event.get('event_uuid'))
+
+    def update(self, event, **fields):
+        uuid = event.get('event_uuid')
+        if not uuid:
+            return
+        with self.lock:
+            self.entries.setdefault(uuid, {}).update(fields)
+            self.unsaved += 1
+            if self.unsaved >= self.save_every:
+                self.write()
+
+    def save(self):
+        with self.lock:
+            if self.unsaved:
+                self.write()
+
+    def write(self):
+        # Called with the lock held
+        self.unsaved = 0
+        if not self.path:
+            return
+        write_json(self.path, self.entries)
@@ -0,0 +1,101 @@
+# Append-only journal of finished pipeline steps, keyed by run date and
+# event_uuid. Each step (sheet created, charts added, deck copied, slides
+# written) is appended and fsynced as soon as it succeeds, so a rerun after a
+# crash skips finished events and resumes partial ones from their last step
+# instead of creating a second spreadsheet and presentation. Opening the journal
+# for a run drops every other run's records, so it only ever holds one run; the
+# files those runs created for events they never finished are handed back as
+# `abandoned` so they can be deleted.
+import json
+import os
+import threading
+import time
+
+from storage import atomic_write
+
+JOURNAL_PATH = 'run_journal.jsonl'
+
+# Run-level entries for work shared by every event
+WORKBOOK_KEY = '__shared_workbook__'
+DECK_KEY = '__deck__'
+
+
+class RunJournal:
+    def __init__(self, path=JOURNAL_PATH, run_date=None):
+        self.path = path
+        self.run_date = run_date
+        self.lock = threading.Lock()
+        self.steps = {}
+        # Other runs' steps, by (run, key)
+        dropped = {}
+        kept = []
+        stale = False
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-append leaves a torn last line
+                        stale = True
+                        continue
+                    if record.get('run_date') == run_date:
+                        self.steps.setdefault(record['key'], {})[record['step']] = record.get('data', {})
+                        kept.append(line if line.endswith('\n') else line + '\n')
+                    else:
+                        stale = True
+                        dropped.setdefault((record.get('run_date'), record['key']), {})[record['step']] = \
+                            record.get('data', {})
+        self.abandoned = unfinished_files(dropped.values())
+        if stale:
+            # Earlier runs are finished with; compacting keeps every open a short read
+            atomic_write(path, kept, durable=True)
+        self.file = open(path, 'a')
+
+    def get(self, key, step):
+        with self.lock:
+            return self.steps.get(key, {}).get(step)
+
+    def record(self, key, step, **data):
+        line = json.dumps({'run_date': self.run_date, 'key': key, 'step': step,
+                           'data': data, 'at': time.time()})
+        with self.lock:
+            self.steps.setdefault(key, {})[step] = data
+            self.file.write(line + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def progress(self, event):
+        # Events without a UUID can't be matched up on a rerun
+        uuid = event.get('event_uuid')
+        return EventProgress(self, uuid) if uuid else None
+
+    def close(self):
+        self.file.close()
+
+
+def unfinished_files(step_sets):
+    # Template copies and spreadsheets of events whose run never reached 'done';
+    # no later run resumes them
+    files = []
+    for steps in step_sets:
+        if 'done' in steps:
+            continue
+        for step, field in (('deck_copied', 'presentation_id'), ('sheet_created', 'sheet_id')):
+            file_id = (steps.get(step) or {}).get(field)
+            if file_id:
+                files.append(file_id)
+    return files
+
+
+class EventProgress:
+    # One event's (or one shared resource's) view of the journal
+    def __init__(self, journal, key):
+        self.journal = journal
+        self.key = key
+
+    def get(self, step):
+        return self.journal.get(self.key, step)
+
+    def record(self, step, **data):
+        self.journal.record(self.key, step, **data)
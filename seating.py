@@ -0,0 +1,101 @@
+# Seating densities from seating.json, parsed once per run (and again only when
+# the file's mtime changes) and indexed by section name, so each event's seat
+# chart shows the sections its own devices cover (devices[].section_name).
+import json
+import os
+import threading
+
+SEATING_PATH = 'seating.json'
+
+# A weekly_data key such as 'last_week', or a number of weeks to average over
+DEFAULT_WINDOW = 'last_week'
+
+# Used when seating.json is missing or unreadable
+FALLBACK_ROWS = [
+    ['Section 1', -1.0],
+    ['Section 2', -0.5],
+    ['Section 3', 0.0],
+    ['Section 4', 0.5],
+    ['Section 5', 1.0]
+]
+
+_cache = {}
+_lock = threading.Lock()
+
+# Set by configure(); main.py passes the CLI choices through here
+settings = {'path': SEATING_PATH, 'window': DEFAULT_WINDOW}
+
+
+def configure(path=SEATING_PATH, window=DEFAULT_WINDOW):
+    settings.update(path=path, window=parse_window(window))
+
+
+def parse_window(window):
+    # '4' means a rolling average over the four most recent weeks
+    if isinstance(window, str) and window.isdigit():
+        return int(window)
+    return window
+
+
+def density(section, window=DEFAULT_WINDOW):
+    weekly_data = section.get('weekly_data', {})
+    if isinstance(window, int):
+        # weekly_data lists the most recent week first
+        weeks = [week.get('seating_density') for week in list(weekly_data.values())[:window]
+                 if isinstance(week, dict) and week.get('seating_density') is not None]
+        return round(sum(weeks) / len(weeks), 3) if weeks else 0
+    return weekly_data.get(window, {}).get('seating_density', 0)
+
+
+class SeatingIndex:
+    def __init__(self, seating_data):
+        self.sections = seating_data.get('sections', [])
+        self.by_name = {}
+        for section in self.sections:
+            self.by_name.setdefault(section.get('section_name', 'Unknown'), section)
+
+    def sections_for(self, event):
+        # Sections named by the event's devices, in device order; events whose
+        # devices have no section get every section, as before
+        names = []
+        for device in event.get('devices', []) if event else []:
+            name = device.get('section_name')
+            if name in self.by_name and name not in names:
+                names.append(name)
+        if not names:
+            return self.sections
+        return [self.by_name[name] for name in names]
+
+    def rows(self, event=None, window=DEFAULT_WINDOW):
+        return [[section.get('section_name', 'Unknown'), density(section, window)]
+                for section in self.sections_for(event)]
+
+
+def load_seating(path=SEATING_PATH):
+    # One stat per call; the file is only re-parsed when it has changed
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = None
+        if mtime is not None:
+            try:
+                with open(path, 'r') as f:
+                    index = SeatingIndex(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"❌ Could not read {path}, using placeholder seat data: {e}")
+        else:
+            print(f"❌ {path} not found, using placeholder seat data")
+        _cache[path] = (mtime, index)
+        return index
+
+
+def seat_rows(event=None, path=None, window=None):
+    index = load_seating(path or settings['path'])
+    if index is None:
+        return [list(row) for row in FALLBACK_ROWS]
+    return index.rows(event, settings['window'] if window is None else window)
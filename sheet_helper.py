@@ -1,30 +1,36 @@
 # Updated sheet_helper.py
 import time
-import json
 
-def create_sheet_and_charts(sheets_service, event):
-    title = event.get("event_title", "Untitled")[:30]
-    spreadsheet = sheets_service.spreadsheets().create(body={
-        'properties': {'title': f"{title} Sheet"},
-        'sheets': [
-            {'properties': {'title': 'TrendData'}},
-            {'properties': {'title': 'SeatData'}}
-        ]
-    }).execute()
+from analytics import DEFAULT_TREND_POINTS, device_matrix, device_rows, summarize, trend_rows
+from api_scheduler import execute
+from seating import seat_rows
+from tracing import span
+from value_writer import DEFAULT_GRID, MAX_INLINE_CELLS, MAX_SPREADSHEET_CELLS, ValueWriter, cell_data
 
-    sheet_id = spreadsheet['spreadsheetId']
-    print(f"✅ Sheet created: https://docs.google.com/spreadsheets/d/{sheet_id}")
+# Events packed into each TrendData_N / SeatData_N tab of a shared workbook
+DEFAULT_EVENTS_PER_TAB = 50
+
+# sheetIds assigned at create time so charts can reference tabs without a GET
+TREND_SHEET_ID = 1
+SEAT_SHEET_ID = 2
+
+# device_series > 0 splits TrendData per device and stacks that many of the
+# busiest devices (plus the rest as "Other") in the trend chart
+settings = {'device_series': 0}
+
+def configure(device_series=0):
+    settings['device_series'] = device_series
 
+def build_trend_data(event, points=DEFAULT_TREND_POINTS, summary=None):
     # Prepare Trend Data from analytics
-    trend_headers = [['Time', 'Count']]
     trend_data = []
     
-    # Use real analytics data if available
+    # Use real analytics data if available, summed across devices and
+    # downsampled to at most `points` rows; summary is the event's
+    # analytics.summarize result when the caller already has it
     analytics = event.get('analytics', [])
     if analytics:
-        for entry in analytics:
-            time_str = entry.get('datetime', '').split('T')[1][:5]  # Get HH:MM from datetime
-            trend_data.append([time_str, entry.get('headcount', 0)])
+        trend_data = trend_rows(summary if summary is not None else summarize(event, points))
     else:
         # Fallback to dummy data
         trend_data = [
@@ -36,178 +42,344 @@ def create_sheet_and_charts(sheets_service, event):
             ['18:00', 35],
             ['20:00', 20]
         ]
+    return trend_data
 
-    # Load seating data from seating.json
-    try:
-        with open('seating.json', 'r') as f:
-            seating_data = json.load(f)
-            seat_data = []
-            for section in seating_data.get('sections', []):
-                section_name = section.get('section_name', 'Unknown')
-                weekly_data = section.get('weekly_data', {})
-                last_week = weekly_data.get('last_week', {})
-                seating_density = last_week.get('seating_density', 0)
-                seat_data.append([section_name, seating_density])
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Fallback to dummy data if seating.json is not available
-        seat_data = [
-            ['Section 1', -1.0],
-            ['Section 2', -0.5],
-            ['Section 3', 0.0],
-            ['Section 4', 0.5],
-            ['Section 5', 1.0]
-        ]
-
-    # Add headers for the seat data
-    seat_headers = [['Section', 'Density']]
-    seat_data = seat_headers + seat_data
+def trend_table(event, summary=None):
+    # TrendData rows with their header, and the columns the trend chart draws
+    # as stacked series (None for the single total line)
+    series = settings['device_series']
+    if series and event.get('analytics'):
+        rows = device_rows(device_matrix(event), series)
+        if rows:
+            devices = [i for i, name in enumerate(rows[0]) if name.startswith('Device ')]
+            columns = devices[:series]
+            if rows[0][-1] == 'Other devices':
+                columns.append(len(rows[0]) - 1)
+            return rows, columns
+    return [['Time', 'Count']] + build_trend_data(event, summary=summary), None
 
-    sheets_service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range=f'TrendData!A1:B{len(trend_data) + 1}',
-        valueInputOption='RAW',
-        body={'values': trend_headers + trend_data}
-    ).execute()
+def load_seat_data(event=None):
+    # Parsed once per run and indexed by section; see seating.py
+    return seat_rows(event)
 
-    sheets_service.spreadsheets().values().update(
-        spreadsheetId=sheet_id,
-        range=f'SeatData!A1:B{len(seat_data) + 1}',
-        valueInputOption='RAW',
-        body={'values': seat_data}
-    ).execute()
-
-    # Get sheet IDs
-    metadata = sheets_service.spreadsheets().get(spreadsheetId=sheet_id).execute()
-    sheet_id_map = {s['properties']['title']: s['properties']['sheetId'] for s in metadata['sheets']}
-
-    trend_sheet_id = sheet_id_map['TrendData']
-    seat_sheet_id = sheet_id_map['SeatData']
-
-    requests = [
-        {"addChart": {
-            "chart": {
-                "spec": {
-                    "title": "Crowd Trend Analysis",
-                    "basicChart": {
-                        "chartType": "LINE",
-                        "legendPosition": "NO_LEGEND",
-                        "axis": [
-                            {
-                                "position": "BOTTOM_AXIS",
-                                "title": ""
-                            },
-                            {
-                                "position": "LEFT_AXIS",
-                                "title": ""
-                            }
-                        ],
-                        "lineSmoothing": True,
-                        "series": [{
-                            "series": {"sourceRange": {"sources": [{
-                                "sheetId": trend_sheet_id,
-                                "startRowIndex": 1,
-                                "endRowIndex": len(trend_data) + 1,
-                                "startColumnIndex": 1,
-                                "endColumnIndex": 2
-                            }]}},
-                            "color": {"red": 0.3, "green": 0.5, "blue": 0.9},
-                            "lineStyle": {"width": 2}
-                        }],
-                        "domains": [{
-                            "domain": {
-                                "sourceRange": {
-                                    "sources": [{
-                                        "sheetId": trend_sheet_id,
-                                        "startRowIndex": 1,
-                                        "endRowIndex": len(trend_data) + 1,
-                                        "startColumnIndex": 0,
-                                        "endColumnIndex": 1
-                                    }]
-                                }
-                            }
-                        }]
+def trend_chart_request(sheet_id, start_row, end_row, anchor_row=0, chart_id=None, series_columns=None):
+    # series_columns: stacked per-device series, named from the header row above start_row
+    if series_columns:
+        start_row -= 1
+        series = [{
+            "series": {"sourceRange": {"sources": [{
+                "sheetId": sheet_id,
+                "startRowIndex": start_row,
+                "endRowIndex": end_row,
+                "startColumnIndex": column,
+                "endColumnIndex": column + 1
+            }]}},
+            "targetAxis": "LEFT_AXIS"
+        } for column in series_columns]
+    else:
+        series = [{
+            "series": {"sourceRange": {"sources": [{
+                "sheetId": sheet_id,
+                "startRowIndex": start_row,
+                "endRowIndex": end_row,
+                "startColumnIndex": 1,
+                "endColumnIndex": 2
+            }]}},
+            "color": {"red": 0.3, "green": 0.5, "blue": 0.9},
+            "lineStyle": {"width": 2}
+        }]
+    chart = {
+        "spec": {
+            "title": "Crowd Trend Analysis",
+            "basicChart": {
+                "chartType": "AREA" if series_columns else "LINE",
+                "legendPosition": "BOTTOM_LEGEND" if series_columns else "NO_LEGEND",
+                "axis": [
+                    {
+                        "position": "BOTTOM_AXIS",
+                        "title": ""
+                    },
+                    {
+                        "position": "LEFT_AXIS",
+                        "title": ""
                     }
-                },
-                "position": {
-                    "overlayPosition": {
-                        "anchorCell": {
-                            "sheetId": trend_sheet_id,
-                            "rowIndex": 0,
-                            "columnIndex": 3
+                ],
+                "lineSmoothing": True,
+                "series": series,
+                "domains": [{
+                    "domain": {
+                        "sourceRange": {
+                            "sources": [{
+                                "sheetId": sheet_id,
+                                "startRowIndex": start_row,
+                                "endRowIndex": end_row,
+                                "startColumnIndex": 0,
+                                "endColumnIndex": 1
+                            }]
                         }
                     }
+                }]
+            }
+        },
+        "position": {
+            "overlayPosition": {
+                "anchorCell": {
+                    "sheetId": sheet_id,
+                    "rowIndex": anchor_row,
+                    "columnIndex": 3
                 }
             }
-        }},
-        {"addChart": {
-            "chart": {
-                "spec": {
-                    "title": "Seat Sections",
-                    "basicChart": {
-                        "chartType": "COLUMN",
-                        "legendPosition": "NO_LEGEND",
-                        "axis": [
-                            {
-                                "position": "BOTTOM_AXIS",
-                                "title": "Section 1"
-                            },
-                            {
-                                "position": "LEFT_AXIS",
-                                "title": ""
-                            }
-                        ],
-                        "series": [{
-                            "series": {"sourceRange": {"sources": [{
-                                "sheetId": seat_sheet_id,
-                                "startRowIndex": 1,
-                                "endRowIndex": len(seat_data) + 1,
-                                "startColumnIndex": 1,
-                                "endColumnIndex": 2
-                            }]}},
-                            "color": {"red": 0.1, "green": 0.3, "blue": 0.6},
-                            "targetAxis": "LEFT_AXIS"
-                        }],
-                        "domains": [{
-                            "domain": {
-                                "sourceRange": {
-                                    "sources": [{
-                                        "sheetId": seat_sheet_id,
-                                        "startRowIndex": 1,
-                                        "endRowIndex": len(seat_data) + 1,
-                                        "startColumnIndex": 0,
-                                        "endColumnIndex": 1
-                                    }]
-                                }
-                            }
-                        }]
+        }
+    }
+    if series_columns:
+        chart["spec"]["basicChart"].update({"stackedType": "STACKED", "headerCount": 1})
+    if chart_id is not None:
+        chart["chartId"] = chart_id
+    return {"addChart": {"chart": chart}}
+
+def seat_chart_request(sheet_id, start_row, end_row, anchor_row=0, chart_id=None):
+    chart = {
+        "spec": {
+            "title": "Seat Sections",
+            "basicChart": {
+                "chartType": "COLUMN",
+                "legendPosition": "NO_LEGEND",
+                "axis": [
+                    {
+                        "position": "BOTTOM_AXIS",
+                        "title": "Section 1"
+                    },
+                    {
+                        "position": "LEFT_AXIS",
+                        "title": ""
                     }
-                },
-                "position": {
-                    "overlayPosition": {
-                        "anchorCell": {
-                            "sheetId": seat_sheet_id,
-                            "rowIndex": 0,
-                            "columnIndex": 3
+                ],
+                "series": [{
+                    "series": {"sourceRange": {"sources": [{
+                        "sheetId": sheet_id,
+                        "startRowIndex": start_row,
+                        "endRowIndex": end_row,
+                        "startColumnIndex": 1,
+                        "endColumnIndex": 2
+                    }]}},
+                    "color": {"red": 0.1, "green": 0.3, "blue": 0.6},
+                    "targetAxis": "LEFT_AXIS"
+                }],
+                "domains": [{
+                    "domain": {
+                        "sourceRange": {
+                            "sources": [{
+                                "sheetId": sheet_id,
+                                "startRowIndex": start_row,
+                                "endRowIndex": end_row,
+                                "startColumnIndex": 0,
+                                "endColumnIndex": 1
+                            }]
                         }
                     }
+                }]
+            }
+        },
+        "position": {
+            "overlayPosition": {
+                "anchorCell": {
+                    "sheetId": sheet_id,
+                    "rowIndex": anchor_row,
+                    "columnIndex": 3
                 }
             }
-        }}
-    ]
+        }
+    }
+    if chart_id is not None:
+        chart["chartId"] = chart_id
+    return {"addChart": {"chart": chart}}
+
+def create_sheet_and_charts(sheets_service, event, max_inline_cells=MAX_INLINE_CELLS, progress=None, summary=None):
+    # progress (run_journal.EventProgress) records each finished step so a rerun
+    # after a crash picks up the spreadsheet it already created
+    charted = progress.get('charts_added') if progress else None
+    if charted:
+        return charted['sheet_id'], charted['chart_ids']
+
+    title = event.get("event_title", "Untitled")[:30]
+    with span('sheet.data'):
+        trend_rows, series_columns = trend_table(event, summary)
+        seat_rows = [['Section', 'Density']] + load_seat_data(event)
+
+    writer = ValueWriter()
+    writer.add('TrendData', trend_rows)
+    writer.add('SeatData', seat_rows)
+    # Small data sets ride along in the create body, so no values call is needed
+    inline = writer.cell_count() <= max_inline_cells
+
+    created = progress.get('sheet_created') if progress else None
+    if created:
+        sheet_id = created['sheet_id']
+        inline = created['inline']
+        existing = existing_chart_ids(sheets_service, sheet_id)
+    else:
+        tabs = []
+        for tab_title, tab_sheet_id in (('TrendData', TREND_SHEET_ID), ('SeatData', SEAT_SHEET_ID)):
+            tab = {'properties': {'title': tab_title, 'sheetId': tab_sheet_id}}
+            grid = writer.grid_properties(tab_title)
+            if (grid['rowCount'], grid['columnCount']) != DEFAULT_GRID:
+                tab['properties']['gridProperties'] = grid
+            if inline:
+                tab['data'] = writer.grid_data(tab_title)
+            tabs.append(tab)
+        spreadsheet = execute(sheets_service.spreadsheets().create(body={
+            'properties': {'title': f"{title} Sheet"},
+            'sheets': tabs
+        }))
+
+        sheet_id = spreadsheet['spreadsheetId']
+        print(f"✅ Sheet created: https://docs.google.com/spreadsheets/d/{sheet_id}")
+        if progress:
+            progress.record('sheet_created', sheet_id=sheet_id, inline=inline)
+        existing = {}
 
-    sheets_service.spreadsheets().batchUpdate(
+    # Values writes overwrite, so a resumed sheet simply gets them again
+    if not inline:
+        writer.flush(sheets_service, sheet_id)
+
+    # Data rows sit below the header in row 0
+    chart_requests = (
+        (TREND_SHEET_ID, trend_chart_request(TREND_SHEET_ID, 1, len(trend_rows), series_columns=series_columns)),
+        (SEAT_SHEET_ID, seat_chart_request(SEAT_SHEET_ID, 1, len(seat_rows)))
+    )
+    requests = [request for tab, request in chart_requests if tab not in existing]
+    new_ids = []
+    if requests:
+        response = execute(sheets_service.spreadsheets().batchUpdate(
+            spreadsheetId=sheet_id,
+            body={"requests": requests}
+        ))
+        new_ids = chart_ids_from_replies(response, len(requests))
+    chart_ids = [existing[tab] if tab in existing else new_ids.pop(0) for tab, _ in chart_requests]
+
+    if progress:
+        progress.record('charts_added', sheet_id=sheet_id, chart_ids=chart_ids)
+    return sheet_id, chart_ids
+
+def existing_chart_ids(sheets_service, sheet_id):
+    # Charts a crashed run may already have added, by tab
+    spreadsheet = execute(sheets_service.spreadsheets().get(
+        spreadsheetId=sheet_id,
+        fields='sheets(properties/sheetId,charts/chartId)'
+    ))
+    return {sheet['properties']['sheetId']: sheet['charts'][0]['chartId']
+            for sheet in spreadsheet.get('sheets', []) if sheet.get('charts')}
+
+def chart_ids_from_replies(response, expected=2):
+    # addChart replies carry the new chart with its server-assigned chartId,
+    # in the same order as the requests
+    chart_ids = [reply['addChart']['chart']['chartId']
+                 for reply in response.get('replies', []) if 'addChart' in reply]
+    if len(chart_ids) < expected:
+        raise RuntimeError(f"Expected {expected} chart IDs in batchUpdate replies, got {chart_ids}")
+    return chart_ids
+
+def update_trend_data(sheets_service, sheet_id, chart_id, trend_rows, event, since=None, summary=None):
+    # Once analytics newer than `since` arrive, rewrites TrendData from all of
+    # the event's analytics and stretches the trend chart over it in one
+    # batchUpdate. Bucketing only the new readings would give partial device
+    # totals at another bucket width, so the whole (at most
+    # DEFAULT_TREND_POINTS rows) series is re-bucketed. Returns the new data
+    # row count, or None when there was nothing new.
+    if not any(since is None or entry.get('datetime', '') > since for entry in event.get('analytics', [])):
+        return None
+    rows = build_trend_data(event, summary=summary)
+
+    requests = [{"updateCells": {
+        "start": {"sheetId": TREND_SHEET_ID, "rowIndex": 1, "columnIndex": 0},
+        "rows": [{"values": [cell_data(v) for v in row]} for row in rows],
+        "fields": "userEnteredValue"
+    }}]
+    if trend_rows > len(rows):
+        # Wider buckets than last time (or the placeholder series): drop the leftover rows
+        requests.append({"deleteDimension": {"range": {
+            "sheetId": TREND_SHEET_ID, "dimension": "ROWS", "startIndex": len(rows) + 1, "endIndex": trend_rows + 1
+        }}})
+    chart = trend_chart_request(TREND_SHEET_ID, 1, len(rows) + 1)['addChart']['chart']
+    requests.append({"updateChartSpec": {"chartId": chart_id, "spec": chart['spec']}})
+
+    execute(sheets_service.spreadsheets().batchUpdate(
         spreadsheetId=sheet_id,
         body={"requests": requests}
-    ).execute()
+    ))
+    return len(rows)
 
-    # Get chart IDs
-    chart_metadata = sheets_service.spreadsheets().get(spreadsheetId=sheet_id, includeGridData=False).execute()
-    chart_ids = []
-    for sheet in chart_metadata.get("sheets", []):
-        for chart in sheet.get("charts", []):
-            chart_ids.append(chart["chartId"])
+def create_shared_workbook(sheets_service, events, events_per_tab=DEFAULT_EVENTS_PER_TAB, summaries=None,
+                           run_date=None):
+    # One workbook for the whole run. Each event gets a block of rows in a shared
+    # TrendData_N / SeatData_N tab pair, and every tab and chart is created in a
+    # single batchUpdate with sheetIds and chartIds chosen up front, so no
+    # metadata GETs and no per-event Sheets calls are needed. summaries lines
+    # up with events when the caller has already summarized them; run_date
+    # (the date being reported on) goes into the workbook's name.
+    requests = []
+    writer = ValueWriter()
+    placements = []
+    next_chart_id = 1
+    cells = 0
+    for first in range(0, len(events), events_per_tab):
+        tab = first // events_per_tab
+        trend_tab = {'title': f'TrendData_{tab + 1}', 'sheetId': 1000 + 2 * tab, 'row': 0, 'blocks': []}
+        seat_tab = {'title': f'SeatData_{tab + 1}', 'sheetId': 1001 + 2 * tab, 'row': 0, 'blocks': []}
 
-    if len(chart_ids) < 2:
-        chart_ids = [1, 2]  # Fallback
+        chart_requests = []
+        for index in range(first, min(first + events_per_tab, len(events))):
+            event = events[index]
+            trend_rows, series_columns = trend_table(event, summaries[index] if summaries else None)
+            seat_rows = [['Section', 'Density']] + load_seat_data(event)
+            chart_ids = [next_chart_id, next_chart_id + 1]
+            next_chart_id += 2
 
-    return sheet_id, chart_ids
+            # Blocks are separated by one blank row; row 0 of a block is its header
+            for target, rows in ((trend_tab, trend_rows), (seat_tab, seat_rows)):
+                target['blocks'].append((target['row'], rows))
+            chart_requests.append(trend_chart_request(
+                trend_tab['sheetId'], trend_tab['row'] + 1, trend_tab['row'] + len(trend_rows),
+                anchor_row=trend_tab['row'], chart_id=chart_ids[0], series_columns=series_columns))
+            chart_requests.append(seat_chart_request(
+                seat_tab['sheetId'], seat_tab['row'] + 1, seat_tab['row'] + len(seat_rows),
+                anchor_row=seat_tab['row'], chart_id=chart_ids[1]))
+            trend_tab['row'] += len(trend_rows) + 1
+            seat_tab['row'] += len(seat_rows) + 1
+            placements.append(chart_ids)
+
+        for target in (trend_tab, seat_tab):
+            for row, rows in target['blocks']:
+                writer.add(target['title'], rows, start_row=row)
+            grid = writer.grid_properties(target['title'])
+            cells += grid['rowCount'] * grid['columnCount']
+            requests.append({"addSheet": {"properties": {
+                "sheetId": target['sheetId'],
+                "title": target['title'],
+                "gridProperties": grid
+            }}})
+        requests.extend(chart_requests)
+
+    if cells > MAX_SPREADSHEET_CELLS:
+        raise ValueError(f"Shared workbook needs {cells} cells, over Sheets' limit of {MAX_SPREADSHEET_CELLS}; "
+                         f"use per-event sheets or fewer device columns")
+
+    title = f"HawkEye Reports {run_date}" if run_date else "HawkEye Reports"
+    spreadsheet = execute(sheets_service.spreadsheets().create(body={
+        'properties': {'title': title}
+    }))
+    sheet_id = spreadsheet['spreadsheetId']
+    print(f"✅ Shared sheet created: https://docs.google.com/spreadsheets/d/{sheet_id}")
+
+    # Drop the default "Sheet1" once the real tabs exist
+    default_sheet_id = spreadsheet['sheets'][0]['properties']['sheetId']
+    requests.append({"deleteSheet": {"sheetId": default_sheet_id}})
+
+    execute(sheets_service.spreadsheets().batchUpdate(
+        spreadsheetId=sheet_id,
+        body={"requests": requests}
+    ))
+
+    writer.flush(sheets_service, sheet_id)
+
+    return [(sheet_id, chart_ids) for chart_ids in placements]
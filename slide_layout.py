@@ -0,0 +1,245 @@
+# Small declarative layout engine for Slides reports. A report is described once
+# as a tree of components (text, image, table, KPI card, chart) arranged with
+# stack (vertical) and row (horizontal grid) containers. compile_slide() places
+# every component on the page and turns the tree into a Slides batchUpdate
+# request list.
+
+# Portrait US Letter, in points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 40
+
+DARK_GREY = {"red": 0.2, "green": 0.2, "blue": 0.2}
+WHITE = {"red": 1, "green": 1, "blue": 1}
+
+# Text styles inside a KPI card, also used when its text is rewritten in place
+KPI_TITLE_STYLE = {'font_size': 14, 'color': DARK_GREY}
+KPI_VALUE_STYLE = {'font_size': 24, 'bold': True, 'color': DARK_GREY}
+KPI_CHANGE_STYLE = {'font_size': 12, 'color': DARK_GREY}
+
+
+def text(object_id, value, height, font_size=None, bold=None, color=None):
+    return {'type': 'text', 'id': object_id, 'text': value, 'height': height,
+            'font_size': font_size, 'bold': bold, 'color': color}
+
+
+def image(url, width, height):
+    return {'type': 'image', 'url': url, 'width': width, 'height': height}
+
+
+def table(object_id, rows, height, header_fill=None, header_color=None):
+    return {'type': 'table', 'id': object_id, 'rows': rows, 'height': height,
+            'header_fill': header_fill, 'header_color': header_color}
+
+
+def kpi_card(object_id, title, value, change, background, height=90):
+    return {'type': 'kpi', 'id': object_id, 'title': title, 'value': value,
+            'change': change, 'background': background, 'height': height}
+
+
+def chart(object_id, spreadsheet_id, chart_id, height=None):
+    # height=None lets the chart share whatever space its stack has left over
+    return {'type': 'chart', 'id': object_id, 'spreadsheet_id': spreadsheet_id,
+            'chart_id': chart_id, 'height': height}
+
+
+def stack(children, gap=12):
+    return {'type': 'stack', 'children': [c for c in children if c], 'gap': gap}
+
+
+def row(children, gap=40):
+    return {'type': 'row', 'children': [c for c in children if c], 'gap': gap}
+
+
+def fixed_height(node):
+    # None means the node stretches to fill its share of the remaining space
+    if node['type'] == 'stack':
+        heights = [fixed_height(c) for c in node['children']]
+        if None in heights:
+            return None
+        return sum(heights) + node['gap'] * max(len(heights) - 1, 0)
+    if node['type'] == 'row':
+        heights = [fixed_height(c) for c in node['children']]
+        if None in heights:
+            return None
+        return max(heights, default=0)
+    return node.get('height')
+
+
+def layout(node, x, y, width, height):
+    # Returns [(leaf, (x, y, width, height))] in tree order
+    if node['type'] == 'stack':
+        children = node['children']
+        heights = [fixed_height(c) for c in children]
+        flexible = heights.count(None)
+        used = sum(h for h in heights if h is not None) + node['gap'] * max(len(children) - 1, 0)
+        share = max(height - used, 0) / flexible if flexible else 0
+        placed = []
+        for child, child_height in zip(children, heights):
+            child_height = share if child_height is None else child_height
+            placed.extend(layout(child, x, y, width, child_height))
+            y += child_height + node['gap']
+        return placed
+    if node['type'] == 'row':
+        children = node['children']
+        widths = [c.get('width') for c in children]
+        flexible = widths.count(None)
+        used = sum(w for w in widths if w is not None) + node['gap'] * max(len(children) - 1, 0)
+        share = max(width - used, 0) / flexible if flexible else 0
+        placed = []
+        for child, child_width in zip(children, widths):
+            child_width = share if child_width is None else child_width
+            placed.extend(layout(child, x, y, child_width, height))
+            x += child_width + node['gap']
+        return placed
+    return [(node, (x, y, width, height))]
+
+
+def element_properties(slide_id, box):
+    x, y, width, height = (round(v, 2) for v in box)
+    return {
+        "pageObjectId": slide_id,
+        "size": {"height": {"magnitude": height, "unit": "PT"}, "width": {"magnitude": width, "unit": "PT"}},
+        "transform": {"scaleX": 1, "scaleY": 1, "translateX": x, "translateY": y, "unit": "PT"}
+    }
+
+
+def text_style_request(object_id, font_size=None, bold=None, color=None, cell=None):
+    style = {}
+    if font_size is not None:
+        style["fontSize"] = {"magnitude": font_size, "unit": "PT"}
+    if bold is not None:
+        style["bold"] = bold
+    if color is not None:
+        style["foregroundColor"] = {"opaqueColor": {"rgbColor": color}}
+    request = {"objectId": object_id, "style": style, "fields": ",".join(style)}
+    if cell is not None:
+        request["cellLocation"] = {"rowIndex": cell[0], "columnIndex": cell[1]}
+    return {"updateTextStyle": request}
+
+
+def text_requests(slide_id, node, box):
+    requests = [{"createShape": {
+        "objectId": node['id'],
+        "shapeType": "TEXT_BOX",
+        "elementProperties": element_properties(slide_id, box)
+    }}]
+    # Slides rejects empty inserts, and styles with an empty field mask
+    if node['text']:
+        requests.append({"insertText": {"objectId": node['id'], "text": node['text']}})
+        style = text_style_request(node['id'], node['font_size'], node['bold'], node['color'])
+        if style['updateTextStyle']['fields']:
+            requests.append(style)
+    return requests
+
+
+def replace_text_requests(object_id, value, font_size=None, bold=None, color=None):
+    # Rewrites the text of an existing shape; new text starts unstyled, so the
+    # style is applied again
+    return [
+        {"deleteText": {"objectId": object_id, "textRange": {"type": "ALL"}}},
+        {"insertText": {"objectId": object_id, "text": value}},
+        text_style_request(object_id, font_size, bold, color)
+    ]
+
+
+def image_requests(slide_id, node, box):
+    if not node['url']:
+        return []
+    return [{"createImage": {"url": node['url'], "elementProperties": element_properties(slide_id, box)}}]
+
+
+def table_requests(slide_id, node, box):
+    rows = node['rows']
+    columns = max(len(r) for r in rows)
+    requests = [{"createTable": {
+        "objectId": node['id'],
+        "rows": len(rows),
+        "columns": columns,
+        "elementProperties": element_properties(slide_id, box)
+    }}]
+    # Empty cells are left alone: Slides rejects an empty insert or a style on no text
+    filled = {(i, j) for i, cells in enumerate(rows) for j, cell in enumerate(cells) if str(cell)}
+    for i, cells in enumerate(rows):
+        for j, cell in enumerate(cells):
+            if (i, j) not in filled:
+                continue
+            requests.append({"insertText": {
+                "objectId": node['id'],
+                "cellLocation": {"rowIndex": i, "columnIndex": j},
+                "text": str(cell)
+            }})
+    if node['header_fill']:
+        requests.append({"updateTableCellProperties": {
+            "objectId": node['id'],
+            "tableRange": {"location": {"rowIndex": 0, "columnIndex": 0}, "rowSpan": 1, "columnSpan": columns},
+            "tableCellProperties": {
+                "tableCellBackgroundFill": {"solidFill": {"color": {"rgbColor": node['header_fill']}}}
+            },
+            "fields": "tableCellBackgroundFill"
+        }})
+    if node['header_color']:
+        for j in range(columns):
+            if (0, j) in filled:
+                requests.append(text_style_request(node['id'], bold=True, color=node['header_color'], cell=(0, j)))
+    return requests
+
+
+def kpi_requests(slide_id, node, box):
+    requests = [
+        {"createShape": {
+            "objectId": node['id'],
+            "shapeType": "RECTANGLE",
+            "elementProperties": element_properties(slide_id, box)
+        }},
+        {"updateShapeProperties": {
+            "objectId": node['id'],
+            "shapeProperties": {"shapeBackgroundFill": {"solidFill": {"color": {"rgbColor": node['background']}}}},
+            "fields": "shapeBackgroundFill"
+        }}
+    ]
+    for child, child_box in kpi_text_layout(node, box):
+        requests.extend(text_requests(slide_id, child, child_box))
+    return requests
+
+
+def kpi_text_layout(node, box):
+    # Title, value and change text placed inside a KPI card's box
+    x, y, width, height = box
+    inner = stack([
+        text(f"{node['id']}_title", node['title'], 20, **KPI_TITLE_STYLE),
+        text(f"{node['id']}_value", node['value'], 30, **KPI_VALUE_STYLE),
+        text(f"{node['id']}_change", node['change'], 20, **KPI_CHANGE_STYLE)
+    ], gap=2)
+    return layout(inner, x + 10, y + 8, width - 20, height - 16)
+
+
+def chart_requests(slide_id, node, box):
+    return [{"createSheetsChart": {
+        "objectId": node['id'],
+        "spreadsheetId": node['spreadsheet_id'],
+        "chartId": node['chart_id'],
+        "linkingMode": "LINKED",
+        "elementProperties": element_properties(slide_id, box)
+    }}]
+
+
+EMITTERS = {
+    'text': text_requests,
+    'image': image_requests,
+    'table': table_requests,
+    'kpi': kpi_requests,
+    'chart': chart_requests,
+}
+
+
+def page_layout(tree, page_width=PAGE_WIDTH, page_height=PAGE_HEIGHT, margin=MARGIN):
+    return layout(tree, margin, margin, page_width - 2 * margin, page_height - 2 * margin)
+
+
+def compile_slide(slide_id, tree, insertion_index=0,
+                  page_width=PAGE_WIDTH, page_height=PAGE_HEIGHT, margin=MARGIN):
+    requests = [{"createSlide": {"objectId": slide_id, "insertionIndex": insertion_index}}]
+    for node, box in page_layout(tree, page_width, page_height, margin):
+        requests.extend(EMITTERS[node['type']](slide_id, node, box))
+    return requests
@@ -0,0 +1,44 @@
+# Helpers shared by the local state files (template cache, report state, image
+# cache, run journal, discovery cache) and the SQLite stores (history, report
+# cache).
+import json
+import os
+import sqlite3
+import threading
+
+
+def atomic_write(path, content, durable=False):
+    # Write-then-rename: readers and a crash mid-write only ever see the old
+    # file or the new one, never a truncated one. content is a string or an
+    # iterable of lines; durable fsyncs the data before the rename. The temp
+    # name carries the pid so processes sharing a file never mix their writes.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        if isinstance(content, str):
+            f.write(content)
+        else:
+            f.writelines(content)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_json(path, data):
+    atomic_write(path, json.dumps(data, indent=2))
+
+
+def thread_connections(path, timeout=30):
+    # Returns connection(): this thread's sqlite3 connection to path, opened on
+    # first use, since a connection must stay on the thread that opened it. WAL
+    # lets the worker threads read while one of them writes.
+    local = threading.local()
+
+    def connection():
+        if not hasattr(local, 'db'):
+            db = sqlite3.connect(path, timeout=timeout)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            local.db = db
+        return local.db
+    return connection
@@ -0,0 +1,119 @@
+# On-disk cache of the Slides template's structure (slide, layout and placeholder
+# objectIds, page size). Drive copies keep the template's objectIds, so requests
+# for a copied deck can address template elements without fetching the copy.
+# The cache is keyed by the template's Drive version and only refreshed when the
+# template is edited. Dry runs keep it in memory only (configure(path=None)).
+import json
+import os.path
+import threading
+
+from api_scheduler import execute
+from storage import write_json
+
+CACHE_PATH = 'template_cache.json'
+
+TEMPLATE_FIELDS = (
+    'pageSize,'
+    'layouts(objectId,layoutProperties/name),'
+    'slides(objectId,slideProperties/layoutObjectId,pageElements(objectId,shape/placeholder))'
+)
+
+_cache = {}
+_lock = threading.Lock()
+
+# Set by configure(); None keeps the metadata in memory only
+cache_path = CACHE_PATH
+
+
+def configure(path=CACHE_PATH):
+    global cache_path
+    cache_path = path
+    reset()
+
+
+def reset():
+    # The next lookup checks the template's Drive version again; a long-running
+    # process calls this per run so template edits are picked up
+    with _lock:
+        _cache.clear()
+
+
+def read_cache(path=CACHE_PATH):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def write_cache(entries, path=CACHE_PATH):
+    if path:
+        write_json(path, entries)
+
+
+def summarize_template(presentation):
+    slides = []
+    for slide in presentation.get('slides', []):
+        placeholders = []
+        for element in slide.get('pageElements', []):
+            placeholder = element.get('shape', {}).get('placeholder')
+            if placeholder:
+                placeholders.append({
+                    'objectId': element['objectId'],
+                    'type': placeholder.get('type'),
+                    'index': placeholder.get('index', 0)
+                })
+        slides.append({
+            'objectId': slide['objectId'],
+            'layoutObjectId': slide.get('slideProperties', {}).get('layoutObjectId'),
+            'placeholders': placeholders
+        })
+    return {
+        'page_size': presentation.get('pageSize'),
+        'layouts': [
+            {'objectId': layout['objectId'], 'name': layout.get('layoutProperties', {}).get('name')}
+            for layout in presentation.get('layouts', [])
+        ],
+        'slides': slides
+    }
+
+
+def cached_version(template_id):
+    # Last known Drive version of the template, without an API call
+    with _lock:
+        metadata = _cache.get(template_id)
+    if metadata is None:
+        metadata = read_cache(cache_path).get(template_id, {})
+    return metadata.get('version')
+
+
+def get_template_metadata(slides_service, drive_service, template_id):
+    # One small Drive metadata call per process decides whether the cached
+    # structure is still current; the full template is only fetched on a miss
+    with _lock:
+        if template_id in _cache:
+            return _cache[template_id]
+
+        info = execute(drive_service.files().get(fileId=template_id, fields='version,modifiedTime'))
+        entries = read_cache(cache_path)
+        cached = entries.get(template_id)
+        if cached and cached.get('version') == info.get('version') \
+                and cached.get('modifiedTime') == info.get('modifiedTime'):
+            _cache[template_id] = cached
+            return cached
+
+        presentation = execute(slides_service.presentations().get(
+            presentationId=template_id,
+            fields=TEMPLATE_FIELDS
+        ))
+        metadata = summarize_template(presentation)
+        metadata['version'] = info.get('version')
+        metadata['modifiedTime'] = info.get('modifiedTime')
+        entries[template_id] = metadata
+        write_cache(entries, cache_path)
+        print(f"✅ Template metadata cached for version {info.get('version')}")
+
+        _cache[template_id] = metadata
+        return metadata
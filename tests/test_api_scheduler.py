@@ -0,0 +1,127 @@
+import pytest
+
+import api_scheduler
+import drive_ops
+from api_scheduler import ApiScheduler, TokenBucket
+from fake_services import FakeDriveService, FakeHttpError
+
+
+class FakeClock:
+    # Stands in for api_scheduler.time: sleeping moves the clock forward
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(api_scheduler, 'time', clock)
+    monkeypatch.setattr(drive_ops, 'time', clock)
+    return clock
+
+
+class FailingDrive(FakeDriveService):
+    # Fails each method's first `failures` calls with the given status
+    def __init__(self, status, failures=1, headers=None):
+        super().__init__()
+        self.status = status
+        self.failures = failures
+        self.headers = headers
+        self.attempts = {}
+
+    def fail_first(self, method):
+        self.attempts[method] = self.attempts.get(method, 0) + 1
+        if self.attempts[method] <= self.failures:
+            raise FakeHttpError(self.status, self.headers)
+
+    def do_files_get(self, fileId, **kwargs):
+        self.fail_first('get')
+        return super().do_files_get(fileId, **kwargs)
+
+    def do_files_copy(self, fileId, body, **kwargs):
+        self.fail_first('copy')
+        return super().do_files_copy(fileId, body, **kwargs)
+
+
+def test_429_waits_for_retry_after(clock):
+    scheduler = ApiScheduler(quotas={}, base_delay=0.01)
+    drive = FailingDrive(429, failures=2, headers={'retry-after': '12'})
+    assert scheduler.execute(drive.files().get(fileId='f'))['id'] == 'f'
+    assert clock.sleeps == [12.0, 12.0]
+    assert scheduler.metrics()['drive.read']['retries'] == 2
+
+
+@pytest.mark.parametrize('status', [500, 503])
+def test_5xx_on_reads_is_retried(clock, status):
+    scheduler = ApiScheduler(quotas={}, base_delay=0.01)
+    drive = FailingDrive(status)
+    assert scheduler.execute(drive.files().get(fileId='f'))['id'] == 'f'
+    assert drive.attempts['get'] == 2
+
+
+def test_5xx_on_a_copy_is_not_sent_again(clock):
+    # The first copy may have been made; a retry could leave a second one behind
+    scheduler = ApiScheduler(quotas={}, base_delay=0.01)
+    drive = FailingDrive(503)
+    with pytest.raises(FakeHttpError):
+        scheduler.execute(drive.files().copy(fileId='t', body={'name': 'deck'}))
+    assert drive.attempts['copy'] == 1
+    assert clock.sleeps == []
+
+
+def test_rate_limited_copy_is_retried(clock):
+    scheduler = ApiScheduler(quotas={}, base_delay=0.01)
+    drive = FailingDrive(429, headers={'retry-after': '3'})
+    assert scheduler.execute(drive.files().copy(fileId='t', body={'name': 'deck'}))['name'] == 'deck'
+    assert drive.attempts['copy'] == 2
+    assert clock.sleeps == [3.0]
+
+
+def test_connection_errors_only_retry_idempotent_calls():
+    error = ConnectionError('reset')
+    assert api_scheduler.is_retryable(error)
+    assert not api_scheduler.is_retryable(error, idempotent=False)
+
+
+def test_gives_up_after_max_retries(clock):
+    scheduler = ApiScheduler(quotas={}, max_retries=2, base_delay=0.01)
+    drive = FailingDrive(503, failures=10)
+    with pytest.raises(FakeHttpError):
+        scheduler.execute(drive.files().get(fileId='f'))
+    assert drive.attempts['get'] == 3
+    assert scheduler.metrics()['drive.read']['failures'] == 1
+
+
+def test_batch_copies_failing_with_5xx_are_not_resent(clock):
+    api_scheduler.configure(quotas={}, base_delay=0.01)
+    drive = FailingDrive(503)
+    results = drive_ops.copy_files(drive, {'a': ('t', {'name': 'a'})})
+    assert isinstance(results['a'], FakeHttpError)
+    assert drive.attempts['copy'] == 1
+
+
+def test_bucket_goes_into_debt_for_large_costs(clock):
+    bucket = TokenBucket(per_minute=60, burst=10)
+    # A 30-call batch goes through on a full bucket and leaves it 20 tokens short
+    assert bucket.acquire(30) == 0
+    assert bucket.tokens == -20
+    # The next call waits for the debt plus its own token at one token a second
+    assert bucket.acquire(1) == pytest.approx(21)
+    assert sum(clock.sleeps) == pytest.approx(21)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(per_minute=60, burst=5)
+    assert bucket.acquire(5) == 0
+    clock.now += 3600
+    assert bucket.acquire(5) == 0
+    assert bucket.tokens == 0
+    assert bucket.acquire(1) == pytest.approx(1)
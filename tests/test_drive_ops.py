@@ -0,0 +1,58 @@
+import pytest
+
+import api_scheduler
+import drive_ops
+from fake_services import FakeDriveService, FakeHttpError
+
+
+class FlakyDrive(FakeDriveService):
+    # Rejects every copy once with 429 and Retry-After, then lets it through
+    def __init__(self, retry_after='7'):
+        super().__init__()
+        self.retry_after_header = retry_after
+        self.rejected = set()
+
+    def do_files_copy(self, fileId, body, **kwargs):
+        if body['name'] not in self.rejected:
+            self.rejected.add(body['name'])
+            raise FakeHttpError(429, {'retry-after': self.retry_after_header})
+        return super().do_files_copy(fileId, body, **kwargs)
+
+
+@pytest.fixture
+def charged(monkeypatch):
+    # Quota tokens taken per request, and the sleeps between batch rounds
+    api_scheduler.configure(quotas={('drive', 'write'): 600000}, base_delay=0.01, burst=1000)
+    costs, sleeps = [], []
+    acquire = api_scheduler.TokenBucket.acquire
+    monkeypatch.setattr(api_scheduler.TokenBucket, 'acquire',
+                        lambda self, tokens=1: costs.append(tokens) or acquire(self, tokens))
+    monkeypatch.setattr(drive_ops.time, 'sleep', sleeps.append)
+    yield costs, sleeps
+    api_scheduler.configure()
+
+
+def test_rate_limited_batch_calls_are_retried_after_retry_after(charged):
+    costs, sleeps = charged
+    drive = FlakyDrive()
+    jobs = {i: ('template', {'name': f'copy {i}'}) for i in range(120)}
+    results = drive_ops.copy_files(drive, jobs)
+    assert not drive_ops.failures(results)
+    assert len({r['id'] for r in results.values()}) == 120
+    # One retry round, waiting as long as the server asked
+    assert sleeps == [7.0]
+    # Every call inside a batch is charged, the retried ones again
+    assert costs == [100, 20, 100, 20]
+
+
+def test_calls_still_rejected_in_the_last_round_report_the_error(charged):
+    _, sleeps = charged
+    drive = FlakyDrive(retry_after='0')
+    batch = drive_ops.DriveBatch(drive, max_rounds=1)
+    outcome = {}
+    batch.add(lambda: drive.files().copy(fileId='template', body={'name': 'only'}),
+                drive_ops.collect(outcome, 'only'))
+    batch.execute()
+    assert isinstance(outcome['only'], FakeHttpError)
+    assert drive_ops.describe(outcome['only']) == 'HTTP 429'
+    assert sleeps == []
@@ -0,0 +1,95 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from event_loader import iter_events, iter_json_array, iter_ndjson
+
+
+class Trickle(io.StringIO):
+    # Hands out a few characters per read, so every value crosses chunk boundaries
+    def read(self, size=-1):
+        return super().read(3)
+
+
+def parse(text, trickle=False):
+    return list(iter_json_array(Trickle(text) if trickle else io.StringIO(text)))
+
+
+@pytest.mark.parametrize('trickle', [False, True])
+def test_streams_events_around_other_keys(trickle):
+    text = '{"meta": {"list": [1, "]"]}, "data": [{"id": 1}, {"id": 2, "s": "a,b}"}], "total": 12345}'
+    assert parse(text, trickle) == [{'id': 1}, {'id': 2, 's': 'a,b}'}]
+
+
+@pytest.mark.parametrize('trickle', [False, True])
+def test_numbers_split_across_chunks(trickle):
+    assert parse('{"data": [123456789, -0.5e10, 7]}', trickle) == [123456789, -0.5e10, 7]
+
+
+@pytest.mark.parametrize('text', ['{}', '{"data": []}', '{ "data" : [ ] , "x" : null }', '{"other": 1}'])
+def test_empty_exports(text):
+    assert parse(text) == []
+
+
+@pytest.mark.parametrize('text', [
+    '{"data": [1 2]}',
+    '{"data": [{"id": 1} {"id": 2}]}',
+    '{"data": [1,]}',
+    '{"data": [,1]}',
+    '{"data": [1,,2]}',
+    '{"a": 1 "data": [1]}',
+    '{"a": 1,}',
+    '{"data": [1]]}',
+    '{1: [1]}',
+    '[1, 2]',
+    '',
+])
+def test_malformed_exports_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_truncated_export_is_rejected():
+    with pytest.raises(ValueError):
+        parse('{"data": [{"id": 1}, {"id": 2', trickle=True)
+    with pytest.raises(ValueError):
+        parse('{"data": [{"id": 1}')
+
+
+def test_ndjson_skips_blank_lines_and_other_dates():
+    lines = ['{"id": 1, "end_date": "2025-03-28"}', '', '   ', '{"id": 2, "end_date": "2025-03-27"}']
+    f = io.StringIO('\n'.join(lines) + '\n')
+    assert [e['id'] for e in iter_ndjson(f, '2025-03-28')] == [1]
+
+
+def test_ndjson_rejects_a_bad_line():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_ndjson(io.StringIO('{"id": 1}\n{"id": \n')))
+
+
+EVENTS = [{'id': 1, 'end_date': '2025-03-28', 'event_title': 'Café ☕'},
+          {'id': 2, 'end_date': '2025-03-27'}]
+
+
+@pytest.mark.parametrize('name, ndjson, compress', [
+    ('events.json', False, False),
+    ('events.json.gz', False, True),
+    ('events.json', False, True),
+    ('events.ndjson', True, False),
+    ('events.jsonl.gz', True, True),
+])
+def test_iter_events_formats(tmp_path, name, ndjson, compress):
+    text = ''.join(json.dumps(e) + '\n' for e in EVENTS) if ndjson else json.dumps({'data': EVENTS})
+    path = tmp_path / name
+    path.write_bytes(gzip.compress(text.encode('utf-8')) if compress else text.encode('utf-8'))
+    assert list(iter_events(str(path))) == EVENTS
+    assert [e['id'] for e in iter_events(str(path), end_date='2025-03-28')] == [1]
+
+
+def test_truncated_gzip_is_rejected(tmp_path):
+    path = tmp_path / 'events.json.gz'
+    path.write_bytes(gzip.compress(json.dumps({'data': EVENTS}).encode('utf-8'))[:-12])
+    with pytest.raises((EOFError, ValueError, OSError)):
+        list(iter_events(str(path)))
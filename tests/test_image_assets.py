@@ -0,0 +1,94 @@
+import struct
+import zlib
+
+import pytest
+
+import api_scheduler
+import image_assets
+from fake_services import FakeDriveService, FakeHttpError
+from image_assets import ImageAssets, header_size, prepare_image
+
+
+def png(width, height):
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + header + struct.pack('>I', zlib.crc32(b'IHDR' + header))
+
+
+def gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00\x00\x00'
+
+
+def jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHH', 11, 8, height, width) + b'\x01\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof
+
+
+@pytest.fixture(autouse=True)
+def no_retries():
+    api_scheduler.configure(quotas={}, max_retries=0)
+    yield
+    api_scheduler.configure()
+
+
+def test_header_size_reads_png_gif_and_jpeg():
+    assert header_size(png(640, 360), 'image/png') == (640, 360)
+    assert header_size(gif(300, 200), 'image/gif') == (300, 200)
+    assert header_size(jpeg(4000, 3000), 'image/jpeg') == (4000, 3000)
+    with pytest.raises(ValueError):
+        header_size(b'\xff\xd8\xff', 'image/jpeg')
+
+
+def test_oversized_gif_is_rejected_from_its_header():
+    with pytest.raises(ValueError):
+        prepare_image(gif(6000, 6000))
+
+
+def test_without_pillow_pixels_and_bytes_are_still_checked(monkeypatch):
+    monkeypatch.setattr(image_assets, 'Image', None)
+    assert prepare_image(png(640, 360)) == (png(640, 360), 'image/png')
+    with pytest.raises(ValueError):
+        prepare_image(png(8000, 8000))
+    monkeypatch.setattr(image_assets, 'MAX_IMAGE_BYTES', 10)
+    with pytest.raises(ValueError):
+        prepare_image(png(10, 10))
+
+
+class RefusingDrive(FakeDriveService):
+    def __init__(self, refuse):
+        super().__init__()
+        self.refuse = refuse
+
+    def do_files_create(self, body, media_body=None, **kwargs):
+        if self.refuse == 'upload':
+            raise FakeHttpError(403)
+        return super().do_files_create(body, media_body, **kwargs)
+
+    def do_permissions_create(self, fileId, body, **kwargs):
+        if self.refuse == 'share':
+            raise FakeHttpError(403)
+        return super().do_permissions_create(fileId, body, **kwargs)
+
+
+@pytest.mark.parametrize('refuse', ['upload', 'share'])
+def test_drive_errors_drop_the_image_not_the_report(monkeypatch, refuse):
+    monkeypatch.setattr(image_assets, 'Image', None)
+    assets = ImageAssets('http://images/{id}', path=None, fetch=lambda url: png(64, 64) + url.encode())
+    event = {'latest_image_url_id': 'logo', 'devices': []}
+    with assets.shared(RefusingDrive(refuse), [event]) as images:
+        assert images == {}
+    assert assets.grants == {}
+
+
+def test_images_are_public_only_inside_the_block(monkeypatch):
+    monkeypatch.setattr(image_assets, 'Image', None)
+    drive = FakeDriveService()
+    assets = ImageAssets('http://images/{id}', path=None, fetch=lambda url: png(64, 64) + url.encode())
+    first = {'latest_image_url_id': 'logo', 'devices': [{'id': 1, 'latest_image_url_id': 'snap'}]}
+    second = {'latest_image_url_id': 'logo', 'devices': []}
+    with assets.shared(drive, [first]) as images:
+        assert set(images) == {'logo', 'snap'}
+        with assets.shared(drive, [second]):
+            # The logo's permission is shared, not granted twice
+            assert sorted(count for _, count in assets.grants.values()) == [1, 2]
+    assert assets.grants == {}
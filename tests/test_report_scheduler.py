@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from report_scheduler import CronSchedule, ReportPlanner, next_interval_start, next_trigger, parse_cron_field
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_cron_field_lists_ranges_steps_and_names():
+    assert parse_cron_field('*', 0, 5) == {0, 1, 2, 3, 4, 5}
+    assert parse_cron_field('1,3-5', 0, 59) == {1, 3, 4, 5}
+    assert parse_cron_field('*/15', 0, 59) == {0, 15, 30, 45}
+    assert parse_cron_field('10-20/5', 0, 59) == {10, 15, 20}
+    # A single value with a step runs to the end of the range
+    assert parse_cron_field('50/3', 0, 59) == {50, 53, 56, 59}
+    assert parse_cron_field('jan,Mar-may', 1, 12, {'jan': 1, 'mar': 3, 'may': 5}) == {1, 3, 4, 5}
+
+
+@pytest.mark.parametrize('field', ['60', '0-60', 'x'])
+def test_cron_field_rejects_bad_values(field):
+    with pytest.raises(ValueError):
+        parse_cron_field(field, 0, 59)
+
+
+def test_cron_needs_five_fields():
+    with pytest.raises(ValueError):
+        CronSchedule('0 12 * *')
+
+
+def test_cron_day_of_month_or_day_of_week_when_both_restricted():
+    cron = CronSchedule('0 9 13 * fri')
+    assert cron.day_matches(date(2025, 6, 13))   # Friday the 13th
+    assert cron.day_matches(date(2025, 6, 6))    # a Friday
+    assert cron.day_matches(date(2025, 5, 13))   # a Tuesday, the 13th
+    assert not cron.day_matches(date(2025, 6, 10))
+
+
+def test_cron_star_step_counts_as_unrestricted():
+    # "*/2" starts with "*", so only the weekday has to match as well
+    cron = CronSchedule('0 9 */2 * mon')
+    assert cron.day_matches(date(2025, 6, 9))        # Monday the 9th
+    assert not cron.day_matches(date(2025, 6, 16))   # Monday the 16th
+    assert not cron.day_matches(date(2025, 6, 11))   # Wednesday the 11th
+
+
+def test_cron_sunday_as_seven_and_next_after():
+    cron = CronSchedule('30 18 * * 7')
+    assert cron.next_after(datetime(2025, 6, 9, 12)) == datetime(2025, 6, 15, 18, 30)
+    assert cron.next_after(datetime(2025, 6, 15, 18, 30)) == datetime(2025, 6, 22, 18, 30)
+
+
+def test_daily_and_every_other_day():
+    first = datetime(2025, 6, 1, 10)
+    assert next_interval_start({'event_interval': 'Daily'}, first, datetime(2025, 6, 3, 11)) == datetime(2025, 6, 4, 10)
+    every_other = {'event_interval': 'Daily', 'repeat_every': 2}
+    assert next_interval_start(every_other, first, datetime(2025, 6, 3, 11)) == datetime(2025, 6, 5, 10)
+    assert next_interval_start(every_other, first, datetime(2025, 5, 1)) == first
+
+
+def test_weekly_on_event_days_every_other_week():
+    # Sunday 2025-06-01; repeats on Tuesdays and Thursdays of every second week
+    schedule = {'event_interval': 'Weekly', 'repeat_every': 2, 'event_days': 'Tuesday, Thursday'}
+    first = datetime(2025, 6, 1, 10)
+    assert next_interval_start(schedule, first, datetime(2025, 6, 1, 12)) == datetime(2025, 6, 10, 10)
+    assert next_interval_start(schedule, first, datetime(2025, 6, 10, 10)) == datetime(2025, 6, 12, 10)
+    assert next_interval_start(schedule, first, datetime(2025, 6, 12, 10)) == datetime(2025, 6, 24, 10)
+
+
+def test_monthly_skips_months_without_the_day_and_annually():
+    first = datetime(2025, 1, 31, 10)
+    assert next_interval_start({'event_interval': 'Monthly'}, first, datetime(2025, 2, 1)) == datetime(2025, 3, 31, 10)
+    leap = datetime(2024, 2, 29, 10)
+    assert next_interval_start({'event_interval': 'Annually'}, leap, datetime(2024, 3, 1)) == datetime(2028, 2, 29, 10)
+
+
+def test_one_off_trigger_follows_the_event_timezone():
+    event = {'repeat_type': 'Oneoff', 'timezone': 'Australia/Melbourne', 'start_date': '2025-06-01',
+             'end_date': '2025-06-01', 'start_time': '18:00:00', 'end_time': '21:00:00'}
+    assert next_trigger(event, utc(2025, 6, 1)) == utc(2025, 6, 1, 11, 5)
+    assert next_trigger(event, utc(2025, 6, 1, 11, 5)) is None
+
+
+def test_recurring_trigger_never_at_or_before_after_across_spring_forward():
+    # 02:30 does not exist in New York on 2025-03-09
+    event = {'repeat_type': 'Recurring', 'event_interval': 'Daily', 'timezone': 'America/New_York',
+             'start_date': '2025-03-01', 'start_time': '02:30:00', 'end_time': '03:30:00'}
+    after = utc(2025, 3, 9, 8)
+    trigger = next_trigger(event, after)
+    assert trigger > after
+    assert trigger == utc(2025, 3, 10, 7, 35)
+
+
+def test_recurring_trigger_across_fall_back():
+    event = {'repeat_type': 'Recurring', 'event_interval': 'Daily', 'timezone': 'America/New_York',
+             'start_date': '2025-10-01', 'start_time': '00:30:00', 'end_time': '01:30:00'}
+    after = utc(2025, 11, 2, 4)
+    trigger = next_trigger(event, after)
+    assert trigger > after
+    # 01:30 happens twice; the first (EDT) one ends the occurrence
+    assert trigger == utc(2025, 11, 2, 5, 35)
+    following = next_trigger(event, trigger)
+    assert following == utc(2025, 11, 3, 6, 35)
+
+
+def test_planner_fires_each_trigger_once_across_dst():
+    planner = ReportPlanner()
+    event = {'event_uuid': 'evn-dst', 'repeat_type': 'Recurring', 'event_interval': 'Daily',
+             'timezone': 'America/New_York', 'start_date': '2025-03-01',
+             'start_time': '02:30:00', 'end_time': '03:30:00'}
+    now = utc(2025, 3, 8, 12)
+    planner.load([event], now)
+    fired = []
+    while now < utc(2025, 3, 12):
+        due = planner.pop_due(now)
+        fired.extend(due.values())
+        for uuid in due:
+            planner.plan(uuid, now)
+        now += timedelta(minutes=1)
+    assert fired == sorted(set(fired))
+    assert len(fired) == 3
+    assert all(b - a >= timedelta(hours=23) for a, b in zip(fired, fired[1:]))
+
+
+def test_planner_replans_only_changed_events_and_drops_removed_ones():
+    planner = ReportPlanner()
+    events = [{'event_uuid': f'evn-{i}', 'repeat_type': 'Oneoff', 'start_date': '2025-06-01',
+               'end_date': '2025-06-01', 'start_time': '10:00:00', 'end_time': f'1{i}:00:00'} for i in range(1, 4)]
+    after = utc(2025, 6, 1)
+    assert planner.load(events, after) == 3
+    assert planner.load(events, after) == 0
+    events[0]['end_time'] = '11:30:00'
+    assert planner.load(events[:2], after) == 1
+    assert [uuid for uuid, _ in planner.upcoming()] == ['evn-1', 'evn-2']
+    assert planner.pop_due(utc(2025, 6, 1, 11, 40)) == {'evn-1': utc(2025, 6, 1, 11, 35)}
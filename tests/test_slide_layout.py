@@ -0,0 +1,38 @@
+from report_layout import build_report_layout, object_ids
+from slide_layout import compile_slide, stack, table, text
+
+
+def kinds(requests):
+    return [next(iter(request)) for request in requests]
+
+
+def test_empty_text_gets_no_insert_or_style():
+    requests = compile_slide('s', stack([text('t', '', 40, font_size=12)]))
+    assert kinds(requests) == ['createSlide', 'createShape']
+
+
+def test_unstyled_text_gets_no_empty_field_mask():
+    requests = compile_slide('s', stack([text('t', 'Hello', 40)]))
+    assert kinds(requests) == ['createSlide', 'createShape', 'insertText']
+
+
+def test_empty_table_cells_are_skipped():
+    tree = stack([table('tb', [['Name', ''], ['', 'x']], 80, header_color={'red': 1, 'green': 1, 'blue': 1})])
+    requests = compile_slide('s', tree)
+    inserted = [r['insertText']['cellLocation'] for r in requests if 'insertText' in r]
+    styled = [r['updateTextStyle']['cellLocation'] for r in requests if 'updateTextStyle' in r]
+    assert inserted == [{'rowIndex': 0, 'columnIndex': 0}, {'rowIndex': 1, 'columnIndex': 1}]
+    assert styled == [{'rowIndex': 0, 'columnIndex': 0}]
+
+
+def test_report_has_no_duplicate_or_empty_requests():
+    event = {'event_title': '', 'event_uuid': 'evn-1', 'analytics': [
+        {'device_id': 1, 'datetime': '2025-03-20T10:00:00', 'headcount': 4},
+        {'device_id': 2, 'datetime': '2025-03-20T11:00:00', 'headcount': 6},
+    ]}
+    ids = object_ids(event)
+    requests = compile_slide(ids['slide'], build_report_layout(event, 'sheet', [1, 2], ids))
+    assert len({repr(r) for r in requests}) == len(requests)
+    for request in requests:
+        body = next(iter(request.values()))
+        assert body.get('text', 'x') and body.get('fields', 'x')
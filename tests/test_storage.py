@@ -0,0 +1,52 @@
+import json
+import threading
+
+from report_cache import ReportCache
+from report_state import ReportState
+from run_journal import RunJournal
+from storage import atomic_write, thread_connections, write_json
+
+
+def test_atomic_write_replaces_whole_file(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text('old')
+    write_json(str(path), {'a': 1})
+    atomic_write(str(tmp_path / 'lines'), ['x\n', 'y\n'], durable=True)
+    assert json.loads(path.read_text()) == {'a': 1}
+    assert (tmp_path / 'lines').read_text() == 'x\ny\n'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['lines', 'state.json']
+
+
+def test_connections_are_per_thread(tmp_path):
+    connection = thread_connections(str(tmp_path / 'db.sqlite'))
+    assert connection() is connection()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not connection()
+    assert connection().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_stores_round_trip(tmp_path):
+    state = ReportState(str(tmp_path / 'state.json'))
+    state.update({'event_uuid': 'evn-1'}, sheet_id='s1')
+    state.save()
+    assert ReportState(str(tmp_path / 'state.json')).get({'event_uuid': 'evn-1'})['sheet_id'] == 's1'
+
+    cache = ReportCache(str(tmp_path / 'cache.db'))
+    cache.put('k', {'event_uuid': 'evn-1'}, {'sheet_id': 's1'})
+    assert cache.get('k') == {'sheet_id': 's1'}
+
+
+def test_journal_compaction_keeps_current_run(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    old = RunJournal(path, run_date='2025-03-27')
+    old.record('evn-1', 'deck_copied', presentation_id='p1')
+    old.close()
+    journal = RunJournal(path, run_date='2025-03-28')
+    journal.record('evn-2', 'done')
+    journal.close()
+    with open(path) as f:
+        assert [json.loads(line)['run_date'] for line in f] == ['2025-03-28']
+    assert journal.abandoned == ['p1']
@@ -0,0 +1,194 @@
+# Timing spans for pipeline stages and Google API calls. Every event gets a root
+# span; stages (sheet, presentation, images, layout) and each API call made
+# through api_scheduler nest under it with wall time, request/response bytes and
+# retry counts. Spans can be exported as JSONL (one span per line) or as an
+# OTLP/JSON document an OpenTelemetry collector accepts, and a p50/p95/p99
+# table per stage and API method is printed at the end of a run.
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_FORMATS = ('jsonl', 'otlp')
+
+# Totals rolled up from API spans onto their event's root span
+ROLLUP_KEYS = ('api.calls', 'api.request_bytes', 'api.response_bytes', 'api.retries')
+
+
+def new_id(size):
+    return os.urandom(size).hex()
+
+
+def percentile(sorted_values, pct):
+    # Nearest rank on an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def payload_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+def request_size(request):
+    # googleapiclient requests carry the serialized body; the fakes keep kwargs
+    body = getattr(request, 'body', None)
+    if body is None and hasattr(request, 'kwargs'):
+        body = request.kwargs.get('body')
+    return payload_size(body)
+
+
+class Tracer:
+    def __init__(self, keep_spans=False):
+        # Durations are always kept for the summary; whole spans only when exporting
+        self.keep_spans = keep_spans
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.spans = []
+        self.durations = {}
+
+    def current(self):
+        stack = getattr(self.local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, kind='stage', **attributes):
+        parent = self.current()
+        span = {
+            'traceId': parent['traceId'] if parent else new_id(16),
+            'spanId': new_id(8),
+            'parentSpanId': parent['spanId'] if parent else None,
+            'name': name,
+            'kind': kind,
+            'start': time.time_ns(),
+            'attributes': attributes,
+            'root': parent['root'] if parent else None,
+            'status': 'OK'
+        }
+        if span['root'] is None:
+            span['root'] = span
+            attributes.update({key: 0 for key in ROLLUP_KEYS})
+        self.local.stack = getattr(self.local, 'stack', []) + [span]
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span['status'] = 'ERROR'
+            span['attributes']['error'] = repr(e)
+            raise
+        finally:
+            span['seconds'] = time.perf_counter() - started
+            span['end'] = span['start'] + int(span['seconds'] * 1e9)
+            self.local.stack = self.local.stack[:-1]
+            self.finish(span)
+
+    def finish(self, span):
+        root = span['root']
+        if span['kind'] == 'api' and root is not span:
+            attributes = span['attributes']
+            root['attributes']['api.calls'] += 1
+            root['attributes']['api.request_bytes'] += attributes.get('request_bytes', 0)
+            root['attributes']['api.response_bytes'] += attributes.get('response_bytes', 0)
+            root['attributes']['api.retries'] += attributes.get('retries', 0)
+        with self.lock:
+            self.durations.setdefault((span['kind'], span['name']), []).append(span['seconds'])
+            if self.keep_spans:
+                self.spans.append(span)
+
+    def summary(self):
+        with self.lock:
+            durations = {key: sorted(values) for key, values in self.durations.items()}
+        return {
+            f"{kind}:{name}": {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+                'total': sum(values)
+            }
+            for (kind, name), values in durations.items()
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print(f"\n{'stage / API method':<36} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'total s':>8}")
+        for name, s in sorted(summary.items()):
+            print(f"{name:<36} {s['count']:>6} {s['p50'] * 1000:>8.1f} {s['p95'] * 1000:>8.1f} "
+                  f"{s['p99'] * 1000:>8.1f} {s['total']:>8.1f}")
+
+    def export(self, path, trace_format='jsonl'):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda s: s['start'])
+        with open(path, 'w') as f:
+            if trace_format == 'otlp':
+                json.dump(otlp_document(spans), f)
+            else:
+                for span in spans:
+                    f.write(json.dumps({
+                        'trace_id': span['traceId'],
+                        'span_id': span['spanId'],
+                        'parent_span_id': span['parentSpanId'],
+                        'name': span['name'],
+                        'kind': span['kind'],
+                        'start_ns': span['start'],
+                        'end_ns': span['end'],
+                        'seconds': round(span['seconds'], 6),
+                        'status': span['status'],
+                        'attributes': span['attributes']
+                    }, default=str) + '\n')
+        print(f"✅ {len(spans)} spans written to {path}")
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_document(spans):
+    # OTLP/JSON ExportTraceServiceRequest; API calls are CLIENT spans, stages INTERNAL
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': 'hawkeye-reports'}}]},
+        'scopeSpans': [{
+            'scope': {'name': 'hawkeye.pipeline'},
+            'spans': [{
+                'traceId': span['traceId'],
+                'spanId': span['spanId'],
+                'parentSpanId': span['parentSpanId'] or '',
+                'name': span['name'],
+                'kind': 3 if span['kind'] == 'api' else 1,
+                'startTimeUnixNano': str(span['start']),
+                'endTimeUnixNano': str(span['end']),
+                'attributes': [{'key': key, 'value': otlp_value(value)}
+                               for key, value in span['attributes'].items() if value is not None],
+                'status': {'code': 2, 'message': span['attributes'].get('error', '')}
+                if span['status'] == 'ERROR' else {'code': 1}
+            } for span in spans]
+        }]
+    }]}
+
+
+# Shared by every worker thread; main.py replaces it when a trace file is requested
+tracer = Tracer()
+
+
+def configure(keep_spans=False):
+    global tracer
+    tracer = Tracer(keep_spans)
+    return tracer
+
+
+def span(name, kind='stage', **attributes):
+    return tracer.span(name, kind, **attributes)
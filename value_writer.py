@@ -0,0 +1,112 @@
+# Collects every cell write for one spreadsheet and sends them together: either
+# inline in the spreadsheets().create body (small data sets, no extra call) or
+# as values.batchUpdate calls chunked by payload size. A1 ranges are computed
+# from the exact row and column counts of each block.
+import json
+import re
+
+from api_scheduler import execute
+
+# Keep each values.batchUpdate body well under the API's request size limit
+MAX_VALUES_BYTES = 2 * 1024 * 1024
+
+# Up to this many cells go straight into the create body
+MAX_INLINE_CELLS = 5000
+
+# Rows and columns of a new tab; values writes outside the grid fail
+DEFAULT_GRID = (1000, 26)
+
+# Sheets' limit on cells across all tabs of one spreadsheet
+MAX_SPREADSHEET_CELLS = 10_000_000
+
+
+def column_letter(index):
+    # 0 -> A, 25 -> Z, 26 -> AA
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def a1_range(title, start_row, start_col, rows):
+    if not re.fullmatch(r'\w+', title):
+        title = "'" + title.replace("'", "''") + "'"
+    width = max(len(row) for row in rows)
+    return (f"{title}!{column_letter(start_col)}{start_row + 1}:"
+            f"{column_letter(start_col + width - 1)}{start_row + len(rows)}")
+
+
+def cell_data(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+class ValueWriter:
+    def __init__(self, max_bytes=MAX_VALUES_BYTES):
+        self.max_bytes = max_bytes
+        # (tab title, start row, start column, rows)
+        self.blocks = []
+
+    def add(self, title, rows, start_row=0, start_col=0):
+        if rows:
+            self.blocks.append((title, start_row, start_col, rows))
+
+    def cell_count(self):
+        return sum(len(row) for _, _, _, rows in self.blocks for row in rows)
+
+    def extent(self, title):
+        # (rows, columns) the tab's blocks reach
+        ends = [(start_row + len(rows), start_col + max(len(row) for row in rows))
+                for tab, start_row, start_col, rows in self.blocks if tab == title]
+        return (max(r for r, _ in ends), max(c for _, c in ends)) if ends else (0, 0)
+
+    def grid_properties(self, title, minimum=DEFAULT_GRID):
+        rows, columns = self.extent(title)
+        return {'rowCount': max(rows, minimum[0]), 'columnCount': max(columns, minimum[1])}
+
+    def grid_data(self, title):
+        # GridData for the create body: one entry per block on this tab
+        return [{
+            'startRow': start_row,
+            'startColumn': start_col,
+            'rowData': [{'values': [cell_data(v) for v in row]} for row in rows]
+        } for tab, start_row, start_col, rows in self.blocks if tab == title]
+
+    def value_ranges(self):
+        # Blocks bigger than one request are split into row slices
+        for title, start_row, start_col, rows in self.blocks:
+            piece, piece_bytes, piece_row = [], 0, start_row
+            for row in rows:
+                size = len(json.dumps(row)) + 1
+                if piece and piece_bytes + size > self.max_bytes:
+                    yield {'range': a1_range(title, piece_row, start_col, piece), 'values': piece}, piece_bytes
+                    piece_row += len(piece)
+                    piece, piece_bytes = [], 0
+                piece.append(row)
+                piece_bytes += size
+            yield {'range': a1_range(title, piece_row, start_col, piece), 'values': piece}, piece_bytes
+
+    def batches(self):
+        batches = [[]]
+        batch_bytes = 0
+        for value_range, size in self.value_ranges():
+            if batches[-1] and batch_bytes + size > self.max_bytes:
+                batches.append([])
+                batch_bytes = 0
+            batches[-1].append(value_range)
+            batch_bytes += size
+        return [batch for batch in batches if batch]
+
+    def flush(self, sheets_service, spreadsheet_id):
+        # One values.batchUpdate per size-limited chunk; returns the call count
+        batches = self.batches()
+        for data in batches:
+            execute(sheets_service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': data}
+            ))
+        self.blocks = []
+        return len(batches)